@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Load test / benchmark for server_multiuser.py.
+
+Builds a synthetic multiuser_data.json (see generate_multiuser_data.py) in a temporary DATA_DIR, starts
+mock_api_server.py as the Odds API stand-in and server_multiuser.py against
+it, then drives a mixed workload (login, place bet, leaderboard, match list,
+settle, odds) from concurrent keep-alive clients. Prints throughput and
+p50/p90/p99 latency per route as JSON.
+
+Examples:
+    python3 bench_multiuser.py --users 10000 --clients 32 --duration 20
+    python3 bench_multiuser.py --users 1000000 --bets-per-user 2 --server-mode asyncio --output bench.json
+    python3 bench_multiuser.py --mix place_bet=60,leaderboard=40 --persistence-mode journal
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from generate_multiuser_data import counts, generate, write
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = {
+    'login': 10,
+    'place_bet': 30,
+    'leaderboard': 20,
+    'matches': 25,
+    'settle': 2,
+    'odds': 13,
+}
+ODDS_SPORTS = ['soccer_germany_bundesliga2', 'soccer_england_efl_champ', 'soccer_germany_bundesliga', 'soccer_epl']
+
+
+# --- Processes -----------------------------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_http(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return True
+        except Exception:
+            time.sleep(0.1)
+    return False
+
+
+def start_process(argv, env, log_path):
+    log = open(log_path, 'w')
+    return subprocess.Popen(argv, cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def get_json(base, path):
+    try:
+        with urllib.request.urlopen(base + path, timeout=10) as resp:
+            return json.loads(resp.read().decode('utf-8'))
+    except Exception:
+        return None
+
+
+# --- Workload ------------------------------------------------------------------
+class Workload:
+    """Builds one request per operation; returns (method, path, body) for the client to send"""
+    def __init__(self, data):
+        self.user_ids = list(data['users'])
+        self.usernames = [u['username'] for u in data['users'].values()]
+        self.leagues_of = {}
+        for league_id, league in data['leagues'].items():
+            for uid in league['members']:
+                self.leagues_of.setdefault(uid, []).append(league_id)
+        self.members = list(self.leagues_of)
+        self.match_ids = [m['id'] for m in data['matches']]
+
+    def login(self, rng):
+        return 'POST', '/api/auth/login', {'username': rng.choice(self.usernames)}
+
+    def place_bet(self, rng):
+        user_id = rng.choice(self.user_ids)
+        return 'POST', '/api/bets/place', {
+            'userId': user_id,
+            'matchId': rng.choice(self.match_ids),
+            'market': 'match_result',
+            'selection': rng.choice(('home', 'draw', 'away')),
+            'odds': 2.5,
+            'stake': 1,
+            'leagueIds': self.leagues_of.get(user_id, []),
+        }
+
+    def leaderboard(self, rng):
+        user_id = rng.choice(self.members)
+        league_id = rng.choice(self.leagues_of[user_id])
+        return 'GET', f'/api/leagues/{league_id}/leaderboard?top=50&userId={user_id}', None
+
+    def matches(self, rng):
+        return 'GET', '/api/matches', None
+
+    def settle(self, rng):
+        return 'POST', f'/api/matches/{rng.choice(self.match_ids)}/settle', {
+            'homeGoals': rng.randint(0, 4), 'awayGoals': rng.randint(0, 4)}
+
+    def odds(self, rng):
+        return 'GET', f'/api/odds?sport={rng.choice(ODDS_SPORTS)}', None
+
+
+def run_client(port, workload, ops, weights, deadline, record_after, results, errors, seed, admin_token):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+    if admin_token:
+        headers['X-Admin-Token'] = admin_token
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        op = rng.choices(ops, weights)[0]
+        method, path, body = getattr(workload, op)(rng)
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except Exception:
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            status = None
+        elapsed = time.perf_counter() - started
+        if started < record_after:
+            continue
+        results.setdefault(op, []).append(elapsed)
+        if status is None or status >= 400:
+            errors[op] = errors.get(op, 0) + 1
+    conn.close()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarize(latencies, errors, seconds):
+    routes = {}
+    total = 0
+    for op in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(op, []))
+        total += len(values)
+        ms = lambda v: round(v * 1000.0, 3) if v is not None else None
+        routes[op] = {
+            'count': len(values),
+            'errors': errors.get(op, 0),
+            'rps': round(len(values) / seconds, 1) if seconds else None,
+            'meanMs': ms(sum(values) / len(values)) if values else None,
+            'p50Ms': ms(percentile(values, 50)),
+            'p90Ms': ms(percentile(values, 90)),
+            'p99Ms': ms(percentile(values, 99)),
+            'maxMs': ms(values[-1]) if values else None,
+        }
+    return total, routes
+
+
+def parse_mix(text):
+    mix = {}
+    for part in (text or '').split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f'unknown operation in --mix: {name} (choose from {", ".join(DEFAULT_MIX)})')
+        mix[name] = float(weight or 1)
+    return mix or dict(DEFAULT_MIX)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--bets-per-user', type=int, default=5)
+    parser.add_argument('--league-size', type=int, default=10)
+    parser.add_argument('--matches', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--clients', type=int, default=32, help='concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before the measurement')
+    parser.add_argument('--mix', default='', help='op=weight list, e.g. place_bet=60,leaderboard=40 (default: %s)' %
+                        ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()))
+    parser.add_argument('--server-mode', default='threading', choices=('threading', 'asyncio'))
+    parser.add_argument('--persistence-mode', default='snapshot', choices=('snapshot', 'journal', 'sqlite'))
+    parser.add_argument('--odds-latency-ms', type=int, default=50, help='mock upstream delay per odds request')
+    parser.add_argument('--server-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the server (repeatable)')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--keep-data', action='store_true', help='keep the temporary DATA_DIR and logs')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    data_dir = tempfile.mkdtemp(prefix='scoreleague-bench-')
+    procs = []
+    try:
+        started = time.perf_counter()
+        data = generate(args.users, args.bets_per_user, args.league_size, matches=args.matches, seed=args.seed)
+        for user in data['users'].values():
+            # Plenty of coins so the workload never runs into 'Insufficient coins'
+            user['coins'] = 1000000
+        data_file = os.path.join(data_dir, 'multiuser_data.json')
+        write(data, data_file)
+        dataset = counts(data)
+        dataset['fileBytes'] = os.path.getsize(data_file)
+        dataset['generateSeconds'] = round(time.perf_counter() - started, 3)
+        workload = Workload(data)
+        del data
+
+        mock_port = free_port()
+        procs.append(start_process([sys.executable, 'mock_api_server.py', '--host', '127.0.0.1', '--port', str(mock_port),
+                                    '--odds-latency-ms', str(args.odds_latency_ms), '--quiet'],
+                                   dict(os.environ), os.path.join(data_dir, 'mock_api.log')))
+        if not wait_http(f'http://127.0.0.1:{mock_port}/health', 15):
+            raise SystemExit('mock_api_server.py did not start')
+
+        port = free_port()
+        env = dict(os.environ,
+                   PORT=str(port),
+                   DATA_DIR=data_dir,
+                   SERVER_MODE=args.server_mode,
+                   PERSISTENCE_MODE=args.persistence_mode,
+                   ODDS_API_KEY='bench',
+                   ODDS_API_BASE=f'http://127.0.0.1:{mock_port}',
+                   ODDS_PREFETCH='0',
+                   LOG_PROXY_DEBUG='0')
+        for item in args.server_env:
+            key, _, value = item.partition('=')
+            env[key] = value
+        started = time.perf_counter()
+        procs.append(start_process([sys.executable, 'server_multiuser.py'], env, os.path.join(data_dir, 'server.log')))
+        base = f'http://127.0.0.1:{port}'
+        if not wait_http(base + '/api/health', 600):
+            raise SystemExit(f'server_multiuser.py did not start (see {data_dir}/server.log)')
+        startup_seconds = round(time.perf_counter() - started, 3)
+
+        ops = list(mix)
+        weights = [mix[op] for op in ops]
+        now = time.perf_counter()
+        record_after = now + args.warmup
+        deadline = record_after + args.duration
+        per_client = [({}, {}) for _ in range(args.clients)]
+        threads = [threading.Thread(target=run_client, args=(port, workload, ops, weights, deadline, record_after,
+                                                             per_client[i][0], per_client[i][1], args.seed + i,
+                                                             env.get('ADMIN_TOKEN')))
+                   for i in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        latencies, errors = {}, {}
+        for client_latencies, client_errors in per_client:
+            for op, values in client_latencies.items():
+                latencies.setdefault(op, []).extend(values)
+            for op, count in client_errors.items():
+                errors[op] = errors.get(op, 0) + count
+        total, routes = summarize(latencies, errors, args.duration)
+
+        persistence = get_json(base, '/api/debug/persistence') or {}
+        odds_cache = get_json(base, '/api/debug/odds-cache') or {}
+        upstream = get_json(f'http://127.0.0.1:{mock_port}', '/mock/stats')
+        report = {
+            'config': {
+                'clients': args.clients,
+                'durationSeconds': args.duration,
+                'warmupSeconds': args.warmup,
+                'serverMode': args.server_mode,
+                'persistenceMode': args.persistence_mode,
+                'oddsLatencyMs': args.odds_latency_ms,
+                'mix': mix,
+            },
+            'dataset': dataset,
+            'startupSeconds': startup_seconds,
+            'totalRequests': total,
+            'throughputRps': round(total / args.duration, 1),
+            'routes': routes,
+            'server': {
+                'persistence': persistence.get('persistence'),
+                'oddsCache': {k: v for k, v in (odds_cache.get('oddsCache') or {}).items() if k != 'keys'},
+                'upstreamRequests': upstream,
+            },
+        }
+        text = json.dumps(report, indent=2)
+        print(text)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text + '\n')
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(10)
+            except Exception:
+                proc.kill()
+        if args.keep_data:
+            print(f'Data and logs kept in {data_dir}', file=sys.stderr)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
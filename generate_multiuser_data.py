@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Synthetic multiuser_data.json generator and scaling profiler for server_multiuser.py.
+
+Generate mode writes a realistic data file at a chosen scale. It includes
+users, leagues with overlapping membership, matches in both the legacy
+(1x2/over_under/both_teams) and new (match_result/total_goals/
+both_teams_score) market formats, and pending and settled bets spread
+across them.
+
+Profile mode generates each scale in turn. A fresh process then times
+load_data, leaderboard serialization, settlement and save_data and records
+their tracemalloc peak, to show where the curves bend.
+
+Examples:
+    python3 generate_multiuser_data.py --users 100000 --out /tmp/data/multiuser_data.json
+    python3 generate_multiuser_data.py --profile 1000,10000,100000 --output profile.json
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TEAMS = ['FC Schalke 04', 'Hertha BSC', 'Hamburger SV', 'Fortuna Düsseldorf', '1. FC Köln', 'Hannover 96',
+         'Bayern München', 'Borussia Dortmund', 'RB Leipzig', 'Bayer Leverkusen', 'Arsenal', 'Chelsea',
+         'Liverpool', 'Manchester City', 'Leeds United', 'Sunderland', 'Burnley', 'Norwich City']
+LEAGUES = ['2. Bundesliga', 'Bundesliga', 'Championship', 'Premier League']
+SELECTIONS = {
+    # market name as stored on the bet -> selections clients send for it
+    'match_result': ('home', 'draw', 'away'),
+    '1x2': ('1', 'X', '2'),
+    'total_goals': ('over', 'under'),
+    'over_under': ('over', 'under'),
+    'btts': ('yes', 'no'),
+}
+
+
+def build_matches(count, legacy_ratio, rng):
+    """Matches in the legacy or new market format (legacy_ratio of them legacy)"""
+    matches = []
+    for i in range(count):
+        home, away = rng.sample(TEAMS, 2)
+        h, d, a = (round(rng.uniform(1.5, 4.5), 2) for _ in range(3))
+        over, under = round(rng.uniform(1.6, 2.2), 2), round(rng.uniform(1.6, 2.2), 2)
+        yes, no = round(rng.uniform(1.5, 2.3), 2), round(rng.uniform(1.5, 2.3), 2)
+        if rng.random() < legacy_ratio:
+            markets = {
+                '1x2': {'1': {'label': f'{home} Win', 'odds': h}, 'X': {'label': 'Draw', 'odds': d},
+                        '2': {'label': f'{away} Win', 'odds': a}},
+                'over_under': {'over': {'label': 'Over 2.5', 'odds': over}, 'under': {'label': 'Under 2.5', 'odds': under}},
+                'both_teams': {'yes': {'label': 'Both Score', 'odds': yes}, 'no': {'label': 'No Both Score', 'odds': no}},
+            }
+        else:
+            markets = {
+                'match_result': {'home': h, 'draw': d, 'away': a},
+                'total_goals': {'over': over, 'under': under},
+                'both_teams_score': {'yes': yes, 'no': no},
+            }
+        day = 1 + i % 28
+        matches.append({
+            'id': f'match_{i + 1}',
+            'homeTeam': home,
+            'awayTeam': away,
+            'league': rng.choice(LEAGUES),
+            'date': f'2024-08-{day:02d}',
+            'time': rng.choice(('13:30', '15:30', '18:30', '20:30')),
+            'status': 'upcoming',
+            'markets': markets,
+        })
+    return matches
+
+
+def generate(users, bets_per_user=5, league_size=10, leagues_per_user=1.5, matches=50,
+             legacy_ratio=0.5, pending_ratio=0.3, seed=42):
+    """A multiuser_data.json-shaped dict.
+
+    Bet counts per user vary around bets_per_user (0..2x). Each user joins
+    about leagues_per_user leagues of up to league_size members, and each bet
+    counts for the user's leagues. pending_ratio of the bets are unsettled.
+    """
+    rng = random.Random(seed)
+    data = {'users': {}, 'leagues': {}, 'matches': build_matches(matches, legacy_ratio, rng), 'bets': {}, 'version': '1.0'}
+    match_ids = [m['id'] for m in data['matches']]
+    user_ids = [f'user_gen{n:07d}' for n in range(users)]
+
+    # Leagues: each user creates or fills leagues until the membership budget is spent
+    memberships = {uid: [] for uid in user_ids}
+    slots = int(users * leagues_per_user)
+    order = user_ids * (int(leagues_per_user) + 1)
+    rng.shuffle(order)
+    league = None
+    for uid in order[:slots]:
+        if league is None or len(league['members']) >= league_size:
+            league_id = f'league_gen{len(data["leagues"]):06d}'
+            league = data['leagues'][league_id] = {
+                'id': league_id,
+                'name': f'League {len(data["leagues"])}',
+                'description': '',
+                'creatorId': uid,
+                'inviteCode': f'G{len(data["leagues"]):07d}',
+                'members': [],
+                'createdAt': '2024-08-01T12:00:00',
+                'settings': {'maxMembers': league_size},
+            }
+        if uid in league['members']:
+            continue
+        league['members'].append(uid)
+        memberships[uid].append(league['id'])
+
+    for n, uid in enumerate(user_ids):
+        bets = []
+        total_winnings = 0
+        biggest_win = 0
+        for b in range(rng.randint(0, 2 * bets_per_user)):
+            market = rng.choice(tuple(SELECTIONS))
+            odds = round(rng.uniform(1.5, 4.0), 2)
+            stake = rng.choice((10, 20, 25, 50, 100))
+            bet = {
+                'id': f'bet_gen{n:07d}_{b}',
+                'userId': uid,
+                'matchId': rng.choice(match_ids),
+                'market': market,
+                'selection': rng.choice(SELECTIONS[market]),
+                'odds': odds,
+                'stake': stake,
+                'potentialWin': round(stake * odds),
+                'placedAt': '2024-08-05T18:00:00',
+                'status': 'pending',
+                'leagueIds': list(memberships[uid]),
+            }
+            if rng.random() >= pending_ratio:
+                bet['status'] = 'won' if rng.random() < 0.35 else 'lost'
+                if bet['status'] == 'won':
+                    total_winnings += bet['potentialWin']
+                    biggest_win = max(biggest_win, bet['potentialWin'])
+            bets.append(bet)
+        if bets:
+            data['bets'][uid] = bets
+        data['users'][uid] = {
+            'id': uid,
+            'username': f'player{n}',
+            'coins': rng.randint(0, 5000),
+            'joinedAt': '2024-08-01T12:00:00',
+            'stats': {'totalBets': len(bets), 'totalWinnings': total_winnings, 'biggestWin': biggest_win,
+                      'totalCombinedOdds': 0},
+        }
+    return data
+
+
+def write(data, path, indent=None):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=indent, separators=(',', ':') if indent is None else None)
+
+
+def counts(data):
+    return {
+        'users': len(data['users']),
+        'leagues': len(data['leagues']),
+        'matches': len(data['matches']),
+        'bets': sum(len(b) for b in data['bets'].values()),
+        'pendingBets': sum(1 for b in data['bets'].values() for bet in b if bet['status'] == 'pending'),
+    }
+
+
+# --- Profiling ---------------------------------------------------------------
+def profile_run(data_dir, memory):
+    """Runs in a fresh process: time (and trace) server operations on DATA_DIR=data_dir"""
+    scratch = tempfile.mkdtemp(prefix='scoreleague-profile-')
+    os.environ.update(DATA_DIR=scratch, PERSISTENCE_MODE='snapshot', ODDS_PREFETCH='0')
+    sys.path.insert(0, HERE)
+    results = {}
+    # Server progress prints would corrupt the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        import server_multiuser as sm
+        os.environ['DATA_DIR'] = data_dir
+        rng = random.Random(7)
+
+        def measure(name, fn):
+            gc.collect()
+            if memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            extra = fn()
+            seconds = time.perf_counter() - started
+            result = {'seconds': round(seconds, 4)}
+            if memory:
+                result['peakMemoryMB'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+                tracemalloc.stop()
+            if extra:
+                result.update(extra)
+            results[name] = result
+
+        holder = {}
+
+        def load():
+            holder['server'] = sm.MultiUserGameServer()
+        measure('load_data', load)
+        server = holder['server']
+
+        def leaderboards():
+            league_ids = list(server.game_data['leagues'])
+            for league_id in league_ids:
+                server.get_leaderboard(league_id, 50, None)
+            return {'leagues': len(league_ids)}
+        measure('leaderboard', leaderboards)
+
+        def settle():
+            scores = [(m['id'], rng.randint(0, 4), rng.randint(0, 4)) for m in server.game_data['matches']]
+            summaries, records = server.settle_matches(scores)
+            return {'matches': len(scores), 'settledBets': sum(s['settled'] for s in summaries if s),
+                    'records': len(records)}
+        measure('settlement', settle)
+
+        def save():
+            server.save_data()
+            return {'fileBytes': os.path.getsize(server.data_file)}
+        measure('save_data', save)
+    results['maxRssMB'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    shutil.rmtree(scratch, ignore_errors=True)
+    print(json.dumps(results))
+
+
+def profile(scales, args):
+    report = {'tracemalloc': args.memory, 'scales': []}
+    for users in scales:
+        data_dir = tempfile.mkdtemp(prefix='scoreleague-gen-')
+        try:
+            started = time.perf_counter()
+            data = generate(users, args.bets_per_user, args.league_size, args.leagues_per_user, args.matches,
+                            args.legacy_ratio, args.pending_ratio, args.seed)
+            entry = {'users': users, 'dataset': counts(data), 'generateSeconds': round(time.perf_counter() - started, 3)}
+            write(data, os.path.join(data_dir, 'multiuser_data.json'))
+            del data
+            gc.collect()
+            argv = [sys.executable, os.path.abspath(__file__), '--profile-run', data_dir]
+            if not args.memory:
+                argv.append('--no-memory')
+            out = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            if out.returncode != 0:
+                entry['error'] = f'profile run exited with {out.returncode}'
+            else:
+                entry['operations'] = json.loads(out.stdout.strip().splitlines()[-1])
+            report['scales'].append(entry)
+            print(f"profiled {users} users", file=sys.stderr)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic multiuser_data.json files or profile scaling')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--bets-per-user', type=int, default=5, help='mean bets per user (0..2x)')
+    parser.add_argument('--league-size', type=int, default=10)
+    parser.add_argument('--leagues-per-user', type=float, default=1.5, help='mean league memberships per user')
+    parser.add_argument('--matches', type=int, default=50)
+    parser.add_argument('--legacy-ratio', type=float, default=0.5, help='share of matches in the legacy market format')
+    parser.add_argument('--pending-ratio', type=float, default=0.3, help='share of bets still pending')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='write the generated data file here')
+    parser.add_argument('--indent', type=int, default=None, help='JSON indent (the server writes indent=2)')
+    parser.add_argument('--profile', help='comma-separated user counts to profile, e.g. 1000,10000,100000')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='skip tracemalloc (faster, timing only)')
+    parser.add_argument('--output', help='write the profile report here as well as stdout')
+    parser.add_argument('--profile-run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile_run:
+        profile_run(args.profile_run, args.memory)
+        return
+    if args.profile:
+        scales = [int(s) for s in args.profile.split(',') if s.strip()]
+        text = json.dumps(profile(scales, args), indent=2)
+        print(text)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text + '\n')
+        return
+    if not args.out:
+        parser.error('--out is required when not profiling')
+    started = time.perf_counter()
+    data = generate(args.users, args.bets_per_user, args.league_size, args.leagues_per_user, args.matches,
+                    args.legacy_ratio, args.pending_ratio, args.seed)
+    write(data, args.out, args.indent)
+    summary = counts(data)
+    summary['fileBytes'] = os.path.getsize(args.out)
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
+import argparse
 import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
 
 # Simple in-memory balances keyed by userId
 BALANCES = {}
@@ -18,12 +23,65 @@ def set_balance(user_id, value):
     BALANCES[user_id] = max(0, int(value))
 
 
+# Stand-in for The Odds API (point ODDS_API_BASE at this server)
+ODDS_SETTINGS = {'latency_ms': 0, 'events': 10, 'bookmakers': 3, 'quiet': False}
+ODDS_REQUESTS = {'sports': 0, 'odds': 0}
+_ODDS_LOCK = threading.Lock()
+
+MOCK_SPORTS = [
+    {'key': 'soccer_germany_bundesliga2', 'group': 'Soccer', 'title': '2. Bundesliga'},
+    {'key': 'soccer_england_efl_champ', 'group': 'Soccer', 'title': 'Championship'},
+    {'key': 'soccer_germany_bundesliga', 'group': 'Soccer', 'title': 'Bundesliga'},
+    {'key': 'soccer_epl', 'group': 'Soccer', 'title': 'Premier League'},
+]
+
+
+def mock_sports():
+    return [dict(s, description=s['title'], active=True, has_outrights=False) for s in MOCK_SPORTS]
+
+
+def mock_odds(sport, markets):
+    """Deterministic Odds API style events for a sport (same sport -> same teams and prices)"""
+    rng = random.Random(sport)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(ODDS_SETTINGS['events']):
+        home, away = f"{sport} Home {i + 1}", f"{sport} Away {i + 1}"
+        bookmakers = []
+        for b in range(ODDS_SETTINGS['bookmakers']):
+            book_markets = []
+            if 'h2h' in markets:
+                book_markets.append({'key': 'h2h', 'outcomes': [
+                    {'name': home, 'price': round(rng.uniform(1.4, 4.5), 2)},
+                    {'name': away, 'price': round(rng.uniform(1.4, 4.5), 2)},
+                    {'name': 'Draw', 'price': round(rng.uniform(2.8, 4.2), 2)},
+                ]})
+            if 'totals' in markets:
+                book_markets.append({'key': 'totals', 'outcomes': [
+                    {'name': 'Over', 'price': round(rng.uniform(1.6, 2.3), 2), 'point': 2.5},
+                    {'name': 'Under', 'price': round(rng.uniform(1.6, 2.3), 2), 'point': 2.5},
+                ]})
+            bookmakers.append({'key': f'book{b + 1}', 'title': f'Bookmaker {b + 1}',
+                               'last_update': now.isoformat().replace('+00:00', 'Z'), 'markets': book_markets})
+        events.append({
+            'id': f'{sport}-{i + 1}',
+            'sport_key': sport,
+            'sport_title': sport,
+            'commence_time': (now + timedelta(hours=6 * (i + 1))).isoformat().replace('+00:00', 'Z'),
+            'home_team': home,
+            'away_team': away,
+            'bookmakers': bookmakers,
+        })
+    return events
+
+
 class Handler(BaseHTTPRequestHandler):
     server_version = "MockBetAPI/1.0"
 
     def log_message(self, format, *args):
         # Minimal console logging
-        print("[mock-api]", format % args)
+        if not ODDS_SETTINGS['quiet']:
+            print("[mock-api]", format % args)
 
     def _send_cors(self):
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -55,11 +113,35 @@ class Handler(BaseHTTPRequestHandler):
         self.end_headers()
 
     def do_GET(self):
-        path = urlparse(self.path).path
+        parsed = urlparse(self.path)
+        path = parsed.path
         if path in ('/health', '/api/health'):
             return self._send_json(200, {"ok": True, "service": "mock-api"})
+        if path == '/mock/stats':
+            with _ODDS_LOCK:
+                return self._send_json(200, dict(ODDS_REQUESTS))
+        # Odds API shape (/v4/...) and the ScoreLeague proxy shape (/api/odds...) return the same payloads
+        parts = [p for p in path.split('/') if p]
+        if parts in (['v4', 'sports'], ['api', 'odds', 'sports']):
+            return self._send_odds('sports', mock_sports())
+        params = parse_qs(parsed.query)
+        markets = (params.get('markets') or ['h2h,totals'])[0].split(',')
+        if len(parts) == 4 and parts[:2] == ['v4', 'sports'] and parts[3] == 'odds':
+            return self._send_odds('odds', mock_odds(unquote(parts[2]), markets))
+        if parts == ['api', 'odds']:
+            sport = (params.get('sport') or params.get('sportKey') or [''])[0]
+            if not sport:
+                return self._send_json(400, {"error": "Missing sport query param"})
+            return self._send_odds('odds', mock_odds(sport, markets))
         return self._send_text(404, 'Not Found')
 
+    def _send_odds(self, kind, data):
+        with _ODDS_LOCK:
+            ODDS_REQUESTS[kind] += 1
+        if ODDS_SETTINGS['latency_ms']:
+            time.sleep(ODDS_SETTINGS['latency_ms'] / 1000.0)
+        return self._send_json(200, data)
+
     def do_POST(self):
         path = urlparse(self.path).path
         if path == '/api/bets/place':
@@ -88,11 +170,24 @@ class Handler(BaseHTTPRequestHandler):
 
 
 def run(host='0.0.0.0', port=3000):
-    httpd = HTTPServer((host, port), Handler)
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
     print(f"[mock-api] Listening on http://{host}:{port}")
-    print("[mock-api] Endpoints:\n  GET  /health\n  POST /api/bets/place")
+    print("[mock-api] Endpoints:\n  GET  /health\n  POST /api/bets/place\n"
+          "  GET  /v4/sports/  GET /v4/sports/<sport>/odds/  (Odds API stand-in)\n"
+          "  GET  /api/odds/sports  GET /api/odds?sport=<sport>  (fallback proxy stand-in)\n"
+          "  GET  /mock/stats")
     httpd.serve_forever()
 
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser(description='Mock bet API and Odds API stand-in')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--odds-latency-ms', type=int, default=0, help='delay added to every odds response')
+    parser.add_argument('--events', type=int, default=10, help='events per sport')
+    parser.add_argument('--bookmakers', type=int, default=3, help='bookmakers per event')
+    parser.add_argument('--quiet', action='store_true', help='no per-request logging')
+    args = parser.parse_args()
+    ODDS_SETTINGS.update(latency_ms=args.odds_latency_ms, events=args.events, bookmakers=args.bookmakers, quiet=args.quiet)
+    run(args.host, args.port)
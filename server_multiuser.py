@@ -5,16 +5,38 @@ import json
 import os
 import threading
 import time
-from urllib.parse import urlparse, parse_qs, unquote, quote
-from datetime import datetime
+import contextlib
+import bisect
+import hashlib
+import base64
+import itertools
+import gzip
+import zlib
+import sqlite3
+from collections import OrderedDict, deque
+from collections.abc import Mapping, MutableMapping
+import sys
+from urllib.parse import urlparse, parse_qs, unquote, quote, urljoin, urlencode
+from datetime import datetime, timezone
 import uuid
-import urllib.request
-import urllib.error
+import http.client
+import ssl
+import select
+import asyncio
+import io
+import re
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 
 # Simple in-memory caches for odds endpoints to conserve API credits
 ODDS_CACHE_TTL = int(os.environ.get('ODDS_CACHE_TTL_SECONDS', '1800'))  # 30 minutes default
+# Override to point at a stand-in (e.g. mock_api_server.py) for local benchmarks
+ODDS_API_BASE = os.environ.get('ODDS_API_BASE', 'https://api.the-odds-api.com').rstrip('/')
 ODDS_SPORTS_CACHE = {'data': None, 'ts': 0}
-ODDS_CACHE = {}  # key -> {'data': list, 'ts': float}
+ODDS_CACHE_MAX_KEYS = int(os.environ.get('ODDS_CACHE_MAX_KEYS', '128'))
+ODDS_CACHE_MAX_BYTES = int(os.environ.get('ODDS_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Optional sqlite tier under DATA_DIR so cached odds survive restarts
+ODDS_DISK_CACHE = os.environ.get('ODDS_DISK_CACHE', '0').lower() in ('1', 'true', 'yes', 'on')
 
 # Optional lightweight debug logging for proxy paths
 LOG_PROXY_DEBUG = os.environ.get('LOG_PROXY_DEBUG', '0').lower() in ('1', 'true', 'yes', 'on')
@@ -25,11 +47,923 @@ def proxy_log(path, mode, detail=''):
         except Exception:
             pass
 
+# --- Metrics ------------------------------------------------------------------
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms, rendered in Prometheus text format"""
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._meta = {}  # name -> (type, help)
+        self._values = {}  # (name, labels) -> float for counters and gauges
+        self._hists = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        with self._lock:
+            self._values[(name, self._labels(labels))] = value
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, self._labels(labels))
+        with self._lock:
+            hist = self._hists.get(key)
+            if hist is None:
+                hist = self._hists[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+                    break
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    @staticmethod
+    def _format_labels(labels, extra=None):
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ''
+        def esc(v):
+            return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in pairs) + '}'
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+            hists = {k: list(v) for k, v in self._hists.items()}
+        by_name = {}
+        for (name, labels), value in values.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), hist in hists.items():
+            by_name.setdefault(name, []).append((labels, hist))
+        out = []
+        for name in sorted(by_name):
+            kind, help_text = self._meta.get(name, ('untyped', ''))
+            if help_text:
+                out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(by_name[name], key=lambda lv: lv[0]):
+                if kind != 'histogram':
+                    out.append(f'{name}{self._format_labels(labels)} {value if isinstance(value, int) else repr(float(value))}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, value):
+                    cumulative += count
+                    out.append(f'{name}_bucket{self._format_labels(labels, ("le", f"{bound:g}"))} {cumulative}')
+                out.append(f'{name}_bucket{self._format_labels(labels, ("le", "+Inf"))} {value[-1]}')
+                out.append(f'{name}_sum{self._format_labels(labels)} {value[-2]:.6f}')
+                out.append(f'{name}_count{self._format_labels(labels)} {value[-1]}')
+        return '\n'.join(out) + '\n'
+
+METRICS = Metrics()
+METRICS.describe('http_requests_total', 'counter', 'HTTP requests by method, route and status code')
+METRICS.describe('http_request_duration_seconds', 'histogram', 'HTTP request handling time by method and route')
+METRICS.describe('http_connections_active', 'gauge', 'Open client connections')
+METRICS.describe('process_threads', 'gauge', 'Live Python threads')
+METRICS.describe('odds_responses_total', 'counter', 'Odds proxy responses by route and X-Proxy-Mode')
+METRICS.describe('odds_cache_entries', 'gauge', 'Entries in the odds cache')
+METRICS.describe('odds_cache_bytes', 'gauge', 'Encoded bytes held by the odds cache')
+METRICS.describe('odds_cache_lookups_total', 'counter', 'Odds cache lookups by result (hit, stale, miss)')
+METRICS.describe('odds_cache_evictions_total', 'counter', 'Odds cache entries evicted by the LRU bounds')
+METRICS.describe('upstream_requests_total', 'counter', 'Upstream odds requests by host and status (error = no response)')
+METRICS.describe('upstream_request_duration_seconds', 'histogram', 'Upstream odds request time by host')
+METRICS.describe('upstream_connections_total', 'counter', 'Upstream pool connection events (created, reused, discarded, retries)')
+METRICS.describe('persist_write_duration_seconds', 'histogram', 'Time to write a journal batch or snapshot')
+METRICS.describe('persist_bytes_written_total', 'counter', 'Bytes written by kind (journal, snapshot)')
+METRICS.describe('persist_commit_latency_seconds', 'histogram', 'Time from the oldest commit in a batch until it is written')
+METRICS.describe('persist_pending_commits', 'gauge', 'Commits waiting for the persistence writer')
+
+# Expired odds entries younger than TTL + this are served as 'stale' while one refresh runs
+ODDS_STALE_TTL = int(os.environ.get('ODDS_STALE_TTL_SECONDS', str(ODDS_CACHE_TTL)))
+
+class UpstreamHTTPError(Exception):
+    """Upstream answered with an HTTP error status (body already read)"""
+    def __init__(self, code, body=''):
+        super().__init__(f'HTTP {code}')
+        self.code = code
+        self.body = body
+
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', '4'))  # idle connections kept per host
+UPSTREAM_POOL_IDLE_SECONDS = float(os.environ.get('UPSTREAM_POOL_IDLE_SECONDS', '55'))
+
+class UpstreamPool:
+    """Keep-alive HTTP(S) connections to upstream hosts, shared by all handler threads.
+
+    Idle connections are kept per (scheme, host, port) up to max_idle and are
+    dropped after idle_timeout or when the peer has closed them. A GET that
+    fails on a reused connection is retried once on a fresh one. The stats
+    counters are only changed under the lock; read them with get_stats().
+    """
+    RETRYABLE = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                 http.client.CannotSendRequest, ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, max_idle=UPSTREAM_POOL_SIZE, idle_timeout=UPSTREAM_POOL_IDLE_SECONDS):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle = {}  # (scheme, host, port) -> [(conn, last_used)]
+        self._lock = threading.Lock()
+        self._ssl = ssl.create_default_context()
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0, 'retries': 0, 'requests': 0}
+
+    def _count(self, event):
+        with self._lock:
+            self.stats[event] += 1
+
+    def _new_conn(self, origin, timeout):
+        scheme, host, port = origin
+        self._count('created')
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    @staticmethod
+    def _healthy(conn):
+        """An idle connection is usable if its socket has nothing to read (no EOF or stray bytes)"""
+        sock = conn.sock
+        if sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            return not readable
+        except Exception:
+            return False
+
+    def _checkout(self, origin, timeout):
+        now = time.time()
+        while True:
+            with self._lock:
+                idle = self._idle.get(origin)
+                conn, last_used = idle.pop() if idle else (None, 0)
+            if conn is None:
+                # Connect outside the lock: _new_conn counts under it, and other threads need not wait
+                return self._new_conn(origin, timeout), False
+            if now - last_used < self.idle_timeout and self._healthy(conn):
+                self._count('reused')
+                conn.timeout = timeout
+                conn.sock.settimeout(timeout)
+                return conn, True
+            self._count('discarded')
+            conn.close()
+
+    def _checkin(self, origin, conn):
+        with self._lock:
+            idle = self._idle.setdefault(origin, [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.time()))
+                return
+            self.stats['discarded'] += 1
+        conn.close()
+
+    def request(self, url, timeout, headers=None, max_redirects=3):
+        """GET url; returns (status, headers, body bytes) with redirects followed"""
+        for _ in range(max_redirects + 1):
+            parts = urlparse(url)
+            scheme = parts.scheme or 'http'
+            origin = (scheme, parts.hostname, parts.port or (443 if scheme == 'https' else 80))
+            target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+            status, resp_headers, body = self._request_once(origin, target, timeout, headers or {})
+            location = resp_headers.get('Location')
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return status, resp_headers, body
+        return status, resp_headers, body
+
+    def _request_once(self, origin, target, timeout, headers):
+        self._count('requests')
+        conn, reused = self._checkout(origin, timeout)
+        try:
+            try:
+                conn.request('GET', target, headers=headers)
+                resp = conn.getresponse()
+            except self.RETRYABLE:
+                conn.close()
+                if not reused:
+                    raise
+                # The peer dropped a pooled connection between our health check and the request
+                self._count('retries')
+                conn = self._new_conn(origin, timeout)
+                conn.request('GET', target, headers=headers)
+                resp = conn.getresponse()
+            body = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(origin, conn)
+        if (resp.getheader('Content-Encoding') or '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        return resp.status, resp.headers, body
+
+    def get_stats(self):
+        with self._lock:
+            idle = {f"{scheme}://{host}:{port}": len(conns) for (scheme, host, port), conns in self._idle.items()}
+            stats = dict(self.stats)
+        return dict(stats, idle=idle, maxIdle=self.max_idle, idleTimeoutSeconds=self.idle_timeout)
+
+UPSTREAM_POOL = UpstreamPool()
+UPSTREAM_HEADERS = {'User-Agent': 'ScoreLeague/1.0', 'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+
+def fetch_upstream_json(url, timeout):
+    """GET a JSON document from the Odds API or the fallback proxy over a pooled connection"""
+    host = urlparse(url).hostname or ''
+    started = time.perf_counter()
+    try:
+        status, _, body = UPSTREAM_POOL.request(url, timeout, headers=UPSTREAM_HEADERS)
+    except Exception:
+        METRICS.inc('upstream_requests_total', {'host': host, 'status': 'error'})
+        raise
+    finally:
+        METRICS.observe('upstream_request_duration_seconds', time.perf_counter() - started, {'host': host})
+    METRICS.inc('upstream_requests_total', {'host': host, 'status': str(status)})
+    if status >= 400:
+        raise UpstreamHTTPError(status, body.decode('utf-8', errors='replace'))
+    return json.loads(body.decode('utf-8'))
+
+async def read_chunked(reader, max_bytes):
+    """Read a Transfer-Encoding: chunked body (trailers skipped); ValueError if malformed or over max_bytes"""
+    parts = []
+    size_total = 0
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        try:
+            size = int(line.split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            raise ValueError('bad chunk size') from None
+        if size < 0:
+            raise ValueError('bad chunk size')
+        if size == 0:
+            while await reader.readuntil(b'\r\n') != b'\r\n':
+                pass
+            return b''.join(parts)
+        size_total += size
+        if size_total > max_bytes:
+            raise ValueError('chunked body too large')
+        parts.append(await reader.readexactly(size))
+        if await reader.readexactly(2) != b'\r\n':
+            raise ValueError('bad chunk terminator')
+
+UPSTREAM_MAX_BODY_BYTES = 64 * 1024 * 1024
+
+class AsyncUpstreamPool:
+    """UpstreamPool for the asyncio server: keep-alive HTTP/1.1 GETs on asyncio streams.
+
+    Same pooling rules as UpstreamPool (max_idle per origin, idle_timeout,
+    one retry on a reused connection). It is only used from the event loop
+    thread, so it needs no lock.
+    """
+    RETRYABLE = (ConnectionError, asyncio.IncompleteReadError)
+
+    def __init__(self, max_idle=UPSTREAM_POOL_SIZE, idle_timeout=UPSTREAM_POOL_IDLE_SECONDS):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle = {}  # (scheme, host, port) -> [((reader, writer), last_used)]
+        self._ssl = ssl.create_default_context()
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0, 'retries': 0, 'requests': 0}
+
+    async def _new_conn(self, origin):
+        scheme, host, port = origin
+        self.stats['created'] += 1
+        return await asyncio.open_connection(host, port, ssl=self._ssl if scheme == 'https' else None)
+
+    def _checkout(self, origin):
+        now = time.time()
+        idle = self._idle.get(origin) or []
+        while idle:
+            conn, last_used = idle.pop()
+            reader, writer = conn
+            if now - last_used < self.idle_timeout and not reader.at_eof() and not writer.is_closing():
+                self.stats['reused'] += 1
+                return conn
+            self.stats['discarded'] += 1
+            writer.close()
+        return None
+
+    def _checkin(self, origin, conn):
+        idle = self._idle.setdefault(origin, [])
+        if len(idle) < self.max_idle:
+            idle.append((conn, time.time()))
+            return
+        self.stats['discarded'] += 1
+        conn[1].close()
+
+    async def request(self, url, timeout, headers=None, max_redirects=3):
+        """GET url; returns (status, headers, body bytes) with redirects followed"""
+        for _ in range(max_redirects + 1):
+            parts = urlparse(url)
+            scheme = parts.scheme or 'http'
+            origin = (scheme, parts.hostname, parts.port or (443 if scheme == 'https' else 80))
+            target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+            status, resp_headers, body = await self._request_once(origin, target, timeout, headers or {})
+            location = resp_headers.get('Location')
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return status, resp_headers, body
+        return status, resp_headers, body
+
+    async def _request_once(self, origin, target, timeout, headers):
+        self.stats['requests'] += 1
+        conn = self._checkout(origin)
+        reused = conn is not None
+        try:
+            if conn is None:
+                conn = await asyncio.wait_for(self._new_conn(origin), timeout)
+            try:
+                status, resp_headers, body, keep_alive = await asyncio.wait_for(
+                    self._exchange(conn, origin, target, headers), timeout)
+            except self.RETRYABLE:
+                conn[1].close()
+                if not reused:
+                    raise
+                # The peer dropped a pooled connection while it sat idle
+                self.stats['retries'] += 1
+                conn = await asyncio.wait_for(self._new_conn(origin), timeout)
+                status, resp_headers, body, keep_alive = await asyncio.wait_for(
+                    self._exchange(conn, origin, target, headers), timeout)
+        except BaseException:
+            if conn is not None:
+                conn[1].close()
+            raise
+        if keep_alive:
+            self._checkin(origin, conn)
+        else:
+            conn[1].close()
+        if (resp_headers.get('Content-Encoding') or '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        return status, resp_headers, body
+
+    @staticmethod
+    async def _exchange(conn, origin, target, headers):
+        """Send one GET and read its response; returns (status, headers, body, keep_alive)"""
+        reader, writer = conn
+        scheme, host, port = origin
+        host_header = host if port == (443 if scheme == 'https' else 80) else f"{host}:{port}"
+        lines = [f"GET {target} HTTP/1.1", f"Host: {host_header}"] + [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            status_line, _, rest = head.partition(b'\r\n')
+            parts = status_line.split(None, 2)
+            if len(parts) < 2 or not parts[0].startswith(b'HTTP/') or not parts[1].isdigit():
+                raise http.client.BadStatusLine(status_line.decode('latin-1', errors='replace'))
+            status = int(parts[1])
+            if not 100 <= status < 200:
+                break  # skip interim 1xx responses
+        resp_headers = http.client.parse_headers(io.BytesIO(rest))
+        connection = (resp_headers.get('Connection') or '').lower()
+        keep_alive = parts[0] == b'HTTP/1.1' and 'close' not in connection
+        if status in (204, 304):
+            body = b''
+        elif 'chunked' in (resp_headers.get('Transfer-Encoding') or '').lower():
+            body = await read_chunked(reader, UPSTREAM_MAX_BODY_BYTES)
+        elif resp_headers.get('Content-Length') is not None:
+            body = await reader.readexactly(int(resp_headers['Content-Length']))
+        else:
+            body = await reader.read()  # delimited by connection close
+            keep_alive = False
+        return status, resp_headers, body, keep_alive
+
+    def get_stats(self):
+        idle = {f"{scheme}://{host}:{port}": len(conns) for (scheme, host, port), conns in self._idle.items()}
+        return dict(self.stats, idle=idle, maxIdle=self.max_idle, idleTimeoutSeconds=self.idle_timeout)
+
+ASYNC_UPSTREAM_POOL = AsyncUpstreamPool()
+
+async def fetch_upstream_async(url, timeout):
+    """fetch_upstream_json for the event loop: returns the body bytes, left to the caller to parse off the loop"""
+    host = urlparse(url).hostname or ''
+    started = time.perf_counter()
+    try:
+        status, _, body = await ASYNC_UPSTREAM_POOL.request(url, timeout, headers=UPSTREAM_HEADERS)
+    except Exception:
+        METRICS.inc('upstream_requests_total', {'host': host, 'status': 'error'})
+        raise
+    finally:
+        METRICS.observe('upstream_request_duration_seconds', time.perf_counter() - started, {'host': host})
+    METRICS.inc('upstream_requests_total', {'host': host, 'status': str(status)})
+    if status >= 400:
+        raise UpstreamHTTPError(status, body.decode('utf-8', errors='replace'))
+    return body
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller (the leader) runs fn; everyone else arriving while it runs
+    waits and receives the same result or exception.
+    """
+    class _Call:
+        __slots__ = ('event', 'result', 'error')
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+ODDS_FLIGHTS = SingleFlight()
+
+def odds_cache_state(entry):
+    """'fresh', 'stale' (expired but still servable) or None for an odds cache entry"""
+    if not entry or not isinstance(entry.get('data'), list) or not entry['data']:
+        return None
+    age = time.time() - entry.get('ts', 0)
+    if age < ODDS_CACHE_TTL:
+        return 'fresh'
+    if age < ODDS_CACHE_TTL + ODDS_STALE_TTL:
+        return 'stale'
+    return None
+
+def fetch_odds_into_cache(cache_key, url, timeout=15):
+    """Fetch one odds list and store it when non-empty (run under ODDS_FLIGHTS)"""
+    return store_odds(cache_key, fetch_upstream_json(url, timeout))
+
+def store_odds(cache_key, data):
+    """Cache a fetched odds list when non-empty and tell stream subscribers; returns data"""
+    if isinstance(data, list) and data:
+        ODDS_CACHE.put(cache_key, data)
+        if EVENTS.has_subscribers():
+            sport = cache_key.split('|', 1)[0]
+            EVENTS.publish('odds', {'sport': sport, 'cacheKey': cache_key, 'events': len(data), 'ts': time.time()},
+                           sport=sport)
+    return data
+
+def store_sports(data):
+    if isinstance(data, list) and data:
+        ts = time.time()
+        body = CachedBody(encode_json(data))
+        ODDS_SPORTS_CACHE.update({'data': data, 'ts': ts, 'body': body, 'body_ts': ts})
+        if ODDS_DISK is not None:
+            ODDS_DISK.store('sports_list', ts, body.body)
+    return data
+
+_SPORTS_WARMED = threading.Event()
+
+def warm_sports_cache():
+    """Load the sports list from the disk tier once, on first use after startup"""
+    if ODDS_DISK is None or _SPORTS_WARMED.is_set():
+        return
+    _SPORTS_WARMED.set()
+    row = ODDS_DISK.load('sports_list')
+    if row is None or ODDS_SPORTS_CACHE.get('data'):
+        return
+    ts, raw = row
+    try:
+        data = json.loads(raw.decode('utf-8'))
+    except Exception:
+        return
+    if isinstance(data, list) and data:
+        ODDS_SPORTS_CACHE.update({'data': data, 'ts': ts, 'body': CachedBody(raw), 'body_ts': ts})
+
+def canonical_odds_list(value):
+    """'totals, H2H,h2h' -> 'h2h,totals' so reordered query params share a cache entry"""
+    return ','.join(sorted({p.strip().lower() for p in str(value or '').split(',') if p.strip()}))
+
+def odds_cache_key(sport, regions, markets, odds_format):
+    return f"{sport}|{canonical_odds_list(regions)}|{canonical_odds_list(markets)}|{str(odds_format).strip().lower()}"
+
+def odds_api_url(sport, regions, markets, odds_format, api_key):
+    return (
+        f"{ODDS_API_BASE}/v4/sports/{quote(sport)}/odds/"
+        f"?regions={regions}&markets={markets}&oddsFormat={odds_format}&apiKey={api_key}"
+    )
+
+def refresh_in_background(flight_key, fn, path):
+    """Stale-while-revalidate: start one refresh for flight_key unless one is running"""
+    if ODDS_FLIGHTS.in_flight(flight_key):
+        return
+    def run():
+        try:
+            ODDS_FLIGHTS.do(flight_key, fn)
+            proxy_log(path, 'refresh', f"key={flight_key}")
+        except Exception as ex:
+            proxy_log(path, 'refresh-error', f"key={flight_key} {type(ex).__name__}")
+    threading.Thread(target=run, name='odds-refresh', daemon=True).start()
+
+class UpstreamDeferred(BaseException):
+    """Raised by a handler under AsyncHTTPServer to hand an upstream fetch to the event loop.
+
+    A BaseException so the handlers' broad `except Exception` fallbacks let it
+    through; the server awaits the fetch and runs the handler again.
+    """
+    def __init__(self, flight_key, url, store, timeout):
+        super().__init__(flight_key)
+        self.flight_key = flight_key
+        self.url = url
+        self.store = store
+        self.timeout = timeout
+
+# Persistence mode: 'snapshot' rewrites the whole data file on every mutation,
+# 'journal' appends one compact record per mutation and compacts in the background,
+# 'sqlite' upserts the affected rows of a WAL-mode database (see sqlite_storage.py)
+PERSISTENCE_MODE = os.environ.get('PERSISTENCE_MODE', 'snapshot').strip().lower()
+JOURNAL_COMPACT_SECONDS = int(os.environ.get('JOURNAL_COMPACT_SECONDS', '300'))
+JOURNAL_COMPACT_BYTES = int(os.environ.get('JOURNAL_COMPACT_BYTES', str(4 * 1024 * 1024)))
+SQLITE_PATH = os.environ.get('SQLITE_PATH', '')  # default: DATA_DIR/multiuser_data.sqlite3
+# Group commit: the writer thread coalesces all commits that arrive within this window
+PERSIST_WINDOW_MS = int(os.environ.get('PERSIST_WINDOW_MS', '50'))
+PERSIST_DURABLE_TIMEOUT = float(os.environ.get('PERSIST_DURABLE_TIMEOUT_SECONDS', '5'))
+# Startup: parse the snapshot section by section instead of one json.load of the whole file.
+# SETTLED_HISTORY=lazy keeps settled bets as compact JSON until a user's bet list is first read.
+LOAD_STREAMING = os.environ.get('LOAD_STREAMING', '1').lower() in ('1', 'true', 'yes', 'on')
+LOAD_CHUNK_BYTES = int(os.environ.get('LOAD_CHUNK_BYTES', str(1024 * 1024)))
+SETTLED_HISTORY = os.environ.get('SETTLED_HISTORY', 'eager').strip().lower()
+# Delta sync (?since=): changes remembered per user; older clients get a full resync
+CHANGE_FEED_PER_USER = int(os.environ.get('CHANGE_FEED_PER_USER', '256'))
+
+class JSONStreamReader:
+    """Incremental reader for one large JSON document.
+
+    Reads the file in chunks and decodes a single value at a time with
+    raw_decode, so callers can walk the top-level object and the big
+    collections inside it without holding the whole text in memory.
+    """
+    _WS = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, path, chunk_size=LOAD_CHUNK_BYTES, progress=None):
+        self.size = os.path.getsize(path)
+        self.bytes_read = 0
+        self.chunk_size = max(4096, chunk_size)
+        self.progress = progress
+        self._fh = open(path, 'rb')
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        # One key table for the whole document, as a single json.load would share them
+        self._keys = {}
+        self._json = json.JSONDecoder(object_pairs_hook=self._object)
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def close(self):
+        self._fh.close()
+
+    def _object(self, pairs):
+        keys = self._keys
+        return {keys.setdefault(k, k): v for k, v in pairs}
+
+    def _fill(self, size):
+        if self._eof:
+            return False
+        chunk = self._fh.read(size)
+        self.bytes_read += len(chunk)
+        self._eof = not chunk
+        self._buf = self._buf[self._pos:] + self._text.decode(chunk, final=self._eof)
+        self._pos = 0
+        if self.progress:
+            self.progress(self.bytes_read, self.size)
+        return True
+
+    def peek(self):
+        """Next non-whitespace character ('' at the end of the input)"""
+        while True:
+            self._pos = self._WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self.chunk_size):
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f'expected {char!r} at byte ~{self.bytes_read}, found {found!r}')
+        self._pos += 1
+
+    def value(self):
+        """Decode the complete JSON value at the cursor"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+                # A number or literal that ends exactly at the buffer edge may continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            # Grow the read size so one big value costs O(log n) retries, not O(n)
+            self._fill(size)
+            size *= 2
+
+    def keys(self):
+        """Iterate the keys of the object at the cursor; read each value before advancing"""
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() != ',':
+                self.expect('}')
+                return
+            self._pos += 1
+
+    def items(self):
+        """Iterate the positions of the array at the cursor; read each element before advancing"""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() != ',':
+                self.expect(']')
+                return
+            self._pos += 1
+
+class UserChangeLog:
+    """Recent (version, kind, key) changes for one user; floor is the newest version no longer kept"""
+    __slots__ = ('floor', 'entries')
+
+    def __init__(self, floor):
+        self.floor = floor
+        self.entries = deque()
+
+    def add(self, version, kind, key):
+        if len(self.entries) >= CHANGE_FEED_PER_USER:
+            self.floor = self.entries.popleft()[0]
+        self.entries.append((version, kind, key))
+
+class CommitFuture:
+    """Completion handle for one commit() call"""
+    def __init__(self):
+        self._event = threading.Event()
+        self.ok = None
+
+    def set_result(self, ok):
+        self.ok = ok
+        self._event.set()
+
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the batch holding this commit hit the disk; True if it was written"""
+        return self._event.wait(timeout) and bool(self.ok)
+
+# Concurrency: per-ID striped locks for users and leagues, one reader/writer lock for matches.
+# Lock order is always match lock -> user stripe -> league stripe.
+LOCK_STRIPES = int(os.environ.get('LOCK_STRIPES', '64'))
+
+class StripedLock:
+    """Fixed pool of re-entrant locks; every key maps onto one stripe"""
+    def __init__(self, stripes=LOCK_STRIPES):
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+
+    def __call__(self, key):
+        return self._locks[hash(str(key)) % len(self._locks)]
+
+class RWLock:
+    """Readers/writer lock: many concurrent readers or one writer (writers take priority)"""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def read_lock(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write_lock(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+# Compact in-memory records: users, leagues and bets are stored as __slots__ objects
+# instead of dicts. Set COMPACT_RECORDS=0 to keep plain dicts.
+COMPACT_RECORDS = os.environ.get('COMPACT_RECORDS', '1').lower() in ('1', 'true', 'yes', 'on')
+
+class Record(MutableMapping):
+    """Dict-compatible record stored in __slots__.
+
+    Handlers keep using record['coins'], record.get('status'), **record and
+    so on. Only dicts whose keys are exactly FIELDS, in that order, are
+    converted (see compact), so every record has all its fields and
+    iterates them in the order the dict had. Encoding through record_json
+    therefore gives byte-for-byte the JSON the dict gave. Anything else
+    (older or hand-edited shapes) stays a plain dict.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    INTERNED = ()  # string fields with few distinct values, shared via sys.intern
+
+    @classmethod
+    def compact(cls, data):
+        if not COMPACT_RECORDS or type(data) is not dict or tuple(data) != cls.FIELDS:
+            return data
+        record = cls.__new__(cls)
+        for key, value in data.items():
+            if key in cls.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            object.__setattr__(record, key, value)
+        return record
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._FIELD_SET else default
+
+    def __setitem__(self, key, value):
+        if key not in self._FIELD_SET:
+            raise KeyError(f'{type(self).__name__} has no field {key!r}')
+        object.__setattr__(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError(f'{type(self).__name__} fields cannot be removed')
+
+    def __contains__(self, key):
+        return key in self._FIELD_SET
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+class UserStats(Record):
+    FIELDS = ('totalBets', 'totalWinnings', 'biggestWin', 'totalCombinedOdds')
+    __slots__ = FIELDS
+
+class User(Record):
+    FIELDS = ('id', 'username', 'coins', 'joinedAt', 'stats')
+    __slots__ = FIELDS
+    INTERNED = ('id',)
+
+    @classmethod
+    def compact(cls, data):
+        record = super().compact(data)
+        if record is not data:
+            record.stats = UserStats.compact(record.stats)
+        return record
+
+class League(Record):
+    FIELDS = ('id', 'name', 'description', 'creatorId', 'inviteCode', 'members', 'createdAt', 'settings')
+    __slots__ = FIELDS
+    INTERNED = ('id', 'creatorId')
+
+class Bet(Record):
+    FIELDS = ('id', 'userId', 'matchId', 'market', 'selection', 'odds', 'stake', 'potentialWin',
+              'placedAt', 'status', 'leagueIds')
+    __slots__ = FIELDS
+    INTERNED = ('userId', 'matchId', 'market', 'selection', 'status')
+
+    @classmethod
+    def compact(cls, data):
+        record = super().compact(data)
+        if record is not data and type(record.leagueIds) is list and all(type(x) is str for x in record.leagueIds):
+            # Serializes as the same JSON array; a tuple is smaller and all of a user's bets can share one
+            league_ids = tuple(sys.intern(x) for x in record.leagueIds)
+            record.leagueIds = _LEAGUE_IDS.setdefault(league_ids, league_ids)
+        return record
+
+_LEAGUE_IDS = {}
+
+def merge_at_positions(live, history, positions):
+    """Interleave history items (ascending original positions) back into live, which keeps the rest in order"""
+    merged, taken = [], 0
+    for item, position in zip(history, positions):
+        take = max(0, min(position - len(merged), len(live) - taken))
+        merged.extend(live[taken:taken + take])
+        taken += take
+        merged.append(item)
+    merged.extend(live[taken:])
+    return merged
+
+def record_json(obj):
+    """json.dumps default= hook: records encode as the dict they replace"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
 class MultiUserGameServer:
     def __init__(self):
         # Allow overriding data directory for cloud hosts with persistent disks
         data_dir = os.environ.get('DATA_DIR', '.')
         self.data_file = os.path.join(data_dir, 'multiuser_data.json')
+        self.journal_file = os.path.join(data_dir, 'multiuser_data.journal')
+        self.journal_mode = PERSISTENCE_MODE == 'journal'
+        self.storage = None
+        if PERSISTENCE_MODE == 'sqlite':
+            from sqlite_storage import SQLiteStorage
+            self.storage = SQLiteStorage(SQLITE_PATH or os.path.join(data_dir, 'multiuser_data.sqlite3'),
+                                         json_default=record_json)
+        self._journal_lock = threading.Lock()
+        self._journal_fh = None
+        self._snapshot_lock = threading.Lock()
+        self.user_locks = StripedLock()
+        self.league_locks = StripedLock()
+        self.match_lock = RWLock()
+        # Pending commits for the writer thread: list of (records, future, enqueued_at)
+        self._commit_cond = threading.Condition()
+        self._pending = []
+        self.persist_stats = {
+            'commits': 0,
+            'batches': 0,
+            'records': 0,
+            'lastBatchSize': 0,
+            'maxBatchSize': 0,
+            'lastLatencyMs': 0.0,
+            'maxLatencyMs': 0.0,
+            'totalLatencyMs': 0.0,
+            'errors': 0
+        }
+        threading.Thread(target=self._writer_loop, name='persistence-writer', daemon=True).start()
         self.game_data = {
             'users': {},
             'leagues': {},
@@ -38,30 +972,1060 @@ class MultiUserGameServer:
             'version': '1.0.0',
             'lastUpdated': datetime.now().isoformat()
         }
+        # Secondary indexes over game_data, rebuilt on load and kept in sync by the index_* helpers
+        self.users_by_name = {}      # username -> user
+        self.leagues_by_invite = {}  # inviteCode -> league
+        self.matches_by_id = {}      # str(matchId) -> match
+        self.bets_by_id = {}         # betId -> (userId, bet)
+        self.pending_by_match = {}   # str(matchId) -> {betId: (userId, bet, market, selection)}
+        self.pending_by_user = {}    # userId -> {betId: bet}
+        # Cursor pages: userId -> {status or None (all): ([bet_page_key], [bet])} sorted by key,
+        # built on a user's first page request and then kept up to date on place, settle and reset
+        self.bet_pages = {}
+        self._match_index = None     # (matches version, kickoff-sorted lists; see match_index)
+        self.leagues_by_user = {}    # userId -> {leagueId: league}
+        self._league_order = {}      # leagueId -> creation sequence
+        # Materialized leaderboards, maintained on placement, settlement, join and reset
+        self.league_stats = {}       # leagueId -> {userId: {'bets', 'winnings', 'totalStaked'}}
+        self.league_rankings = {}    # leagueId -> [(-coins, memberPos, userId)] sorted
+        # SETTLED_HISTORY=lazy: userId -> {'count': n, 'leagues': {leagueId: totals}, 'raw': [compact JSON
+        # per bet], 'ids': [betId], 'positions': [index in the user's bet list]}; raw/ids/positions are
+        # None when the history stays in SQLite
+        self.deferred_bets = {}
+        self._deferred_lock = threading.Lock()
+        self.load_stats = {}
+        # Resource versions for the response cache ('matches', 'league:<id>')
+        self._version_seq = itertools.count(1)
+        self.versions = {}
+        # Global change version for ?since= delta sync. It starts from the clock (microseconds) so it keeps
+        # increasing across restarts; since values below change_floor predate this process and resync fully.
+        self.change_version = int(time.time() * 1000000)
+        self.change_floor = self.change_version
+        self.user_changes = {}  # userId -> UserChangeLog
         self.load_data()
         self.initialize_demo_matches()
+        if self.journal_mode:
+            threading.Thread(target=self._compactor_loop, name='journal-compactor', daemon=True).start()
     
     def load_data(self):
-        """Load existing game data"""
+        """Load existing game data (snapshot first, then replay any journal)"""
+        started = time.perf_counter()
+        indexed = False
+        if self.storage is not None:
+            return self._load_storage(started)
         try:
             if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    loaded_data = json.load(f)
-                    self.game_data.update(loaded_data)
+                if LOAD_STREAMING:
+                    self._stream_snapshot()
+                    indexed = True
+                else:
+                    with open(self.data_file, 'r') as f:
+                        loaded_data = json.load(f)
+                        self.game_data.update(loaded_data)
                 print('✅ Loaded existing game data')
         except Exception as e:
             print(f'⚠️ Could not load existing data: {e}')
+            if LOAD_STREAMING:
+                # Drop whatever the stream got through before the error
+                for key, empty in (('users', {}), ('leagues', {}), ('matches', []), ('bets', {})):
+                    self.game_data[key] = empty
+                self.deferred_bets = {}
+        replayed = 0
+        if not indexed:
+            self.compact_records()
+        if self.journal_mode:
+            replayed = self._replay_journal()
+            if replayed:
+                # The compactor folds these into the snapshot later; booting writes nothing
+                print(f'📜 Replayed {replayed} journal records')
+        if replayed or not indexed:
+            self.rebuild_indexes()
+        self.load_stats['seconds'] = round(time.perf_counter() - started, 3)
+        self.load_stats['mode'] = 'stream' if LOAD_STREAMING else 'json'
+
+    def _load_storage(self, started):
+        """Load game_data from the SQLite backend, indexing rows as they stream in.
+
+        An empty database is seeded from multiuser_data.json first. With
+        SETTLED_HISTORY=lazy only pending bets are read; settled history stays
+        on disk (summarized per league) until a user's bet list is needed.
+        """
+        storage = self.storage
+        try:
+            if storage.is_empty() and os.path.exists(self.data_file):
+                print(f'🗄️ Importing {self.data_file} into {storage.path}')
+                storage.import_file(self.data_file)
+            data = self.game_data
+            self._reset_indexes()
+            self.deferred_bets = {}
+            data.update(storage.meta())
+            counts = {'users': 0, 'leagues': 0, 'matches': 0, 'bets': 0, 'deferred': 0}
+            users = data['users'] = {}
+            for user_id, doc in storage.rows('users'):
+                user = users[user_id] = User.compact(doc)
+                self.index_user(user)
+                counts['users'] += 1
+            leagues = data['leagues'] = {}
+            for league_id, doc in storage.rows('leagues'):
+                leagues[league_id] = League.compact(doc)
+                counts['leagues'] += 1
+            matches = data['matches'] = []
+            for _, match in storage.rows('matches'):
+                matches.append(match)
+                self.index_match(match)
+                counts['matches'] += 1
+            lazy = SETTLED_HISTORY == 'lazy'
+            bets = data['bets'] = {}
+            for user_id, doc in storage.rows('bets', pending_only=lazy):
+                bet = Bet.compact(doc)
+                bets.setdefault(user_id, []).append(bet)
+                self.index_bet(user_id, bet)
+                counts['bets'] += 1
+            if lazy:
+                for user_id, summary in storage.settled_summary().items():
+                    self.deferred_bets[user_id] = dict(summary, raw=None, ids=None, positions=None)
+                    bets.setdefault(user_id, [])
+                    counts['deferred'] += summary['count']
+            for league in leagues.values():
+                if isinstance(league, Mapping):
+                    self.index_league(league)
+            deferred = f", {counts['deferred']:,} settled left on disk" if lazy else ''
+            print(f"🗄️ Loaded {counts['users']:,} users, {counts['leagues']:,} leagues, "
+                  f"{counts['matches']:,} matches, {counts['bets']:,} bets from SQLite{deferred}")
+            self.load_stats.update(counts)
+        except Exception as e:
+            print(f'⚠️ Could not load data from SQLite: {e}')
+            self.rebuild_indexes()
+        self.load_stats['seconds'] = round(time.perf_counter() - started, 3)
+        self.load_stats['mode'] = 'sqlite'
+
+    def _stream_snapshot(self):
+        """Parse the snapshot section by section, indexing each record as it arrives.
+
+        Only one user's record (or one user's bet list) is decoded at a time,
+        so peak memory stays close to the size of the resulting game_data
+        instead of file text + parsed copy. Leagues are indexed after the bet
+        section because their leaderboard aggregates are seeded from bets.
+        """
+        data = self.game_data
+        counts = {'users': 0, 'leagues': 0, 'matches': 0, 'bets': 0, 'deferred': 0}
+        last_step = [0]
+
+        def progress(done, total):
+            # Progress lines only for files big enough to take a while
+            if total < 8 * LOAD_CHUNK_BYTES:
+                return
+            step = min(10, done * 10 // max(1, total))
+            if step > last_step[0]:
+                last_step[0] = step
+                print(f'⏳ Loading game data: {step * 10}% ({done / 1048576:.1f}/{total / 1048576:.1f} MB)')
+
+        self._reset_indexes()
+        self.deferred_bets = {}
+        leagues = []
+        reader = JSONStreamReader(self.data_file, progress=progress)
+        try:
+            for key in reader.keys():
+                kind = reader.peek()
+                if key in ('users', 'leagues') and kind == '{':
+                    section = data[key] = {}
+                    compact = User.compact if key == 'users' else League.compact
+                    for item_id in reader.keys():
+                        item = section[item_id] = compact(reader.value())
+                        counts[key] += 1
+                        if not isinstance(item, Mapping):
+                            continue
+                        if key == 'users':
+                            self.index_user(item)
+                        else:
+                            leagues.append(item)
+                elif key == 'matches' and kind == '[':
+                    matches = data['matches'] = []
+                    for _ in reader.items():
+                        match = reader.value()
+                        matches.append(match)
+                        counts['matches'] += 1
+                        if isinstance(match, dict):
+                            self.index_match(match)
+                elif key == 'bets' and kind == '{':
+                    section = data['bets'] = {}
+                    for uid in reader.keys():
+                        bets = reader.value()
+                        if not isinstance(bets, list):
+                            section[uid] = bets
+                            continue
+                        counts['bets'] += len(bets)
+                        if SETTLED_HISTORY == 'lazy':
+                            bets = self._defer_settled(uid, bets)
+                            counts['deferred'] += self.deferred_bets.get(uid, {}).get('count', 0)
+                        bets = section[uid] = [Bet.compact(bet) for bet in bets]
+                        for bet in bets:
+                            if isinstance(bet, Mapping):
+                                self.index_bet(uid, bet)
+                else:
+                    data[key] = reader.value()
+        finally:
+            reader.close()
+        self._index_deferred()
+        for league in leagues:
+            self.index_league(league)
+        deferred = f", {counts['deferred']:,} settled deferred" if SETTLED_HISTORY == 'lazy' else ''
+        print(f"📥 Streamed {counts['users']:,} users, {counts['leagues']:,} leagues, "
+              f"{counts['matches']:,} matches, {counts['bets']:,} bets{deferred}")
+        self.load_stats.update(counts)
+
+    def _defer_settled(self, user_id, bets):
+        """Keep a user's pending bets live and park settled ones as compact JSON; returns the live list"""
+        live, settled, positions = [], [], []
+        for position, bet in enumerate(bets):
+            if isinstance(bet, Mapping) and str(bet.get('status', 'pending')).lower() != 'pending':
+                settled.append(bet)
+                positions.append(position)
+            else:
+                live.append(bet)
+        if not settled:
+            return bets
+        # Per-league totals stand in for the parked bets when leaderboards are seeded
+        totals = {}
+        for bet in settled:
+            for league_id in bet.get('leagueIds') or []:
+                stats = totals.setdefault(league_id, {'bets': 0, 'winnings': 0, 'totalStaked': 0})
+                stats['bets'] += 1
+                stats['totalStaked'] += bet.get('stake', 0)
+                if bet.get('status') == 'won':
+                    stats['winnings'] += bet.get('potentialWin', 0)
+        self.deferred_bets[user_id] = {
+            'count': len(settled),
+            'leagues': totals,
+            'raw': [json.dumps(bet, separators=(',', ':'), default=record_json) for bet in settled],
+            'ids': [bet.get('id') for bet in settled],
+            'positions': positions
+        }
+        return live
+
+    def _index_deferred(self):
+        # Parked bets stay findable by id; the None ref means "load the user's history first"
+        for uid, deferred in self.deferred_bets.items():
+            for bet_id in deferred['ids'] or ():
+                self.bets_by_id.setdefault(bet_id, (uid, None))
+
+    def user_bets(self, user_id):
+        """The user's full bet list, loading deferred settled history on first access"""
+        if user_id in self.deferred_bets:
+            with self._deferred_lock:
+                deferred = self.deferred_bets.get(user_id)
+                if deferred is not None:
+                    bets = self.game_data['bets'].setdefault(user_id, [])
+                    if deferred['raw'] is not None:
+                        history = json.loads('[' + ','.join(deferred['raw']) + ']')
+                        positions = deferred['positions']
+                    else:
+                        # Bets settled since startup are already live; don't load them twice
+                        live = {bet.get('id') for bet in bets if isinstance(bet, Mapping)}
+                        rows = [(position, bet) for position, bet in self.storage.settled_bets(user_id)
+                                if bet.get('id') not in live]
+                        positions = [position for position, _ in rows]
+                        history = [bet for _, bet in rows]
+                    history = [Bet.compact(bet) for bet in history]
+                    bets[:] = merge_at_positions(bets, history, positions)
+                    del self.deferred_bets[user_id]
+                    for bet in history:
+                        if isinstance(bet, Mapping) and self.bets_by_id.get(bet.get('id'), (user_id, None)) == (user_id, None):
+                            self.bets_by_id[bet.get('id')] = (user_id, bet)
+        return self.game_data['bets'].get(user_id) or []
+
+    def locate_bet(self, bet_id):
+        """(userId, bet) for a bet id, loading the owner's deferred history if the bet is in it"""
+        user_id, bet = self.bets_by_id.get(bet_id, (None, None))
+        if bet is None and self.deferred_bets:
+            if user_id is None and self.storage is not None:
+                user_id = self.storage.find_bet_user(bet_id)
+            if user_id in self.deferred_bets:
+                self.user_bets(user_id)
+                user_id, bet = self.bets_by_id.get(bet_id, (None, None))
+        return (user_id, bet) if bet is not None else (None, None)
+
+    def discard_deferred_bets(self, user_id=None):
+        """Drop deferred settled history for one user (or everyone); returns how many bets went"""
+        with self._deferred_lock:
+            if user_id is None:
+                dropped = list(self.deferred_bets.items())
+                self.deferred_bets = {}
+            else:
+                deferred = self.deferred_bets.pop(user_id, None)
+                dropped = [(user_id, deferred)] if deferred else []
+        count = 0
+        for uid, deferred in dropped:
+            count += deferred['count']
+            for bet_id in deferred['ids'] or ():
+                if self.bets_by_id.get(bet_id) == (uid, None):
+                    del self.bets_by_id[bet_id]
+        return count
     
     def save_data(self):
         """Save game data to file"""
+        if self.storage is not None or self.journal_mode:
+            # Rows and journal records are written as they change; just drain the writer
+            self.flush(PERSIST_DURABLE_TIMEOUT)
+            return
         try:
-            self.game_data['lastUpdated'] = datetime.now().isoformat()
-            with open(self.data_file, 'w') as f:
-                json.dump(self.game_data, f, indent=2)
+            self._write_snapshot()
             print('💾 Data saved successfully')
         except Exception as e:
             print(f'❌ Error saving data: {e}')
+
+    def commit(self, *records, durable=False):
+        """Queue one mutation for the persistence writer and return a CommitFuture.
+
+        Each record is a small dict describing the new state of the entity that
+        changed (see _apply_record). The writer thread batches every commit made
+        within PERSIST_WINDOW_MS into a single write: one journal append in
+        journal mode, one snapshot rewrite in snapshot mode. With durable=True
+        the caller blocks until its batch is on disk.
+        """
+        future = CommitFuture()
+        records = [r for r in records if r]
+        with self._commit_cond:
+            if records:
+                self._log_changes(records)
+            self._pending.append((records, future, time.time()))
+            self._commit_cond.notify()
+        if durable and not future.wait(PERSIST_DURABLE_TIMEOUT):
+            print('⚠️ Durable commit did not complete in time')
+        return future
+
+    def flush(self, timeout=None):
+        """Wait until everything committed so far has been written"""
+        return self.commit().wait(timeout)
+
+    def _writer_loop(self):
+        while True:
+            with self._commit_cond:
+                while not self._pending:
+                    self._commit_cond.wait()
+            # Let concurrent handlers pile onto this batch
+            if PERSIST_WINDOW_MS > 0:
+                time.sleep(PERSIST_WINDOW_MS / 1000.0)
+            with self._commit_cond:
+                batch, self._pending = self._pending, []
+            ok = True
+            try:
+                if self.storage is not None:
+                    self._write_storage([r for records, _, _ in batch for r in records])
+                elif self.journal_mode:
+                    self._append_journal([r for records, _, _ in batch for r in records])
+                elif any(records for records, _, _ in batch):
+                    self._write_snapshot()
+                    print('💾 Data saved successfully')
+            except Exception as e:
+                ok = False
+                self.persist_stats['errors'] += 1
+                print(f'❌ Error saving data: {e}')
+            done = time.time()
+            latency_ms = (done - min(t for _, _, t in batch)) * 1000.0
+            METRICS.observe('persist_commit_latency_seconds', latency_ms / 1000.0)
+            stats = self.persist_stats
+            stats['batches'] += 1
+            stats['commits'] += len(batch)
+            stats['records'] += sum(len(records) for records, _, _ in batch)
+            stats['lastBatchSize'] = len(batch)
+            stats['maxBatchSize'] = max(stats['maxBatchSize'], len(batch))
+            stats['lastLatencyMs'] = round(latency_ms, 2)
+            stats['maxLatencyMs'] = round(max(stats['maxLatencyMs'], latency_ms), 2)
+            stats['totalLatencyMs'] += latency_ms
+            for _, future, _ in batch:
+                future.set_result(ok)
+            if ok and EVENTS.has_subscribers():
+                self._publish_events([r for records, _, _ in batch for r in records])
+
+    def _publish_events(self, records):
+        """Announce a written batch on /api/stream (durable first, then notify)"""
+        users, bets, matches, leagues, boards = {}, {}, {}, {}, set()
+        for record in records:
+            op = record.get('op')
+            if op == 'put_user':
+                users[record['user'].get('id')] = record['user']
+            elif op == 'put_bet':
+                bets[record['bet'].get('id')] = record['bet']
+            elif op == 'put_match':
+                matches[str(record['match'].get('id'))] = record['match']
+            elif op == 'put_league':
+                leagues[record['league'].get('id')] = record['league']
+        # Records can repeat within a batch; each entity is announced once in its latest state
+        for match in matches.values():
+            self._publish('match', {'match': match})
+        for bet in bets.values():
+            self._publish('bet', {'bet': bet}, users=(bet.get('userId'),))
+        for user_id, user in users.items():
+            self._publish('balance', {'userId': user_id, 'coins': user.get('coins'), 'stats': user.get('stats')},
+                          users=(user_id,))
+            boards.update(self.leagues_by_user.get(user_id) or ())
+        for league_id, league in leagues.items():
+            self._publish('league', {'league': league}, leagues=(league_id,))
+            boards.add(league_id)
+        for league_id in boards:
+            self._publish('leaderboard', {'leagueId': league_id, 'version': self.get_version('league:' + league_id)},
+                          leagues=(league_id,))
+
+    @staticmethod
+    def _publish(event_type, data, users=(), leagues=()):
+        # Records reference live objects; retry if a handler mutates one mid-encode
+        for attempt in range(5):
+            try:
+                EVENTS.publish(event_type, data, users, leagues)
+                return
+            except RuntimeError:
+                time.sleep(0.01)
+            except Exception as e:
+                print(f'⚠️ Could not publish {event_type} event: {e}')
+                return
+
+    def get_persist_stats(self):
+        stats = dict(self.persist_stats)
+        batches = stats['batches'] or 1
+        stats['avgLatencyMs'] = round(stats.pop('totalLatencyMs') / batches, 2)
+        stats['avgBatchSize'] = round(stats['commits'] / batches, 2)
+        stats['mode'] = PERSISTENCE_MODE if PERSISTENCE_MODE in ('journal', 'sqlite') else 'snapshot'
+        stats['windowMs'] = PERSIST_WINDOW_MS
+        with self._commit_cond:
+            stats['pending'] = len(self._pending)
+        stats['load'] = dict(self.load_stats)
+        if self.storage is not None:
+            stats['sqlite'] = self.storage.get_stats()
+        deferred = list(self.deferred_bets.values())
+        stats['deferredHistory'] = {
+            'mode': SETTLED_HISTORY,
+            'users': len(deferred),
+            'bets': sum(d['count'] for d in deferred)
+        }
+        return stats
+
+    def _append_journal(self, records):
+        """Append records to the journal with a single write + fsync"""
+        if not records:
+            return
+        # Records reference live objects; retry if a handler mutates one mid-dump
+        for attempt in range(5):
+            try:
+                lines = ''.join(json.dumps(r, separators=(',', ':'), default=record_json) + '\n' for r in records)
+                break
+            except RuntimeError:
+                if attempt == 4:
+                    raise
+                time.sleep(0.01)
+        started = time.perf_counter()
+        with self._journal_lock:
+            if self._journal_fh is None:
+                # A journal replayed at boot may end in a torn line; start ours on a fresh one
+                if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file):
+                    with open(self.journal_file, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            lines = '\n' + lines
+                self._journal_fh = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal_fh.write(lines)
+            self._journal_fh.flush()
+            os.fsync(self._journal_fh.fileno())
+        METRICS.observe('persist_write_duration_seconds', time.perf_counter() - started, {'kind': 'journal'})
+        METRICS.inc('persist_bytes_written_total', {'kind': 'journal'}, len(lines.encode('utf-8')))
+
+    def _write_storage(self, records):
+        """Apply records to the SQLite backend in one transaction"""
+        if not records:
+            return
+        started = time.perf_counter()
+        # Records reference live objects; retry if a handler mutates one mid-dump
+        for attempt in range(5):
+            try:
+                self.storage.write(records)
+                break
+            except RuntimeError:
+                if attempt == 4:
+                    raise
+                time.sleep(0.01)
+        METRICS.observe('persist_write_duration_seconds', time.perf_counter() - started, {'kind': 'sqlite'})
+
+    def _write_snapshot(self):
+        """Atomically replace the data file with the current game data"""
+        with self._snapshot_lock:
+            self._write_snapshot_locked()
+
+    def _write_snapshot_locked(self):
+        started = time.perf_counter()
+        self.game_data['lastUpdated'] = datetime.now().isoformat()
+        tmp_file = self.data_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            # Handler threads may mutate game_data while we serialize; retry on that race
+            for attempt in range(5):
+                try:
+                    f.seek(0)
+                    f.truncate()
+                    self._dump_snapshot(f)
+                    break
+                except RuntimeError:
+                    if attempt == 4:
+                        raise
+                    time.sleep(0.01)
+            written = f.tell()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.data_file)
+        METRICS.observe('persist_write_duration_seconds', time.perf_counter() - started, {'kind': 'snapshot'})
+        METRICS.inc('persist_bytes_written_total', {'kind': 'snapshot'}, written)
+
+    def _dump_snapshot(self, f):
+        """Write game_data as json.dumps(indent=2) would, one record at a time.
+
+        Users, leagues and per-user bet lists are serialized individually so
+        the whole document never exists as one string. Deferred settled
+        history is spliced into each user's bet list as-is, each bet back at
+        its original position.
+        """
+        f.write('{')
+        for i, (key, value) in enumerate(list(self.game_data.items())):
+            f.write((',' if i else '') + '\n  ' + json.dumps(str(key)) + ': ')
+            if not isinstance(value, dict) or not value:
+                f.write(json.dumps(value, indent=2, default=record_json).replace('\n', '\n  '))
+                continue
+            with (self._deferred_lock if key == 'bets' else contextlib.nullcontext()):
+                parts = ['{']
+                for j, (item_key, item) in enumerate(list(value.items())):
+                    deferred = self.deferred_bets.get(item_key) if key == 'bets' else None
+                    if deferred is not None and deferred['raw'] is not None:
+                        live = [json.dumps(bet, indent=2, default=record_json).replace('\n', '\n      ') for bet in item]
+                        text = '[\n      ' + ',\n      '.join(merge_at_positions(live, deferred['raw'], deferred['positions'])) + '\n    ]'
+                    else:
+                        text = json.dumps(item, indent=2, default=record_json).replace('\n', '\n    ')
+                    parts.append((',' if j else '') + '\n    ' + json.dumps(str(item_key)) + ': ' + text)
+                    if len(parts) >= 1024:
+                        f.write(''.join(parts))
+                        parts = []
+                parts.append('\n  }')
+                f.write(''.join(parts))
+        f.write('\n}')
+
+    def compact_journal(self):
+        """Fold the journal into a fresh snapshot and truncate it.
+
+        The live journal is rotated aside before the snapshot is serialized, so
+        appends keep flowing into a new log while we write. Records are full
+        entity states, which makes replaying a record the snapshot already
+        contains harmless.
+        """
+        rotated = self.journal_file + '.compacting'
+        try:
+            with self._journal_lock:
+                if self._journal_fh is not None:
+                    self._journal_fh.close()
+                    self._journal_fh = None
+                if os.path.exists(self.journal_file) and not os.path.exists(rotated):
+                    os.replace(self.journal_file, rotated)
+            self._write_snapshot()
+            if os.path.exists(rotated):
+                os.remove(rotated)
+            print('🗜️ Journal compacted into snapshot')
+        except Exception as e:
+            print(f'❌ Error compacting journal: {e}')
+
+    def _compactor_loop(self):
+        last = time.time()
+        while True:
+            time.sleep(max(1, min(5, JOURNAL_COMPACT_SECONDS)))
+            try:
+                size = os.path.getsize(self.journal_file) if os.path.exists(self.journal_file) else 0
+            except Exception:
+                size = 0
+            if size and (size >= JOURNAL_COMPACT_BYTES or time.time() - last >= JOURNAL_COMPACT_SECONDS):
+                self.compact_journal()
+                last = time.time()
+
+    def _replay_journal(self):
+        """Apply records from a leftover rotated journal and the live journal"""
+        count = 0
+        bet_pos = {}
+        for path in (self.journal_file + '.compacting', self.journal_file):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # A torn final line from a crash mid-append; everything before it is intact
+                            print(f'⚠️ Skipping unreadable journal line in {path}')
+                            continue
+                        self._apply_record(record, bet_pos)
+                        count += 1
+            except Exception as e:
+                print(f'⚠️ Could not replay journal {path}: {e}')
+        return count
+
+    def _apply_record(self, record, bet_pos):
+        """Apply one journal record to game_data (idempotent upserts)"""
+        op = record.get('op')
+        data = self.game_data
+        if op == 'put_user':
+            user = User.compact(record['user'])
+            data['users'][user['id']] = user
+        elif op == 'put_league':
+            league = League.compact(record['league'])
+            data['leagues'][league['id']] = league
+        elif op == 'put_bet':
+            bet = Bet.compact(record['bet'])
+            uid = bet.get('userId')
+            parked = self.bets_by_id.get(bet.get('id'))
+            if parked and parked[1] is None:
+                # The snapshot already holds this bet in deferred history: load it so the record updates it in place
+                self.user_bets(parked[0])
+                bet_pos.clear()
+            bets = data['bets'].setdefault(uid, [])
+            if not bet_pos:
+                for u, lst in data['bets'].items():
+                    for i, b in enumerate(lst or []):
+                        if isinstance(b, Mapping):
+                            bet_pos[b.get('id')] = (u, i)
+            pos = bet_pos.get(bet.get('id'))
+            if pos and pos[0] == uid and pos[1] < len(bets) and bets[pos[1]].get('id') == bet.get('id'):
+                bets[pos[1]] = bet
+            else:
+                bet_pos[bet.get('id')] = (uid, len(bets))
+                bets.append(bet)
+        elif op == 'clear_bets':
+            data['bets'][record['userId']] = []
+            self.discard_deferred_bets(record['userId'])
+            bet_pos.clear()
+        elif op == 'put_match':
+            match = record['match']
+            for i, m in enumerate(data['matches']):
+                if isinstance(m, dict) and str(m.get('id')) == str(match.get('id')):
+                    data['matches'][i] = match
+                    break
+            else:
+                data['matches'].append(match)
+        elif op == 'set_matches':
+            data['matches'] = record.get('matches') or []
+        elif op == 'reset_all':
+            data['users'] = {}
+            data['leagues'] = {}
+            data['bets'] = {}
+            data['matches'] = []
+            self.discard_deferred_bets()
+            bet_pos.clear()
     
+    def _log_changes(self, records):
+        """Give one commit the next change version and note which users it touches (under _commit_cond)"""
+        self.change_version += 1
+        version = self.change_version
+        for record in records:
+            op = record.get('op')
+            if op == 'put_bet':
+                self._note_change(record['bet'].get('userId'), version, 'bet', record['bet'].get('id'))
+            elif op == 'put_user':
+                self._note_change(record['user'].get('id'), version, 'user', None)
+            elif op == 'put_league':
+                league = record['league']
+                for member_id in list(league.get('members') or ()):
+                    self._note_change(member_id, version, 'league', league.get('id'))
+            elif op == 'clear_bets':
+                self._note_change(record.get('userId'), version, 'reset', None)
+            elif op == 'reset_all':
+                self.change_floor = version
+                self.user_changes = {}
+
+    def _note_change(self, user_id, version, kind, key):
+        log = self.user_changes.get(user_id)
+        if log is None:
+            log = self.user_changes[user_id] = UserChangeLog(self.change_floor)
+        log.add(version, kind, key)
+
+    def changes_since(self, user_id, since):
+        """(version, changes) for a user's ?since= sync.
+
+        version is the newest change version touching this user (so unchanged
+        responses keep their ETag). changes maps kind ('bet', 'user', 'league',
+        'reset') to the keys changed after since, or is None when since is too
+        old (or from the future) and the client must take a full response. A
+        change that is visible but not yet logged gets a later version, so it is
+        simply sent on the next sync.
+        """
+        with self._commit_cond:
+            log = self.user_changes.get(user_id)
+            floor = max(self.change_floor, log.floor) if log is not None else self.change_floor
+            entries = list(log.entries) if log is not None else []
+            version = max(floor, entries[-1][0]) if entries else floor
+            if since < floor or since > self.change_version:
+                return version, None
+        changes = {}
+        for entry_version, kind, key in reversed(entries):
+            if entry_version <= since:
+                break
+            changes.setdefault(kind, {})[key] = None
+        return version, {kind: list(keys) for kind, keys in changes.items()}
+
+    def bump_version(self, resource):
+        """Mark a cached resource as changed"""
+        self.versions[resource] = next(self._version_seq)
+
+    def get_version(self, resource):
+        return self.versions.get(resource, 0)
+
+    def compact_records(self):
+        """Swap the users, leagues and bets in game_data for their compact record types"""
+        data = self.game_data
+        for section, compact in (('users', User.compact), ('leagues', League.compact)):
+            items = data.get(section)
+            if isinstance(items, dict):
+                for key, value in items.items():
+                    items[key] = compact(value)
+        for uid, bets in (data.get('bets') or {}).items():
+            if isinstance(bets, list):
+                bets[:] = [Bet.compact(bet) for bet in bets]
+
+    def rebuild_indexes(self):
+        """Recompute every secondary index from game_data"""
+        self._reset_indexes()
+        for user in (self.game_data.get('users') or {}).values():
+            if isinstance(user, Mapping):
+                self.index_user(user)
+        for league in (self.game_data.get('leagues') or {}).values():
+            if isinstance(league, Mapping):
+                self.index_league(league)
+        for match in (self.game_data.get('matches') or []):
+            if isinstance(match, dict):
+                self.index_match(match)
+        for uid, bets in (self.game_data.get('bets') or {}).items():
+            if not isinstance(bets, list):
+                continue
+            for bet in bets:
+                if isinstance(bet, Mapping):
+                    self.index_bet(uid, bet)
+        self._index_deferred()
+
+    def _reset_indexes(self):
+        self.versions = {}
+        self.bump_version('matches')
+        self.users_by_name = {}
+        self.leagues_by_invite = {}
+        self.matches_by_id = {}
+        self.bets_by_id = {}
+        self.pending_by_match = {}
+        self.pending_by_user = {}
+        self.bet_pages = {}
+        self._match_index = None
+        self.leagues_by_user = {}
+        self._league_order = {}
+        self.league_stats = {}
+        self.league_rankings = {}
+
+    def index_user(self, user):
+        # First user wins on duplicate names, matching the old linear scan
+        self.users_by_name.setdefault(user.get('username'), user)
+
+    def index_league(self, league):
+        self.leagues_by_invite.setdefault(league.get('inviteCode'), league)
+        self._league_order.setdefault(league['id'], len(self._league_order))
+        for member_id in league.get('members') or []:
+            self.index_league_member(league, member_id)
+
+    def index_league_member(self, league, user_id):
+        self.leagues_by_user.setdefault(user_id, {})[league['id']] = league
+        # Seed the member's league aggregates from the bets they already hold
+        stats = {'bets': 0, 'winnings': 0, 'totalStaked': 0}
+        for bet in self.game_data['bets'].get(user_id) or []:
+            if isinstance(bet, Mapping) and 'leagueIds' in bet and league['id'] in bet['leagueIds']:
+                stats['bets'] += 1
+                stats['totalStaked'] += bet['stake']
+                if bet['status'] == 'won':
+                    stats['winnings'] += bet['potentialWin']
+        deferred = self.deferred_bets.get(user_id)
+        if deferred is not None:
+            for field, value in (deferred['leagues'].get(league['id']) or {}).items():
+                stats[field] += value
+        self.league_stats.setdefault(league['id'], {})[user_id] = stats
+        self.bump_version('league:' + league['id'])
+        ranking = self.league_rankings.setdefault(league['id'], [])
+        if user_id not in [entry[2] for entry in ranking]:
+            user = self.game_data['users'].get(user_id) or {}
+            bisect.insort(ranking, (-user.get('coins', 0), len(ranking), user_id))
+
+    def index_match(self, match):
+        self.matches_by_id.setdefault(str(match.get('id')), match)
+
+    def index_bet(self, user_id, bet):
+        bet_id = bet.get('id')
+        if self.bets_by_id.setdefault(bet_id, (user_id, bet))[1] is bet and user_id in self.bet_pages:
+            self._page_insert(user_id, bet, (None, str(bet.get('status', 'pending')).lower()))
+        if str(bet.get('status', 'pending')).lower() == 'pending':
+            # Normalize once here so settlement only compares strings
+            market = normalize_market(bet.get('market'))
+            selection = normalize_selection(bet.get('selection'), market)
+            self.pending_by_match.setdefault(str(bet.get('matchId')), {})[bet_id] = (user_id, bet, market, selection)
+            self.pending_by_user.setdefault(user_id, {}).setdefault(bet_id, bet)
+
+    def unindex_pending(self, bet, user_id=None):
+        """Drop a bet from the pending indexes once it has been settled"""
+        pending = self.pending_by_match.get(str(bet.get('matchId')))
+        if pending is not None:
+            pending.pop(bet.get('id'), None)
+            if not pending:
+                self.pending_by_match.pop(str(bet.get('matchId')), None)
+        user_id = user_id if user_id is not None else bet.get('userId')
+        pending = self.pending_by_user.get(user_id)
+        if pending is not None:
+            pending.pop(bet.get('id'), None)
+            if not pending:
+                del self.pending_by_user[user_id]
+        if user_id in self.bet_pages:
+            # Settled: move the bet from the pending page list to its status list
+            self._page_remove(user_id, bet, 'pending')
+            self._page_insert(user_id, bet, (str(bet.get('status', 'pending')).lower(),))
+
+    def _page_insert(self, user_id, bet, statuses):
+        lists = self.bet_pages.get(user_id) or {}
+        key = bet_page_key(bet)
+        for status in statuses:
+            entry = lists.get(status)
+            if entry is not None:
+                keys, bets = entry
+                pos = bisect.bisect_right(keys, key)
+                keys.insert(pos, key)
+                bets.insert(pos, bet)
+
+    def _page_remove(self, user_id, bet, status):
+        entry = (self.bet_pages.get(user_id) or {}).get(status)
+        if entry is not None:
+            keys, bets = entry
+            pos = bisect.bisect_left(keys, bet_page_key(bet))
+            if pos < len(bets) and bets[pos] is bet:
+                del keys[pos]
+                del bets[pos]
+
+    def bet_page_list(self, user_id, status=None):
+        """([bet_page_key], [bet]) of a user's bets with this status (None: all), built on first use.
+
+        The pending list comes from pending_by_user, so it never loads the
+        user's deferred settled history.
+        """
+        lists = self.bet_pages.setdefault(user_id, {})
+        entry = lists.get(status)
+        if entry is None:
+            if status == 'pending':
+                bets = list((self.pending_by_user.get(user_id) or {}).values())
+            else:
+                bets = [bet for bet in self.user_bets(user_id) if isinstance(bet, Mapping) and
+                        (status is None or str(bet.get('status', 'pending')).lower() == status)]
+            keyed = sorted(((bet_page_key(bet), bet) for bet in bets), key=lambda pair: pair[0])
+            entry = lists[status] = ([key for key, _ in keyed], [bet for _, bet in keyed])
+        return entry
+
+    def unindex_user_bets(self, user_id):
+        """Drop all of a user's bets from the bet indexes (before clearing them)"""
+        self.bet_pages.pop(user_id, None)
+        for bet in self.game_data['bets'].get(user_id) or []:
+            if not isinstance(bet, Mapping):
+                continue
+            if self.bets_by_id.get(bet.get('id'), (None,))[0] == user_id:
+                del self.bets_by_id[bet.get('id')]
+            self.unindex_pending(bet, user_id)
+
+    def settle_matches(self, scores):
+        """Settle finished matches from their final scores.
+
+        scores is a list of (match_id, home_goals, away_goals). Work is
+        proportional to the pending bets on those matches (pending_by_match),
+        not to the whole bet history. Returns (summaries, records): one summary
+        per input (None for unknown matches) and the journal records to commit
+        in a single write.
+        """
+        summaries = []
+        records = []
+        credited = {}
+        # Exclusive match lock: no bet on these matches can be placed while we settle them
+        with self.match_lock.write_lock():
+            for match_id, home_goals, away_goals in scores:
+                match = self.matches_by_id.get(str(match_id))
+                if not match:
+                    summaries.append(None)
+                    continue
+                # Update match state
+                match['status'] = 'finished'
+                match['score'] = { 'home': home_goals, 'away': away_goals }
+                records.append({'op': 'put_match', 'match': match})
+                self.bump_version('matches')
+                results = compute_market_results(home_goals, away_goals)
+                settled, won = self._settle_pending(str(match_id), results, records, credited)
+                summaries.append({
+                    'match': match,
+                    'settled': settled,
+                    'won': won,
+                    'results': serialize_market_results(results)
+                })
+        records.extend({'op': 'put_user', 'user': u} for u in credited.values())
+        return summaries, records
+
+    def _settle_pending(self, match_key, results, records, credited):
+        """Grade every pending bet on one match; caller holds the match write lock"""
+        settled = 0
+        won = 0
+        for uid, bet, market, selection in list((self.pending_by_match.get(match_key) or {}).values()):
+            # Balances also move via /api/bets/settle and reset-user, which only hold the user stripe
+            with self.user_locks(uid):
+                try:
+                    if str(bet.get('status', 'pending')).lower() != 'pending':
+                        continue
+                    is_winner = is_winning_selection(market, selection, results)
+                    if is_winner is None:
+                        # Unknown market - leave as pending
+                        continue
+
+                    bet['status'] = 'won' if is_winner else 'lost'
+                    self.unindex_pending(bet, uid)
+                    settled += 1
+                    records.append({'op': 'put_bet', 'bet': bet})
+
+                    # On win, credit payout
+                    if is_winner:
+                        won += 1
+                        user = self.game_data['users'].get(uid)
+                        if user:
+                            try:
+                                stake = float(bet.get('stake', 0) or 0)
+                                odds = float(bet.get('odds', 1) or 1)
+                                potential = bet.get('potentialWin')
+                                payout = int(round(potential if isinstance(potential, (int, float)) else stake * (odds if odds and odds > 0 else 1)))
+                            except Exception:
+                                payout = int(round(float(bet.get('potentialWin') or 0)))
+                            user['coins'] = max(0, int(round(float(user.get('coins', 0)) + payout)))
+                            stats = user.setdefault('stats', {})
+                            stats['totalWinnings'] = max(0, int(round(float(stats.get('totalWinnings', 0)) + payout)))
+                            stats['biggestWin'] = max(int(round(float(stats.get('biggestWin', 0)))), int(payout))
+                            credited[uid] = user
+                            self.record_bet_won(uid, bet)
+                            self.update_user_rank(uid)
+                except Exception:
+                    # Skip on any data issue with this bet
+                    continue
+        return settled, won
+
+    def _member_stats(self, user_id, bet):
+        """Aggregates of every league this user is in that the bet counts towards"""
+        league_ids = bet.get('leagueIds')
+        if not league_ids:
+            return []
+        out = []
+        for league_id in self.leagues_by_user.get(user_id) or {}:
+            if league_id in league_ids:
+                stats = self.league_stats.get(league_id, {}).get(user_id)
+                if stats is not None:
+                    out.append(stats)
+        return out
+
+    def record_bet_placed(self, user_id, bet):
+        for stats in self._member_stats(user_id, bet):
+            stats['bets'] += 1
+            stats['totalStaked'] += bet['stake']
+
+    def record_bet_won(self, user_id, bet):
+        for stats in self._member_stats(user_id, bet):
+            stats['winnings'] += bet['potentialWin']
+
+    def reset_member_stats(self, user_id):
+        """Zero the user's league aggregates after their bets were cleared"""
+        for league_id in self.leagues_by_user.get(user_id) or {}:
+            stats = self.league_stats.get(league_id, {}).get(user_id)
+            if stats is not None:
+                stats.update({'bets': 0, 'winnings': 0, 'totalStaked': 0})
+
+    def update_user_rank(self, user_id):
+        """Re-position the user in each of their leagues after a coin change"""
+        user = self.game_data['users'].get(user_id)
+        if not user:
+            return
+        for league_id in list(self.leagues_by_user.get(user_id) or {}):
+            with self.league_locks(league_id):
+                ranking = self.league_rankings.get(league_id)
+                if not ranking:
+                    continue
+                for i, entry in enumerate(ranking):
+                    if entry[2] == user_id:
+                        del ranking[i]
+                        bisect.insort(ranking, (-user.get('coins', 0), entry[1], user_id))
+                        break
+                self.bump_version('league:' + league_id)
+
+    def get_leaderboard(self, league_id, top=None, user_id=None):
+        """Serialize a league's ranking; with top, only the first N plus the caller's rank"""
+        users = self.game_data['users']
+        stats = self.league_stats.get(league_id) or {}
+        leaderboard = []
+        me = None
+        rank = 0
+        with self.league_locks(league_id):
+            for _, _, member_id in self.league_rankings.get(league_id) or []:
+                user = users.get(member_id)
+                if not user:
+                    continue
+                rank += 1
+                if member_id == user_id:
+                    me = {'rank': rank, 'coins': user.get('coins', 0)}
+                if top is None or len(leaderboard) < top:
+                    leaderboard.append({
+                        **user,
+                        'leagueStats': dict(stats.get(member_id) or {'bets': 0, 'winnings': 0, 'totalStaked': 0})
+                    })
+                elif user_id is None or me is not None:
+                    break
+        return leaderboard, me
+
+    def page_user_bets(self, user_id, limit, cursor=None, descending=False, status=None, match_id=None, league_id=None):
+        """One page of a user's bets in placement order (caller holds the user stripe).
+
+        Bets are ordered by bet_page_key, which is persisted with the bet, so
+        a cursor stays valid across settlement and restarts. Each status has
+        its own sorted list (bet_page_list), so a page is a bisect to the
+        cursor plus the page; matchId/leagueId filters skip within it.
+        """
+        keys, items = self.bet_page_list(user_id, status)
+        def keep(bet):
+            if match_id is not None and str(bet.get('matchId')) != match_id:
+                return False
+            return league_id is None or league_id in (bet.get('leagueIds') or ())
+        filtered = match_id is not None or league_id is not None
+        return paginate(items, keys, limit, cursor, descending, keep if filtered else None)
+
+    def match_index(self):
+        """(match_kickoff keys, matches) in kickoff order, for all matches and per status (caller holds match_lock).
+
+        Rebuilt once per matches version, so a page is a bisect plus a slice.
+        """
+        version = self.get_version('matches')
+        index = self._match_index
+        if index is None or index[0] != version:
+            ordered = sorted(self.game_data['matches'], key=match_kickoff)
+            groups = {None: ordered}
+            for match in ordered:
+                groups.setdefault(str(match.get('status') or 'upcoming').lower(), []).append(match)
+            index = (version, {status: ([match_kickoff(m) for m in matches], matches) for status, matches in groups.items()})
+            self._match_index = index
+        return index[1]
+
+    def page_matches(self, limit, cursor=None, descending=False, status=None, date_from=None, date_to=None):
+        """One page of matches in kickoff order, optionally by status and date range (YYYY-MM-DD, inclusive)"""
+        keys, matches = self.match_index().get(status, ([], []))
+        lo = bisect.bisect_left(keys, date_from) if date_from else 0
+        hi = bisect.bisect_left(keys, date_to + '\uffff') if date_to else len(keys)
+        return paginate(matches[lo:hi], keys[lo:hi], limit, cursor, descending)
+
+    def get_user_leagues(self, user_id):
+        """Leagues the user belongs to, in league creation order"""
+        leagues = list((self.leagues_by_user.get(user_id) or {}).values())
+        leagues.sort(key=lambda l: self._league_order.get(l['id'], 0))
+        return leagues
+
     def generate_id(self, prefix=''):
         """Generate unique ID"""
         return f"{prefix}{int(time.time())}{uuid.uuid4().hex[:6]}"
@@ -191,11 +2155,64 @@ class MultiUserGameServer:
                     }
                 }
             ]
-            self.save_data()
+            for match in self.game_data['matches']:
+                self.index_match(match)
+            self.bump_version('matches')
+            self.commit({'op': 'set_matches', 'matches': self.game_data['matches']})
             print('🏈 Initialized demo matches')
 
-# Global game server instance
-game_server = MultiUserGameServer()
+# --- Pagination -----------------------------------------------------------------
+PAGE_DEFAULT_LIMIT = int(os.environ.get('PAGE_DEFAULT_LIMIT', '50'))
+PAGE_MAX_LIMIT = int(os.environ.get('PAGE_MAX_LIMIT', '500'))
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """The sort key of the last item of the previous page; ValueError when malformed"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8'))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if isinstance(key, list) and all(isinstance(part, str) for part in key):
+        return key
+    if not isinstance(key, str):
+        raise ValueError('invalid cursor')
+    return key
+
+def paginate(items, keys, limit, cursor=None, descending=False, keep=None):
+    """One page of items in key order (or reversed), skipping those keep() rejects.
+
+    keys are ascending, unique sort keys parallel to items. The cursor carries
+    the key of the last item returned and the next page starts right after it
+    with a bisect, even if that item has left the list since. Returns
+    (page, next_cursor or None).
+    """
+    step = -1 if descending else 1
+    pos = len(items) - 1 if descending else 0
+    if cursor:
+        last = decode_cursor(cursor)
+        if keys and type(last) is not type(keys[0]):
+            raise ValueError('invalid cursor')
+        pos = bisect.bisect_left(keys, last) - 1 if descending else bisect.bisect_right(keys, last)
+    page = []
+    while 0 <= pos < len(items):
+        item = items[pos]
+        if keep is None or keep(item):
+            if len(page) == limit:
+                return page, encode_cursor(keys[pos - step])
+            page.append(item)
+        pos += step
+    return page, None
+
+def bet_page_key(bet):
+    """Unique sort key for a user's bets that is stored with the bet: [placedAt, id]"""
+    return [str(bet.get('placedAt') or ''), str(bet.get('id'))]
+
+def match_kickoff(match):
+    """Unique sort key for matches: 'YYYY-MM-DD HH:MM' then the id (date falls back to an ISO commence_time)"""
+    date = str(match.get('date') or match.get('commence_time') or '')[:10]
+    return f"{date} {match.get('time') or ''}\x00{match.get('id')}"
 
 # --- Helpers for settlement parity with Node backend ---
 def normalize_market(market: str) -> str:
@@ -259,6 +2276,397 @@ def compute_market_results(home_goals: int, away_goals: int):
         results['double_chance'].add('x2')
     return results
 
+
+def is_winning_selection(market: str, selection: str, results):
+    """Grade a normalized market/selection against compute_market_results.
+    Returns None for markets we can't settle (the bet stays pending)."""
+    if market == 'match_result':
+        return selection == results['match_result']
+    if market == 'double_chance':
+        return selection in results['double_chance']
+    if market == 'total_goals':
+        return selection == results['total_goals']
+    if market == 'btts':
+        return selection == results['btts']
+    return None
+
+
+def serialize_market_results(results):
+    return {
+        'match_result': results['match_result'],
+        'double_chance': sorted(list(results['double_chance'])),
+        'total_goals': results['total_goals'],
+        'btts': results['btts']
+    }
+
+def encode_json(data):
+    """Encode a response payload the way send_json_response puts it on the wire"""
+    return json.dumps(data, default=record_json).encode('utf-8')
+
+
+# Response compression (stdlib only: gzip and deflate; brotli would need a third-party package)
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+def compress_body(body, encoding):
+    if encoding == 'gzip':
+        # Fixed mtime keeps the output (and its ETag) stable across calls
+        return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(body, COMPRESS_LEVEL)
+    return body
+
+def choose_encoding(accept_encoding, size):
+    """Pick a content-coding from an Accept-Encoding header, or None for identity.
+
+    Follows RFC 9110 section 12.5.3: a listed coding overrides '*', which only
+    covers codings that are not listed, and q=0 refuses a coding. Identity is
+    acceptable unless refused; small bodies go uncompressed when it is.
+    Raises ValueError when every coding we can send is refused (answer 406).
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for f in fields[1:]:
+            f = f.strip()
+            if f.startswith('q='):
+                try:
+                    q = float(f[2:])
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    star = weights.get('*')
+    best, best_q = None, 0.0
+    # Ties go to the server's preference order (gzip first)
+    for coding in SUPPORTED_ENCODINGS:
+        q = weights.get(coding, star or 0.0)
+        if q > best_q:
+            best, best_q = coding, q
+    identity_q = weights.get('identity', star)
+    if identity_q is None or identity_q > 0:
+        if best is None or size < COMPRESS_MIN_BYTES or (identity_q or 0.0) > best_q:
+            return None
+        return best
+    if best is None:
+        raise ValueError('no acceptable content-coding')
+    return best
+
+
+class CachedBody:
+    """An encoded JSON response body with its strong ETag and memoized compressed variants"""
+    __slots__ = ('body', 'etag', '_variants')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self._variants = {}
+
+    def variant(self, encoding):
+        """Compressed body for encoding, computed on first use"""
+        if not encoding:
+            return self.body
+        compressed = self._variants.get(encoding)
+        if compressed is None:
+            compressed = compress_body(self.body, encoding)
+            self._variants[encoding] = compressed
+        return compressed
+
+
+RESPONSE_CACHE_MAX_KEYS = int(os.environ.get('RESPONSE_CACHE_MAX_KEYS', '1024'))
+
+class ResponseCache:
+    """Encoded responses keyed by endpoint, valid for one resource version.
+
+    Only the latest version of each key is kept; a request for a newer version
+    rebuilds the entry. Keys are evicted least-recently-used beyond max_keys.
+    """
+    def __init__(self, max_keys=RESPONSE_CACHE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> (version, CachedBody)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, build):
+        """Return the CachedBody for key@version, calling build() for the payload on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        cached = CachedBody(encode_json(build()))
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (version, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+RESPONSE_CACHE = ResponseCache()
+
+
+class OddsDiskCache:
+    """sqlite-backed second tier for the odds caches.
+
+    Stores each key's encoded JSON body with its fetch time, so entries keep
+    their original age (and TTL) across restarts. Rows are read lazily on a
+    memory miss; rows past the stale window are ignored and pruned.
+    """
+    PRUNE_EVERY = 100
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self.reads = 0
+        self.loaded = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS odds_cache (key TEXT PRIMARY KEY, ts REAL NOT NULL, body BLOB NOT NULL)')
+            self._conn = conn
+        return self._conn
+
+    def _error(self, action, e):
+        self.errors += 1
+        if self.errors <= 3:
+            print(f"⚠️ Odds disk cache {action} failed: {e}")
+
+    def load(self, key):
+        """(ts, body bytes) for key if still within the stale window, else None"""
+        horizon = time.time() - ODDS_CACHE_TTL - ODDS_STALE_TTL
+        try:
+            with self._lock:
+                self.reads += 1
+                row = self._connect().execute('SELECT ts, body FROM odds_cache WHERE key = ?', (key,)).fetchone()
+                if row is None or row[0] <= horizon:
+                    return None
+                self.loaded += 1
+                return row[0], bytes(row[1])
+        except Exception as e:
+            self._error('read', e)
+            return None
+
+    def store(self, key, ts, body):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute('INSERT OR REPLACE INTO odds_cache (key, ts, body) VALUES (?, ?, ?)', (key, ts, sqlite3.Binary(body)))
+                self.writes += 1
+                if self.writes % self.PRUNE_EVERY == 0:
+                    conn.execute('DELETE FROM odds_cache WHERE ts <= ?', (time.time() - ODDS_CACHE_TTL - ODDS_STALE_TTL,))
+        except Exception as e:
+            self._error('write', e)
+
+    def clear(self):
+        try:
+            with self._lock:
+                self._connect().execute('DELETE FROM odds_cache')
+        except Exception as e:
+            self._error('clear', e)
+
+    def get_stats(self):
+        return {'path': self.path, 'reads': self.reads, 'loaded': self.loaded, 'writes': self.writes, 'errors': self.errors}
+
+ODDS_DISK = OddsDiskCache(os.path.join(os.environ.get('DATA_DIR', '.'), 'odds_cache.sqlite3')) if ODDS_DISK_CACHE else None
+
+
+class OddsCache:
+    """Bounded LRU cache of upstream odds lists keyed by canonical odds key.
+
+    Entries are dicts ({'data', 'ts', 'body', 'bytes'}) encoded once on insert;
+    'bytes' is the encoded JSON size and counts toward max_bytes. Entries older
+    than ODDS_CACHE_TTL + ODDS_STALE_TTL are dropped, and the least recently
+    used keys are evicted beyond max_keys or max_bytes.
+    """
+    def __init__(self, max_keys=ODDS_CACHE_MAX_KEYS, max_bytes=ODDS_CACHE_MAX_BYTES, disk=None):
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self._entries = OrderedDict()  # key -> entry
+        self._key_stats = OrderedDict()  # key -> {'hits', 'stale', 'misses'}, outlives evicted entries
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.warmed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _count(self, key, field):
+        stats = self._key_stats.get(key)
+        if stats is None:
+            stats = self._key_stats[key] = {'hits': 0, 'stale': 0, 'misses': 0}
+            while len(self._key_stats) > self.max_keys * 4:
+                self._key_stats.popitem(last=False)
+        else:
+            self._key_stats.move_to_end(key)
+        stats[field] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry['bytes']
+        return entry
+
+    def lookup(self, key):
+        """(entry, 'fresh' | 'stale') for a servable entry, else (None, None); counts hit/miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            state = None
+            if entry is not None:
+                age = now - entry['ts']
+                if age < ODDS_CACHE_TTL:
+                    state = 'fresh'
+                elif age < ODDS_CACHE_TTL + ODDS_STALE_TTL:
+                    state = 'stale'
+                else:
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+            if state is None and self.disk is not None:
+                entry, state = self._warm(key, now)
+            if state is None:
+                self.misses += 1
+                self._count(key, 'misses')
+                return None, None
+            self._entries.move_to_end(key)
+            if state == 'fresh':
+                self.hits += 1
+                self._count(key, 'hits')
+            else:
+                self.stale_hits += 1
+                self._count(key, 'stale')
+            return entry, state
+
+    def _warm(self, key, now):
+        """Pull key from the disk tier into memory, keeping its original fetch time"""
+        row = self.disk.load(key)
+        if row is None:
+            return None, None
+        ts, raw = row
+        try:
+            data = json.loads(raw.decode('utf-8'))
+        except Exception:
+            return None, None
+        if not isinstance(data, list) or not data:
+            return None, None
+        entry = self._insert(key, data, ts, CachedBody(raw))
+        self.warmed += 1
+        return entry, ('fresh' if now - ts < ODDS_CACHE_TTL else 'stale')
+
+    def warm(self, key):
+        """Entry for key, loading it from the disk tier if needed; no stats"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.disk is not None:
+                entry = self._warm(key, time.time())[0]
+            return entry
+
+    def get(self, key):
+        """Entry for key regardless of age, without touching LRU order or stats"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, data):
+        ts = time.time()
+        body = CachedBody(encode_json(data))
+        with self._lock:
+            entry = self._insert(key, data, ts, body)
+        if self.disk is not None:
+            self.disk.store(key, ts, body.body)
+        return entry
+
+    def _insert(self, key, data, ts, body):
+        """Store an entry and enforce the bounds; caller holds the lock"""
+        entry = {'data': data, 'ts': ts, 'body': body, 'body_ts': ts, 'bytes': len(body.body)}
+        self._remove(key)
+        self._entries[key] = entry
+        self.bytes += entry['bytes']
+        # Expired entries go first, then least recently used beyond the bounds
+        horizon = time.time() - ODDS_CACHE_TTL - ODDS_STALE_TTL
+        for k in [k for k, e in self._entries.items() if e['ts'] <= horizon]:
+            self._remove(k)
+            self.expirations += 1
+        while len(self._entries) > 1 and (len(self._entries) > self.max_keys or self.bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_stats(self):
+        now = time.time()
+        with self._lock:
+            keys = []
+            for key, entry in reversed(self._entries.items()):
+                stats = self._key_stats.get(key) or {'hits': 0, 'stale': 0, 'misses': 0}
+                keys.append({
+                    'key': key,
+                    'items': len(entry['data']),
+                    'bytes': entry['bytes'],
+                    'ageSeconds': int(now - entry['ts']),
+                    'hits': stats['hits'],
+                    'staleHits': stats['stale'],
+                    'misses': stats['misses'],
+                })
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'maxKeys': self.max_keys,
+                'maxBytes': self.max_bytes,
+                'ttlSeconds': ODDS_CACHE_TTL,
+                'staleSeconds': ODDS_STALE_TTL,
+                'hits': self.hits,
+                'staleHits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'warmedFromDisk': self.warmed,
+                'disk': self.disk.get_stats() if self.disk is not None else None,
+                'keys': keys,
+            }
+
+ODDS_CACHE = OddsCache(disk=ODDS_DISK)
+
+
+def cache_entry_body(entry):
+    """CachedBody for an odds cache entry ({'data', 'ts'}), encoded once per refresh"""
+    body = entry.get('body')
+    if body is None or entry.get('body_ts') != entry.get('ts'):
+        body = CachedBody(encode_json(entry['data']))
+        entry['body'] = body
+        entry['body_ts'] = entry.get('ts')
+    return body
+
 # --- Odds/demo helpers -------------------------------------------------------
 def convert_local_matches_to_app_format(local_matches):
     """Convert stored demo/local matches (which may use legacy market keys)
@@ -378,6 +2786,138 @@ def convert_local_matches_to_app_format(local_matches):
         pass
     return out
 
+# Normalized odds view (/api/odds?view=app): upstream events in the app's match format
+ODDS_VIEW_MARKETS = {'h2h': 'match_result', 'totals': 'total_goals', 'btts': 'both_teams_score'}
+ODDS_VIEW_SIDES = {'match_result': ('home', 'draw', 'away'), 'total_goals': ('over', 'under'), 'both_teams_score': ('yes', 'no')}
+ODDS_VIEW_FIELDS = ('id', 'homeTeam', 'awayTeam', 'league', 'sportKey', 'commenceTime', 'date', 'time', 'status', 'markets', 'bookmakers')
+ODDS_VIEW_PICKS = ('best', 'consensus')
+ODDS_VIEW_MAX_VARIANTS = int(os.environ.get('ODDS_VIEW_MAX_VARIANTS', '32'))  # memoized projections per cache entry
+ODDS_VIEW_LIVE_SECONDS = 7200  # same rule as the frontend: live for two hours after kickoff
+
+def pick_price(prices, pick):
+    """Best (highest) or consensus (median) decimal price across bookmakers"""
+    if pick == 'consensus':
+        prices = sorted(prices)
+        mid = len(prices) // 2
+        value = prices[mid] if len(prices) % 2 else (prices[mid - 1] + prices[mid]) / 2.0
+    else:
+        value = max(prices)
+    return round(value, 2)
+
+def normalize_odds_event(event, pick='best', now=None):
+    """One Odds API event as an app-format match, with one price per outcome across all bookmakers"""
+    home = event.get('home_team')
+    away = event.get('away_team')
+    bookmakers = event.get('bookmakers') or []
+    prices = {}  # (market, side, totals point) -> [price]
+    for book in bookmakers:
+        for market in book.get('markets') or []:
+            name = ODDS_VIEW_MARKETS.get(market.get('key'))
+            if name is None:
+                continue
+            for outcome in market.get('outcomes') or []:
+                price = outcome.get('price')
+                if not isinstance(price, (int, float)) or price <= 1:
+                    continue
+                label = outcome.get('name')
+                if name == 'match_result':
+                    side = 'home' if label == home else 'away' if label == away else 'draw' if label == 'Draw' else None
+                else:
+                    side = str(label).lower() if label in ('Over', 'Under', 'Yes', 'No') else None
+                if side is not None:
+                    point = outcome.get('point') if name == 'total_goals' else None
+                    prices.setdefault((name, side, point), []).append(price)
+    markets = {}
+    # Totals: the line most bookmakers quote, closest to 2.5 on a tie
+    lines = {}
+    for (name, side, point), values in prices.items():
+        if name == 'total_goals' and side == 'over':
+            lines[point] = len(values)
+    line = max(lines, key=lambda p: (lines[p], -abs((p if isinstance(p, (int, float)) else 2.5) - 2.5))) if lines else None
+    for name, sides in ODDS_VIEW_SIDES.items():
+        point = line if name == 'total_goals' else None
+        if all((name, side, point) in prices for side in sides):
+            markets[name] = {side: pick_price(prices[(name, side, point)], pick) for side in sides}
+            if point is not None:
+                markets[name]['line'] = point
+    kickoff = parse_commence_time(event.get('commence_time'))
+    now = time.time() if now is None else now
+    when = datetime.fromtimestamp(kickoff, timezone.utc) if kickoff is not None else None
+    return {
+        'id': event.get('id'),
+        'homeTeam': home,
+        'awayTeam': away,
+        'league': event.get('sport_title') or event.get('sport_key') or 'Football League',
+        'sportKey': event.get('sport_key'),
+        'commenceTime': event.get('commence_time'),
+        'date': when.strftime('%Y-%m-%d') if when else '',
+        'time': when.strftime('%H:%M') if when else '',
+        'status': 'upcoming' if kickoff is None or kickoff > now else 'live' if now - kickoff < ODDS_VIEW_LIVE_SECONDS else 'finished',
+        'markets': markets,
+        'bookmakers': len(bookmakers),
+    }
+
+def next_status_change(events, now):
+    """Earliest time after now at which an event's view status moves on (kickoff or end of live)"""
+    until = float('inf')
+    for event in events:
+        kickoff = parse_commence_time(event.get('commence_time')) if isinstance(event, dict) else None
+        if kickoff is None:
+            continue
+        change = kickoff if kickoff > now else kickoff + ODDS_VIEW_LIVE_SECONDS
+        if now < change < until:
+            until = change
+    return until
+
+def project_matches(matches, fields=None, markets=None):
+    """Keep only the requested match fields and markets (fields always include id)"""
+    if not fields and not markets:
+        return matches
+    out = []
+    for match in matches:
+        item = {k: match[k] for k in fields if k in match} if fields else dict(match)
+        if markets and isinstance(item.get('markets'), dict):
+            item['markets'] = {k: v for k, v in item['markets'].items() if k in markets}
+        out.append(item)
+    return out
+
+def odds_view_body(entry, pick='best', fields=None, markets=None):
+    """CachedBody of an odds cache entry's normalized view.
+
+    The normalized matches are computed once per cache refresh (entry ts) and
+    pick; each fields/markets projection is encoded once on top of them. They
+    are recomputed early when a kickoff passes, so match status stays current.
+    """
+    now = time.time()
+    views = entry.get('views')
+    if views is None or entry.get('views_ts') != entry.get('ts') or now >= entry.get('views_until', 0):
+        views = {}
+        entry['views_until'] = next_status_change(entry['data'], now)
+        entry['views_ts'] = entry.get('ts')
+        entry['views'] = views
+    body = views.get((pick, fields, markets))
+    if body is None:
+        matches = views.get(pick)
+        if matches is None:
+            matches = [normalize_odds_event(e, pick, now) for e in entry['data'] if isinstance(e, dict)]
+            views[pick] = matches
+        body = CachedBody(encode_json({'matches': project_matches(matches, fields, markets), 'pick': pick}))
+        if len(views) < ODDS_VIEW_MAX_VARIANTS:
+            views[(pick, fields, markets)] = body
+    return body
+
+_APP_MATCHES = [(None, None)]  # [(matches version, converted matches)]
+
+def local_matches_app_format():
+    """convert_local_matches_to_app_format of the stored matches, once per matches version"""
+    version, matches = _APP_MATCHES[0]
+    if version != game_server.get_version('matches'):
+        with game_server.match_lock.read_lock():
+            version = game_server.get_version('matches')
+            matches = convert_local_matches_to_app_format(game_server.game_data.get('matches'))
+        _APP_MATCHES[0] = (version, matches)
+    return matches
+
 def get_demo_sports_list():
     """Provide a minimal sports list so clients can operate even when upstream is unavailable.
     Includes the leagues we fetch by default on the client.
@@ -392,7 +2932,480 @@ def get_demo_sports_list():
     except Exception:
         return []
 
+def parse_commence_time(value):
+    """Parse an Odds API commence_time ('2024-05-01T18:30:00Z') to epoch seconds"""
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except Exception:
+        return None
+
+class OddsPrefetcher:
+    """Background scheduler that refreshes odds for configured sports ahead of expiry.
+
+    Each sport is refreshed more often the closer its next kickoff is, within a
+    per-hour upstream credit budget. A 429 from upstream pauses all fetches with
+    exponential backoff; other failures back off only the affected sport.
+    """
+    REGIONS = 'uk'
+    MARKETS = 'h2h,totals'
+    ODDS_FORMAT = 'decimal'
+
+    def __init__(self):
+        mode = os.environ.get('ODDS_PREFETCH', 'auto').lower()
+        if mode == 'auto':
+            # Only spend credits on our own key unless explicitly enabled
+            self.enabled = bool(os.environ.get('ODDS_API_KEY'))
+        else:
+            self.enabled = mode in ('1', 'true', 'yes', 'on')
+        configured = [s.strip() for s in os.environ.get('ODDS_PREFETCH_SPORTS', '').split(',') if s.strip()]
+        self.sports = configured or [s['key'] for s in get_demo_sports_list()]
+        self.credits_per_hour = int(os.environ.get('ODDS_PREFETCH_CREDITS_PER_HOUR', '60'))
+        # Refresh intervals by time until the next kickoff: live/within 3h, within 24h, later
+        self.interval_near = int(os.environ.get('ODDS_PREFETCH_NEAR_SECONDS', '300'))
+        self.interval_today = int(os.environ.get('ODDS_PREFETCH_TODAY_SECONDS', '900'))
+        self.interval_far = int(os.environ.get('ODDS_PREFETCH_FAR_SECONDS', '3600'))
+        self.cost = len(self.REGIONS.split(',')) * len(self.MARKETS.split(','))
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._spent = []  # [(ts, credits)] within the last hour
+        self._due = {sport: 0.0 for sport in self.sports}
+        self._failures = {}
+        self._backoff_until = 0.0
+        self._backoff_429 = 0
+        self.stats = {'fetches': 0, 'errors': 0, 'rate_limited': 0, 'budget_waits': 0, 'last_fetch': {}}
+        self._keys = set()
+        self._thread = None
+
+    def cache_key(self, sport):
+        return odds_cache_key(sport, self.REGIONS, self.MARKETS, self.ODDS_FORMAT)
+
+    def manages(self, cache_key):
+        return self._thread is not None and cache_key in self._keys
+
+    def upstream_url(self, sport):
+        odds_key = os.environ.get('ODDS_API_KEY')
+        if odds_key:
+            return odds_api_url(sport, self.REGIONS, self.MARKETS, self.ODDS_FORMAT, odds_key)
+        fallback_base = os.environ.get('FALLBACK_PROXY_BASE', 'https://scoreleague-api.onrender.com').rstrip('/')
+        if not fallback_base:
+            return None
+        return f"{fallback_base}/api/odds?sport={quote(sport)}&regions={self.REGIONS}&markets={self.MARKETS}&oddsFormat={self.ODDS_FORMAT}"
+
+    def start(self):
+        if not self.enabled or not self.sports or self._thread is not None:
+            return False
+        self._keys = {self.cache_key(sport) for sport in self.sports}
+        self._thread = threading.Thread(target=self._loop, name='odds-prefetch', daemon=True)
+        self._thread.start()
+        print(f"⏱️  Odds prefetcher: {len(self.sports)} sports, {self.credits_per_hour} credits/hour")
+        return True
+
+    def refresh_interval(self, sport, now=None):
+        """Seconds until the next refresh, based on the closest kickoff in the cached odds"""
+        now = now or time.time()
+        entry = ODDS_CACHE.get(self.cache_key(sport))
+        kickoffs = []
+        for event in (entry or {}).get('data') or []:
+            ts = parse_commence_time(event.get('commence_time')) if isinstance(event, dict) else None
+            # Matches that started within the last 3 hours may still be in play
+            if ts is not None and ts > now - 3 * 3600:
+                kickoffs.append(ts)
+        if not kickoffs:
+            interval = self.interval_far
+        else:
+            until = min(kickoffs) - now
+            if until < 3 * 3600:
+                interval = self.interval_near
+            elif until < 24 * 3600:
+                interval = self.interval_today
+            else:
+                interval = self.interval_far
+        # Refresh a minute ahead of expiry so reads of prefetched keys stay fresh cache hits
+        return max(min(30, ODDS_CACHE_TTL / 2), min(interval, ODDS_CACHE_TTL - 60))
+
+    def _credits_available_at(self, now):
+        """Earliest time at which one more fetch fits into the hourly budget"""
+        self._spent = [(ts, c) for ts, c in self._spent if ts > now - 3600]
+        spent = sum(c for _, c in self._spent)
+        if spent + self.cost <= self.credits_per_hour:
+            return now
+        freed = 0
+        for ts, c in self._spent:
+            freed += c
+            if spent - freed + self.cost <= self.credits_per_hour:
+                return ts + 3600
+        return now + 3600
+
+    def _loop(self):
+        # Entries restored from the disk tier keep their schedule instead of all refetching at boot
+        for sport in self.sports:
+            entry = ODDS_CACHE.warm(self.cache_key(sport))
+            if entry is not None:
+                with self._lock:
+                    self._due[sport] = entry['ts'] + self.refresh_interval(sport, entry['ts'])
+        while True:
+            now = time.time()
+            with self._lock:
+                sport, due = min(self._due.items(), key=lambda kv: kv[1])
+                wait_until = max(due, self._backoff_until)
+                if wait_until <= now:
+                    budget_at = self._credits_available_at(now)
+                    if budget_at > now:
+                        self.stats['budget_waits'] += 1
+                        wait_until = budget_at
+            if wait_until > now:
+                self._wake.wait(min(wait_until - now, 60))
+                self._wake.clear()
+                continue
+            self._refresh(sport)
+
+    def _refresh(self, sport):
+        url = self.upstream_url(sport)
+        cache_key = self.cache_key(sport)
+        now = time.time()
+        if not url:
+            with self._lock:
+                self._due[sport] = now + self.interval_far
+            return
+        with self._lock:
+            self._spent.append((now, self.cost))
+        try:
+            data = ODDS_FLIGHTS.do(cache_key, lambda: fetch_odds_into_cache(cache_key, url))
+            with self._lock:
+                self.stats['fetches'] += 1
+                self.stats['last_fetch'][sport] = {'ts': now, 'items': len(data) if isinstance(data, list) else 0}
+                self._failures.pop(sport, None)
+                self._backoff_429 = 0
+                self._due[sport] = now + self.refresh_interval(sport, now)
+            proxy_log('/api/odds', 'prefetch', f"key={cache_key} items={len(data) if isinstance(data, list) else 0}")
+        except UpstreamHTTPError as e:
+            with self._lock:
+                if e.code == 429:
+                    # Rate limited: pause every sport, doubling up to an hour
+                    self.stats['rate_limited'] += 1
+                    self._backoff_429 = min(self._backoff_429 * 2 or 60, 3600)
+                    self._backoff_until = now + self._backoff_429
+                    self._due[sport] = self._backoff_until
+                else:
+                    self._fail(sport, now)
+            proxy_log('/api/odds', 'prefetch-error', f"key={cache_key} status={e.code}")
+        except Exception as e:
+            with self._lock:
+                self._fail(sport, now)
+            proxy_log('/api/odds', 'prefetch-error', f"key={cache_key} {type(e).__name__}")
+
+    def _fail(self, sport, now):
+        self.stats['errors'] += 1
+        failures = self._failures[sport] = self._failures.get(sport, 0) + 1
+        self._due[sport] = now + min(60 * (2 ** (failures - 1)), self.interval_far)
+
+    def get_stats(self):
+        now = time.time()
+        with self._lock:
+            spent = sum(c for ts, c in self._spent if ts > now - 3600)
+            return {
+                'enabled': self.enabled,
+                'running': self._thread is not None,
+                'sports': list(self.sports),
+                'creditsPerHour': self.credits_per_hour,
+                'creditsUsedLastHour': spent,
+                'backoffSeconds': max(0, int(self._backoff_until - now)),
+                'nextRefresh': {sport: max(0, int(due - now)) for sport, due in self._due.items()},
+                'fetches': self.stats['fetches'],
+                'errors': self.stats['errors'],
+                'rateLimited': self.stats['rate_limited'],
+                'budgetWaits': self.stats['budget_waits'],
+                'lastFetch': dict(self.stats['last_fetch']),
+            }
+
+ODDS_PREFETCHER = OddsPrefetcher()
+
+# --- Live updates (Server-Sent Events) ----------------------------------------
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_MAX_QUEUE = int(os.environ.get('SSE_MAX_QUEUE', '1000'))  # frames a slow client may fall behind before it is cut off
+SSE_REPLAY_EVENTS = int(os.environ.get('SSE_REPLAY_EVENTS', '512'))  # recent events kept for Last-Event-ID resume
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', '1000'))
+STREAM_PREAMBLE = b'retry: 3000\n\n'  # client reconnect delay (ms)
+
+METRICS.describe('sse_subscribers', 'gauge', 'Open /api/stream connections')
+METRICS.describe('sse_events_total', 'counter', 'Events published to /api/stream by type')
+METRICS.describe('sse_dropped_total', 'counter', 'Stream subscribers cut off for falling SSE_MAX_QUEUE frames behind')
+
+class StreamSubscriber:
+    """One /api/stream client: its filters and the frames waiting to be written"""
+    __slots__ = ('users', 'leagues', 'sports', 'types', 'wake', 'frames', 'closed')
+
+    def __init__(self, users, leagues, sports, types, wake):
+        self.users = users
+        self.leagues = leagues
+        self.sports = sports
+        self.types = types
+        self.wake = wake  # called from any thread when frames arrive
+        self.frames = deque()  # appended by publishers, popped by the writer; both ends are thread-safe
+        self.closed = False
+
+    def wants(self, event_type, sport):
+        if self.types and event_type not in self.types:
+            return False
+        return sport is None or not self.sports or sport in self.sports
+
+    def push(self, frame):
+        if len(self.frames) >= SSE_MAX_QUEUE:
+            # Too far behind: drop it; the client reconnects with Last-Event-ID
+            self.closed = True
+            METRICS.inc('sse_dropped_total')
+        else:
+            self.frames.append(frame)
+        self.wake()
+
+    def drain(self):
+        """Everything queued so far as one write"""
+        frames = []
+        while True:
+            try:
+                frames.append(self.frames.popleft())
+            except IndexError:
+                return b''.join(frames)
+
+class EventBus:
+    """Fan-out of live updates to /api/stream subscribers.
+
+    Each event is encoded once into an SSE frame and the same bytes are queued
+    for every matching subscriber. User events (bet, balance) only reach
+    subscribers of that user, league events only subscribers of that league;
+    everything else is broadcast, narrowed by the sport and types filters.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._all = set()
+        self._by_user = {}  # userId -> set(StreamSubscriber)
+        self._by_league = {}  # leagueId -> set(StreamSubscriber)
+        self._recent = deque(maxlen=SSE_REPLAY_EVENTS)  # (seq, type, users, leagues, sport, frame)
+        self.published = 0
+
+    def has_subscribers(self):
+        return bool(self._all)
+
+    def subscribe(self, query, wake, last_event_id=None):
+        """Register a subscriber from /api/stream query params; None when the server is full"""
+        params = parse_qs(query or '')
+        def values(name):
+            return {v.strip() for raw in params.get(name, []) for v in raw.split(',') if v.strip()}
+        sub = StreamSubscriber(values('userId'), values('leagueId'), values('sport'), values('types'), wake)
+        with self._lock:
+            if len(self._all) >= SSE_MAX_SUBSCRIBERS:
+                return None
+            self._all.add(sub)
+            for user_id in sub.users:
+                self._by_user.setdefault(user_id, set()).add(sub)
+            for league_id in sub.leagues:
+                self._by_league.setdefault(league_id, set()).add(sub)
+            try:
+                last = int(last_event_id) if last_event_id else None
+            except ValueError:
+                last = None
+            if last is not None:
+                for seq, event_type, users, leagues, sport, frame in self._recent:
+                    if seq > last and self._matches(sub, event_type, users, leagues, sport):
+                        sub.frames.append(frame)
+            count = len(self._all)
+        METRICS.set('sse_subscribers', count)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._all.discard(sub)
+            for index, keys in ((self._by_user, sub.users), (self._by_league, sub.leagues)):
+                for key in keys:
+                    subs = index.get(key)
+                    if subs is not None:
+                        subs.discard(sub)
+                        if not subs:
+                            del index[key]
+            count = len(self._all)
+        METRICS.set('sse_subscribers', count)
+
+    @staticmethod
+    def _matches(sub, event_type, users, leagues, sport):
+        if users:
+            return bool(sub.users & users) and sub.wants(event_type, sport)
+        if leagues:
+            return bool(sub.leagues & leagues) and sub.wants(event_type, sport)
+        return sub.wants(event_type, sport)
+
+    def publish(self, event_type, data, users=(), leagues=(), sport=None):
+        """Queue one event for every matching subscriber; returns its id"""
+        users = frozenset(u for u in users if u)
+        leagues = frozenset(l for l in leagues if l)
+        payload = encode_json(data)
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            frame = b'id: %d\nevent: %s\ndata: %s\n\n' % (seq, event_type.encode('ascii'), payload)
+            self._recent.append((seq, event_type, users, leagues, sport, frame))
+            if users:
+                candidates = set().union(*(self._by_user.get(u, ()) for u in users))
+            elif leagues:
+                candidates = set().union(*(self._by_league.get(l, ()) for l in leagues))
+            else:
+                candidates = self._all
+            for sub in candidates:
+                if not sub.closed and sub.wants(event_type, sport):
+                    sub.push(frame)
+            self.published += 1
+        METRICS.inc('sse_events_total', {'type': event_type})
+        return seq
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._all),
+                'userFilters': len(self._by_user),
+                'leagueFilters': len(self._by_league),
+                'published': self.published,
+                'lastEventId': self._seq,
+                'replayBuffered': len(self._recent),
+            }
+
+EVENTS = EventBus()
+
+class Route:
+    __slots__ = ('method', 'pattern', 'handler', 'admin')
+
+    def __init__(self, method, pattern, handler, admin=False):
+        self.method = method
+        self.pattern = pattern
+        self.handler = handler
+        self.admin = admin
+
+class Router:
+    """Declarative method + path dispatch for the API.
+
+    Static paths resolve with one dict lookup; patterns with {param} segments
+    live in a per-method segment trie (literal segments win over parameters).
+    Handlers register with the get()/post() decorators; admin=True routes
+    require X-Admin-Token when ADMIN_TOKEN is set.
+    """
+    def __init__(self):
+        self._static = {}  # (method, path) -> Route
+        self._tries = {}  # method -> node {'children': {}, 'param': (name, node) | None, 'route': Route | None}
+
+    @staticmethod
+    def _node():
+        return {'children': {}, 'param': None, 'route': None}
+
+    def add(self, method, pattern, handler, admin=False):
+        route = Route(method, pattern, handler, admin)
+        if '{' not in pattern:
+            self._static[(method, pattern)] = route
+            return route
+        node = self._tries.setdefault(method, self._node())
+        for segment in pattern.strip('/').split('/'):
+            if segment.startswith('{') and segment.endswith('}'):
+                name = segment[1:-1]
+                if node['param'] is None:
+                    node['param'] = (name, self._node())
+                elif node['param'][0] != name:
+                    raise ValueError(f"conflicting parameter names at {pattern}")
+                node = node['param'][1]
+            else:
+                node = node['children'].setdefault(segment, self._node())
+        node['route'] = route
+        return route
+
+    def get(self, pattern, admin=False):
+        return self._decorator('GET', pattern, admin)
+
+    def post(self, pattern, admin=False):
+        return self._decorator('POST', pattern, admin)
+
+    def _decorator(self, method, pattern, admin):
+        def register(handler):
+            self.add(method, pattern, handler, admin)
+            return handler
+        return register
+
+    def match(self, method, path):
+        """(Route, params) for method and path, or (None, None)"""
+        route = self._static.get((method, path))
+        if route is not None:
+            return route, {}
+        root = self._tries.get(method)
+        if root is None:
+            return None, None
+        params = {}
+        route = self._match_node(root, path.strip('/').split('/'), 0, params)
+        if route is None:
+            return None, None
+        return route, params
+
+    def _match_node(self, node, segments, i, params):
+        if i == len(segments):
+            return node['route']
+        child = node['children'].get(segments[i])
+        if child is not None:
+            route = self._match_node(child, segments, i + 1, params)
+            if route is not None:
+                return route
+        if node['param'] is not None:
+            name, child = node['param']
+            route = self._match_node(child, segments, i + 1, params)
+            if route is not None:
+                params[name] = unquote(segments[i])
+                return route
+        return None
+
+    def routes(self):
+        routes = list(self._static.values())
+        stack = list(self._tries.values())
+        while stack:
+            node = stack.pop()
+            if node['route'] is not None:
+                routes.append(node['route'])
+            stack.extend(node['children'].values())
+            if node['param'] is not None:
+                stack.append(node['param'][1])
+        return routes
+
+ROUTER = Router()
+
+# Global game server instance
+game_server = MultiUserGameServer()
+
 class MultiUserRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def setup(self):
+        super().setup()
+        METRICS.inc('http_connections_active')
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            METRICS.inc('http_connections_active', value=-1)
+
+    def handle_one_request(self):
+        """Handle one request and record its route, status code and latency"""
+        self.command = None
+        self.route = None
+        self.status_code = None
+        started = time.perf_counter()
+        super().handle_one_request()
+        if self.command is None or self.status_code is None:
+            return
+        if self.route is not None:
+            route = self.route.pattern
+        elif self.command == 'OPTIONS':
+            route = 'preflight'
+        else:
+            route = 'unmatched' if urlparse(self.path).path.startswith('/api/') else 'static'
+        METRICS.observe('http_request_duration_seconds', time.perf_counter() - started, {'method': self.command, 'route': route})
+        METRICS.inc('http_requests_total', {'method': self.command, 'route': route, 'status': str(self.status_code)})
+
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urlparse(self.path)
@@ -415,325 +3428,611 @@ class MultiUserRequestHandler(http.server.SimpleHTTPRequestHandler):
     
     def handle_api_get(self, parsed_path):
         """Handle API GET requests"""
-        path = parsed_path.path
-        query = parsed_path.query or ''
-        
-        # Health checks for client online/offline detection
-        if path == '/health' or path == '/api/health':
+        self.dispatch_route(parsed_path.path, parsed_path.query or '')
+    
+    def dispatch_route(self, path, query, data=None):
+        """Look up the route for this method and path and call its handler.
+
+        GET handlers receive the raw query string, POST handlers the parsed
+        JSON body; path parameters are passed as keyword arguments.
+        """
+        route, params = ROUTER.match(self.command, path)
+        if route is None:
+            self.send_json_response({'error': 'Endpoint not found'}, 404)
+            return
+        self.route = route
+        if route.admin and not self._admin_allowed():
+            self.send_json_response({'error': 'Forbidden: admin token required'}, 403)
+            return
+        route.handler(self, data if self.command == 'POST' else query, **params)
+    
+    def _admin_allowed(self):
+        # Admin protection (enabled only if ADMIN_TOKEN is set)
+        admin_token = os.environ.get('ADMIN_TOKEN')
+        if not admin_token:
+            return True
+        provided = self.headers.get('X-Admin-Token') or self.headers.get('x-admin-token') or ''
+        return provided == admin_token
+    
+    # Health checks for client online/offline detection
+    @ROUTER.get('/health')
+    @ROUTER.get('/api/health')
+    def get_health(self, query):
+        self.send_json_response({
+            'ok': True,
+            'uptime': time.time(),
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    @ROUTER.get('/api/metrics')
+    def get_metrics(self, query):
+        """Prometheus text exposition of request, cache, upstream and persistence metrics"""
+        cache = ODDS_CACHE.get_stats()
+        METRICS.set('odds_cache_entries', cache['entries'])
+        METRICS.set('odds_cache_bytes', cache['bytes'])
+        METRICS.set('odds_cache_lookups_total', cache['hits'], {'result': 'hit'})
+        METRICS.set('odds_cache_lookups_total', cache['staleHits'], {'result': 'stale'})
+        METRICS.set('odds_cache_lookups_total', cache['misses'], {'result': 'miss'})
+        METRICS.set('odds_cache_evictions_total', cache['evictions'])
+        pools = (UPSTREAM_POOL.get_stats(), ASYNC_UPSTREAM_POOL.get_stats())
+        for event in ('created', 'reused', 'discarded', 'retries'):
+            METRICS.set('upstream_connections_total', sum(pool[event] for pool in pools), {'event': event})
+        METRICS.set('process_threads', threading.active_count())
+        with game_server._commit_cond:
+            METRICS.set('persist_pending_commits', len(game_server._pending))
+        body = METRICS.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    @ROUTER.get('/api/debug/persistence')
+    def get_debug_persistence(self, query):
+        self.send_json_response({
+            'success': True,
+            'persistence': game_server.get_persist_stats()
+        })
+    
+    @ROUTER.get('/api/debug/odds-cache')
+    def get_debug_odds_cache(self, query):
+        self.send_json_response({
+            'success': True,
+            'oddsCache': ODDS_CACHE.get_stats()
+        })
+    
+    @ROUTER.get('/api/debug/upstream-pool')
+    def get_debug_upstream_pool(self, query):
+        self.send_json_response({
+            'success': True,
+            'upstreamPool': UPSTREAM_POOL.get_stats(),
+            'asyncUpstreamPool': ASYNC_UPSTREAM_POOL.get_stats()
+        })
+    
+    @ROUTER.get('/api/debug/odds-prefetch')
+    def get_debug_odds_prefetch(self, query):
+        self.send_json_response({
+            'success': True,
+            'prefetch': ODDS_PREFETCHER.get_stats()
+        })
+    
+    @ROUTER.get('/api/debug/stream')
+    def get_debug_stream(self, query):
+        self.send_json_response({
+            'success': True,
+            'stream': EVENTS.get_stats()
+        })
+    
+    @ROUTER.get('/api/stream')
+    def get_stream(self, query):
+        """Server-Sent Events: odds refreshes, match results, bets, balances and leaderboards as they happen"""
+        wake = threading.Event()
+        sub = EVENTS.subscribe(query, wake.set, self.headers.get('Last-Event-ID'))
+        if sub is None:
+            self.send_json_response({'error': 'Too many stream subscribers'}, 503, {'Retry-After': '30'})
+            return
+        self.close_connection = True
+        try:
+            self.send_response(200)
+            for name, value in self.stream_headers():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(STREAM_PREAMBLE + sub.drain())
+            self.wfile.flush()
+            while not sub.closed:
+                wake.wait(SSE_HEARTBEAT_SECONDS)
+                wake.clear()
+                self.wfile.write(sub.drain() or b': ping\n\n')
+                self.wfile.flush()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            EVENTS.unsubscribe(sub)
+    
+    def stream_headers(self):
+        return [
+            ('Content-Type', 'text/event-stream'),
+            ('Cache-Control', 'no-cache'),
+            ('X-Accel-Buffering', 'no'),  # keep reverse proxies from buffering the stream
+            ('Access-Control-Allow-Origin', self._get_cors_origin()),
+            ('Vary', 'Origin'),
+            ('Connection', 'close'),
+        ]
+    
+    def _page_params(self, query, statuses, filters):
+        """limit/cursor/order/status plus the given filter params, {} when the request asks for the whole list.
+
+        Sends 400 and returns None when a value is invalid.
+        """
+        names = ('limit', 'cursor', 'order', 'status') + filters
+        params = {k: v[0].strip() for k, v in parse_qs(query or '').items() if k in names and v[0].strip()}
+        if not params:
+            return {}
+        try:
+            limit = int(params.get('limit', PAGE_DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            self.send_json_response({'error': 'limit must be a positive number'}, 400)
+            return None
+        order = params.get('order', 'asc').lower()
+        status = params.get('status', '').lower() or None
+        if order not in ('asc', 'desc') or (status is not None and status not in statuses):
+            self.send_json_response({'error': f"order must be asc or desc and status one of {', '.join(statuses)}"}, 400)
+            return None
+        page = {name: params.get(name) for name in filters}
+        page.update(limit=min(limit, PAGE_MAX_LIMIT), cursor=params.get('cursor'), descending=order == 'desc', status=status)
+        return page
+    
+    @ROUTER.get('/api/matches')
+    def get_matches(self, query):
+        page = self._page_params(query, ('upcoming', 'live', 'finished'), ('from', 'to'))
+        if page is None:
+            return
+        if page:
+            try:
+                with game_server.match_lock.read_lock():
+                    matches, next_cursor = game_server.page_matches(
+                        page['limit'], page['cursor'], page['descending'], page['status'], page['from'], page['to'])
+                    body = encode_json({'success': True, 'matches': matches, 'nextCursor': next_cursor})
+            except ValueError:
+                self.send_json_response({'error': 'Invalid cursor'}, 400)
+                return
+            self.send_json_bytes(body)
+            return
+        # The list only changes on settle/reset, so it is encoded once per version.
+        # Encode under the read lock so a concurrent settle can't tear the list.
+        with game_server.match_lock.read_lock():
+            cached = RESPONSE_CACHE.get('matches', game_server.get_version('matches'), lambda: {
+                'success': True,
+                'matches': game_server.game_data['matches']
+            })
+        self.send_cached_body(cached)
+    
+    @ROUTER.get('/api/matches/{match_id}')
+    def get_match(self, query, match_id):
+        # Return a single match by ID
+        cached = None
+        with game_server.match_lock.read_lock():
+            found = game_server.matches_by_id.get(str(match_id)) if match_id else None
+            if found:
+                cached = RESPONSE_CACHE.get('match:' + str(match_id), game_server.get_version('matches'),
+                                            lambda: { 'success': True, 'match': found })
+        if cached:
+            self.send_cached_body(cached)
+        else:
+            self.send_json_response({ 'error': 'Match not found' }, 404)
+    
+    def _since_param(self, query):
+        """The ?since= version as an int, None when absent; sends 400 and returns False when malformed"""
+        raw = (parse_qs(query or '').get('since') or [''])[0].strip()
+        if not raw:
+            return None
+        try:
+            return int(raw)
+        except ValueError:
+            self.send_json_response({'error': 'since must be a version number'}, 400)
+            return False
+    
+    @ROUTER.get('/api/leagues/user/{user_id}')
+    def get_user_leagues(self, query, user_id):
+        since = self._since_param(query)
+        if since is False:
+            return
+        version, changes = game_server.changes_since(user_id, since if since is not None else -1)
+        if since is None:
             self.send_json_response({
-                'ok': True,
-                'uptime': time.time(),
-                'timestamp': datetime.now().isoformat()
+                'success': True,
+                'version': version,
+                'leagues': game_server.get_user_leagues(user_id)
             })
             return
-        
-        if path == '/api/matches':
+        if changes is None:
             self.send_json_response({
                 'success': True,
-                'matches': game_server.game_data['matches']
+                'version': version,
+                'since': since,
+                'full': True,
+                'leagues': game_server.get_user_leagues(user_id)
             })
-        
-        elif path.startswith('/api/matches/'):
-            # Return a single match by ID
-            parts = path.split('/')
-            match_id_raw = parts[-1] if len(parts) >= 4 else None
-            match_id = unquote(match_id_raw) if match_id_raw else None
-            found = None
-            if match_id:
-                for m in game_server.game_data['matches']:
-                    try:
-                        if m and str(m.get('id')) == str(match_id):
-                            found = m
-                            break
-                    except Exception:
-                        continue
-            if found:
-                self.send_json_response({ 'success': True, 'match': found })
+            return
+        member_of = game_server.leagues_by_user.get(user_id) or {}
+        changed = changes.get('league', [])
+        self.send_json_response({
+            'success': True,
+            'version': version,
+            'since': since,
+            'full': False,
+            'leagues': [member_of[league_id] for league_id in changed if league_id in member_of],
+            'removedLeagueIds': [league_id for league_id in changed if league_id not in member_of]
+        })
+    
+    @ROUTER.get('/api/bets/user/{user_id}')
+    def get_user_bets(self, query, user_id):
+        since = self._since_param(query)
+        if since is False:
+            return
+        page = self._page_params(query, ('pending', 'won', 'lost'), ('matchId', 'leagueId'))
+        if page is None:
+            return
+        with game_server.user_locks(user_id):
+            version, changes = game_server.changes_since(user_id, since if since is not None else -1)
+            if since is None and page:
+                try:
+                    bets, next_cursor = game_server.page_user_bets(
+                        user_id, page['limit'], page['cursor'], page['descending'],
+                        page['status'], page['matchId'], page['leagueId'])
+                except ValueError:
+                    bets = None
+                body = encode_json({
+                    'success': True,
+                    'version': version,
+                    'bets': bets,
+                    'nextCursor': next_cursor
+                }) if bets is not None else None
+            elif since is None:
+                body = encode_json({
+                    'success': True,
+                    'version': version,
+                    'bets': game_server.user_bets(user_id)
+                })
+            elif changes is None or 'reset' in changes:
+                # Too far behind (or the history was cleared): send everything once
+                body = encode_json({
+                    'success': True,
+                    'version': version,
+                    'since': since,
+                    'full': True,
+                    'bets': game_server.user_bets(user_id),
+                    'balance': self._balance(user_id)
+                })
             else:
-                self.send_json_response({ 'error': 'Match not found' }, 404)
-        
-        # --- Secure server-side proxy for The Odds API ---
-        elif path == '/api/odds/sports':
-            params_sp = parse_qs(query or '')
-            bypass_sp = str((params_sp.get('bypass_cache') or [''])[0]).lower() in ('1','true','yes','on')
-            # Serve sports from cache when fresh
+                bets = []
+                for bet_id in changes.get('bet', ()):
+                    owner, bet = game_server.locate_bet(bet_id)
+                    if bet is not None and owner == user_id:
+                        bets.append(bet)
+                response = {'success': True, 'version': version, 'since': since, 'full': False, 'bets': bets}
+                if 'user' in changes:
+                    response['balance'] = self._balance(user_id)
+                body = encode_json(response)
+        if body is None:
+            self.send_json_response({'error': 'Invalid cursor'}, 400)
+            return
+        self.send_json_bytes(body)
+    
+    @staticmethod
+    def _balance(user_id):
+        user = game_server.game_data['users'].get(user_id)
+        return {'coins': user.get('coins', 0), 'stats': user.get('stats')} if user else None
+    
+    @ROUTER.get('/api/leagues/{league_id}/leaderboard')
+    def get_leaderboard(self, query, league_id):
+        league = game_server.game_data['leagues'].get(league_id)
+        if league:
+            # Optional ?top=N&userId=X: only the first N entries plus the caller's rank
+            params_lb = parse_qs(query or '')
             try:
-                if isinstance(ODDS_SPORTS_CACHE.get('data'), list) and ODDS_SPORTS_CACHE['data'] and (time.time() - ODDS_SPORTS_CACHE.get('ts', 0) < ODDS_CACHE_TTL) and not bypass_sp:
-                    proxy_log('/api/odds/sports', 'cache', f"age={int(time.time() - ODDS_SPORTS_CACHE.get('ts', 0))}s size={len(ODDS_SPORTS_CACHE['data'])}")
-                    self.send_json_response(ODDS_SPORTS_CACHE['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': 'sports_list'})
-                    return
+                top = int((params_lb.get('top') or [''])[0]) if params_lb.get('top') else None
             except Exception:
-                pass
-            odds_key = os.environ.get('ODDS_API_KEY')
-            if not odds_key:
-                # Fallback: proxy to production API to avoid 501 during local dev
-                fallback_base = os.environ.get('FALLBACK_PROXY_BASE', 'https://scoreleague-api.onrender.com').rstrip('/')
+                top = None
+            me_id = (params_lb.get('userId') or [None])[0]
+            def build_leaderboard():
+                leaderboard, me = game_server.get_leaderboard(league_id, top, me_id)
+                response = {
+                    'success': True,
+                    'leaderboard': leaderboard
+                }
+                if top is not None:
+                    response['total'] = len(league['members'])
+                if me_id:
+                    response['me'] = me
+                return response
+            cache_key = f"leaderboard:{league_id}:{top}:{me_id or ''}"
+            self.send_cached_body(RESPONSE_CACHE.get(cache_key, game_server.get_version('league:' + league_id), build_leaderboard))
+        else:
+            self.send_json_response({'error': 'League not found'}, 404)
+    
+    # Set per request by AsyncHTTPServer: outcomes of upstream fetches it awaited
+    # (flight key -> data or exception) and the refreshes it should start
+    upstream_results = None
+    upstream_refreshes = None
+
+    def _upstream(self, flight_key, url, store, timeout):
+        """store(data) for the JSON at url, fetched once per flight_key across concurrent requests.
+
+        Under AsyncHTTPServer the fetch is handed to the event loop instead of
+        blocking this worker, and the handler is run again with its outcome.
+        """
+        if self.upstream_results is None:
+            return ODDS_FLIGHTS.do(flight_key, lambda: store(fetch_upstream_json(url, timeout)))
+        if flight_key not in self.upstream_results:
+            raise UpstreamDeferred(flight_key, url, store, timeout)
+        outcome = self.upstream_results[flight_key]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _upstream_fetched(self, flight_key):
+        """True on the second run of a request whose fetch of flight_key the event loop awaited"""
+        return self.upstream_results is not None and flight_key in self.upstream_results
+
+    def _refresh_upstream(self, flight_key, url, store, timeout, path):
+        """Stale-while-revalidate refresh on a thread, or on the event loop under AsyncHTTPServer"""
+        if self.upstream_refreshes is None:
+            refresh_in_background(flight_key, lambda: store(fetch_upstream_json(url, timeout)), path)
+        else:
+            self.upstream_refreshes.append((UpstreamDeferred(flight_key, url, store, timeout), path))
+
+    def _fallback_base(self):
+        """FALLBACK_PROXY_BASE when no ODDS_API_KEY is set, unless it points back at this host"""
+        fallback_base = os.environ.get('FALLBACK_PROXY_BASE', 'https://scoreleague-api.onrender.com').rstrip('/')
+        try:
+            req_host = self.headers.get('Host', '')
+            fb_host = urlparse(fallback_base).netloc
+        except Exception:
+            fb_host = ''
+        # Avoid recursion if running on the same host as the fallback
+        if fallback_base and fb_host and req_host != fb_host:
+            return fallback_base
+        return None
+
+    def _send_demo_odds(self, log_mode, view=None):
+        _, fields, markets = view or (None, None, None)
+        cached = RESPONSE_CACHE.get(f'odds-demo|{fields}|{markets}', game_server.get_version('matches'),
+                                    lambda: {'matches': project_matches(local_matches_app_format(), fields, markets)})
+        proxy_log('/api/odds', log_mode)
+        self.send_cached_body(cached, extra_headers={'X-Proxy-Mode': 'demo'})
+
+    # --- Secure server-side proxy for The Odds API ---
+    @ROUTER.get('/api/odds/sports')
+    def handle_odds_sports(self, query):
+        """Secure server-side proxy for The Odds API sports list"""
+        warm_sports_cache()
+        params_sp = parse_qs(query or '')
+        bypass_sp = str((params_sp.get('bypass_cache') or [''])[0]).lower() in ('1','true','yes','on')
+        odds_key = os.environ.get('ODDS_API_KEY')
+        fallback_base = None
+        if odds_key:
+            upstream = f"{ODDS_API_BASE}/v4/sports/?apiKey={odds_key}"
+        else:
+            # Fallback: proxy to production API to avoid 501 during local dev
+            fallback_base = self._fallback_base()
+            upstream = (f"{fallback_base}/api/odds/sports" + ("?bypass_cache=1" if bypass_sp else "")) if fallback_base else None
+        flight_key = 'sports_list' + ('|bypass' if bypass_sp else '')
+
+        # Serve sports from cache when fresh; an expired entry is served as 'stale' while one refresh runs
+        state = None if bypass_sp or self._upstream_fetched(flight_key) else odds_cache_state(ODDS_SPORTS_CACHE)
+        if state == 'stale' and upstream:
+            self._refresh_upstream(flight_key, upstream, store_sports, 12, '/api/odds/sports')
+        if state == 'fresh' or (state == 'stale' and upstream):
+            proxy_log('/api/odds/sports', 'cache' if state == 'fresh' else 'stale', f"age={int(time.time() - ODDS_SPORTS_CACHE.get('ts', 0))}s size={len(ODDS_SPORTS_CACHE['data'])}")
+            self.send_cached_body(cache_entry_body(ODDS_SPORTS_CACHE), extra_headers={'X-Proxy-Mode': 'cache' if state == 'fresh' else 'stale', 'X-Cache-Key': 'sports_list'})
+            return
+        has_cache = isinstance(ODDS_SPORTS_CACHE.get('data'), list) and ODDS_SPORTS_CACHE['data'] and not bypass_sp
+
+        if not odds_key:
+            if upstream:
                 try:
-                    req_host = self.headers.get('Host', '')
-                    fb_host = urlparse(fallback_base).netloc
-                except Exception:
-                    fb_host = ''
-                # Avoid recursion if running on the same host as the fallback
-                if fallback_base and fb_host and req_host != fb_host:
-                    try:
-                        upstream_fb = f"{fallback_base}/api/odds/sports" + ("?bypass_cache=1" if bypass_sp else "")
-                        req = urllib.request.Request(upstream_fb, headers={'User-Agent': 'ScoreLeague/1.0'})
-                        with urllib.request.urlopen(req, timeout=12) as resp:
-                            body = resp.read().decode('utf-8')
-                            data = json.loads(body)
-                            if isinstance(data, list) and data:
-                                ODDS_SPORTS_CACHE['data'] = data
-                                ODDS_SPORTS_CACHE['ts'] = time.time()
-                                proxy_log('/api/odds/sports', 'fallback-proxy', f"items={len(data)} base={fallback_base}")
-                                self.send_json_response(data, extra_headers={'X-Proxy-Mode': 'fallback-proxy', 'X-Cache-Key': 'sports_list'})
-                                return
-                            # On empty result, prefer any cached data
-                            if isinstance(ODDS_SPORTS_CACHE.get('data'), list) and ODDS_SPORTS_CACHE['data'] and not bypass_sp:
-                                proxy_log('/api/odds/sports', 'fallback-proxy-empty->cache', f"size={len(ODDS_SPORTS_CACHE['data'])}")
-                                self.send_json_response(ODDS_SPORTS_CACHE['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': 'sports_list'})
-                                return
-                            # Provide minimal demo list so clients can still function
-                            proxy_log('/api/odds/sports', 'fallback-proxy-empty->demo')
-                            self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'demo', 'X-Cache-Key': 'sports_list'})
-                            return
-                    except Exception as ex:
-                        proxy_log('/api/odds/sports', 'fallback-proxy-error', f"{type(ex).__name__}")
-                        pass
-                # Graceful degrade if fallback fails
-                proxy_log('/api/odds/sports', 'demo')
-                self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'demo', 'X-Cache-Key': 'sports_list'})
-                return
-            upstream = f"https://api.the-odds-api.com/v4/sports/?apiKey={odds_key}"
-            try:
-                req = urllib.request.Request(upstream, headers={'User-Agent': 'ScoreLeague/1.0'})
-                with urllib.request.urlopen(req, timeout=12) as resp:
-                    body = resp.read().decode('utf-8')
-                    data = json.loads(body)
+                    data = self._upstream(flight_key, upstream, store_sports, 12)
                     if isinstance(data, list) and data:
-                        ODDS_SPORTS_CACHE['data'] = data
-                        ODDS_SPORTS_CACHE['ts'] = time.time()
-                        proxy_log('/api/odds/sports', 'upstream', f"items={len(data)}")
-                        self.send_json_response(data, extra_headers={'X-Proxy-Mode': 'upstream', 'X-Cache-Key': 'sports_list'})
-                    else:
-                        # Prefer cached data on empty
-                        if isinstance(ODDS_SPORTS_CACHE.get('data'), list) and ODDS_SPORTS_CACHE['data'] and not bypass_sp:
-                            proxy_log('/api/odds/sports', 'upstream-empty->cache', f"size={len(ODDS_SPORTS_CACHE['data'])}")
-                            self.send_json_response(ODDS_SPORTS_CACHE['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': 'sports_list'})
-                        else:
-                            proxy_log('/api/odds/sports', 'upstream-empty')
-                            self.send_json_response(data, extra_headers={'X-Proxy-Mode': 'upstream-empty', 'X-Cache-Key': 'sports_list'})
-            except urllib.error.HTTPError as e:
-                # Avoid 5xx to keep CORS friendly; prefer cache, else demo list
-                try:
-                    if isinstance(ODDS_SPORTS_CACHE.get('data'), list) and ODDS_SPORTS_CACHE['data'] and not bypass_sp:
-                        proxy_log('/api/odds/sports', 'upstream-error->cache', f"status={e.code}")
-                        self.send_json_response(ODDS_SPORTS_CACHE['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Upstream-Status': str(e.code), 'X-Cache-Key': 'sports_list'})
-                    else:
-                        proxy_log('/api/odds/sports', 'upstream-error->demo', f"status={e.code}")
-                        self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'upstream-error', 'X-Upstream-Status': str(e.code), 'X-Cache-Key': 'sports_list'})
-                except Exception:
-                    proxy_log('/api/odds/sports', 'upstream-error->demo')
-                    self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'upstream-error', 'X-Cache-Key': 'sports_list'})
-            except Exception as e:
-                # Avoid 5xx to keep CORS friendly; prefer cache, else demo list
-                try:
-                    if isinstance(ODDS_SPORTS_CACHE.get('data'), list) and ODDS_SPORTS_CACHE['data'] and not bypass_sp:
-                        proxy_log('/api/odds/sports', 'error->cache', f"{type(e).__name__}")
-                        self.send_json_response(ODDS_SPORTS_CACHE['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': 'sports_list'})
-                    else:
-                        proxy_log('/api/odds/sports', 'error->demo', f"{type(e).__name__}")
-                        self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'error', 'X-Cache-Key': 'sports_list'})
-                except Exception:
-                    proxy_log('/api/odds/sports', 'error->demo')
-                    self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'error', 'X-Cache-Key': 'sports_list'})
-        
-        elif path == '/api/odds':
-            odds_key = os.environ.get('ODDS_API_KEY')
-            if not odds_key:
-                # Fallback: proxy to production API to avoid 501 during local dev
-                fallback_base = os.environ.get('FALLBACK_PROXY_BASE', 'https://scoreleague-api.onrender.com').rstrip('/')
-                try:
-                    req_host = self.headers.get('Host', '')
-                    fb_host = urlparse(fallback_base).netloc
-                except Exception:
-                    fb_host = ''
-                # Avoid recursion if running on the same host as the fallback
-                if fallback_base and fb_host and req_host != fb_host:
-                    try:
-                        # Build cache key from query
-                        try:
-                            params_fb = parse_qs(query or '')
-                            bypass_fb = str((params_fb.get('bypass_cache') or [''])[0]).lower() in ('1','true','yes','on')
-                            sport_fb = (params_fb.get('sport') or params_fb.get('sportKey') or [''])[0].strip()
-                            regions_fb = (params_fb.get('regions') or ['uk'])[0]
-                            markets_fb = (params_fb.get('markets') or ['h2h,totals'])[0]
-                            odds_format_fb = (params_fb.get('oddsFormat') or ['decimal'])[0]
-                            cache_key_fb = f"{sport_fb}|{regions_fb}|{markets_fb}|{odds_format_fb}"
-                            c = ODDS_CACHE.get(cache_key_fb)
-                            if c and isinstance(c.get('data'), list) and c['data'] and (time.time() - c.get('ts', 0) < ODDS_CACHE_TTL) and not bypass_fb:
-                                proxy_log('/api/odds', 'cache', f"key={cache_key_fb} size={len(c['data'])}")
-                                self.send_json_response(c['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': cache_key_fb})
-                                return
-                        except Exception:
-                            cache_key_fb = None
-                        q = query
-                        # Forward bypass intent to upstream fallback to skip its cache too
-                        if 'bypass_cache=1' not in (q or '') and (locals().get('bypass_fb') or False):
-                            q = (q + ('&' if q else '') + 'bypass_cache=1')
-                        upstream_fb = f"{fallback_base}/api/odds" + (f"?{q}" if q else "")
-                        req = urllib.request.Request(upstream_fb, headers={'User-Agent': 'ScoreLeague/1.0'})
-                        with urllib.request.urlopen(req, timeout=15) as resp:
-                            body = resp.read().decode('utf-8')
-                            data = json.loads(body)
-                            if isinstance(data, list) and data:
-                                if cache_key_fb:
-                                    ODDS_CACHE[cache_key_fb] = {'data': data, 'ts': time.time()}
-                                proxy_log('/api/odds', 'fallback-proxy', f"key={cache_key_fb or ''} items={len(data)} base={fallback_base}")
-                                self.send_json_response(data, extra_headers={'X-Proxy-Mode': 'fallback-proxy', 'X-Cache-Key': (cache_key_fb or '')})
-                                return
-                            # Prefer cached on empty
-                            if cache_key_fb and not (locals().get('bypass_fb') or False):
-                                c = ODDS_CACHE.get(cache_key_fb)
-                                if c and c.get('data'):
-                                    proxy_log('/api/odds', 'fallback-proxy-empty->cache', f"key={cache_key_fb} size={len(c['data'])}")
-                                    self.send_json_response(c['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': cache_key_fb})
-                                    return
-                            # Final fallback: serve normalized local demo matches
-                            demo = convert_local_matches_to_app_format(game_server.game_data.get('matches'))
-                            proxy_log('/api/odds', 'fallback-proxy-empty->demo')
-                            self.send_json_response({ 'matches': demo }, extra_headers={'X-Proxy-Mode': 'demo'})
-                            return
-                    except Exception as ex:
-                        proxy_log('/api/odds', 'fallback-proxy-error', f"{type(ex).__name__}")
-                        pass
-                # Graceful degrade if fallback fails
-                demo = convert_local_matches_to_app_format(game_server.game_data.get('matches'))
-                proxy_log('/api/odds', 'demo')
-                self.send_json_response({ 'matches': demo }, extra_headers={'X-Proxy-Mode': 'demo'})
+                        proxy_log('/api/odds/sports', 'fallback-proxy', f"items={len(data)} base={fallback_base}")
+                        self.send_cached_body(cache_entry_body(ODDS_SPORTS_CACHE), extra_headers={'X-Proxy-Mode': 'fallback-proxy', 'X-Cache-Key': 'sports_list'})
+                        return
+                    # On empty result, prefer any cached data
+                    if has_cache:
+                        proxy_log('/api/odds/sports', 'fallback-proxy-empty->cache', f"size={len(ODDS_SPORTS_CACHE['data'])}")
+                        self.send_cached_body(cache_entry_body(ODDS_SPORTS_CACHE), extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': 'sports_list'})
+                        return
+                    # Provide minimal demo list so clients can still function
+                    proxy_log('/api/odds/sports', 'fallback-proxy-empty->demo')
+                    self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'demo', 'X-Cache-Key': 'sports_list'})
+                    return
+                except Exception as ex:
+                    proxy_log('/api/odds/sports', 'fallback-proxy-error', f"{type(ex).__name__}")
+            # Graceful degrade if fallback fails
+            proxy_log('/api/odds/sports', 'demo')
+            self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'demo', 'X-Cache-Key': 'sports_list'})
+            return
+
+        try:
+            data = self._upstream(flight_key, upstream, store_sports, 12)
+            if isinstance(data, list) and data:
+                proxy_log('/api/odds/sports', 'upstream', f"items={len(data)}")
+                self.send_cached_body(cache_entry_body(ODDS_SPORTS_CACHE), extra_headers={'X-Proxy-Mode': 'upstream', 'X-Cache-Key': 'sports_list'})
+            elif has_cache:
+                # Prefer cached data on empty
+                proxy_log('/api/odds/sports', 'upstream-empty->cache', f"size={len(ODDS_SPORTS_CACHE['data'])}")
+                self.send_cached_body(cache_entry_body(ODDS_SPORTS_CACHE), extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': 'sports_list'})
+            else:
+                proxy_log('/api/odds/sports', 'upstream-empty')
+                self.send_json_response(data, extra_headers={'X-Proxy-Mode': 'upstream-empty', 'X-Cache-Key': 'sports_list'})
+        except UpstreamHTTPError as e:
+            # Avoid 5xx to keep CORS friendly; prefer cache, else demo list
+            if has_cache:
+                proxy_log('/api/odds/sports', 'upstream-error->cache', f"status={e.code}")
+                self.send_cached_body(cache_entry_body(ODDS_SPORTS_CACHE), extra_headers={'X-Proxy-Mode': 'cache', 'X-Upstream-Status': str(e.code), 'X-Cache-Key': 'sports_list'})
+            else:
+                proxy_log('/api/odds/sports', 'upstream-error->demo', f"status={e.code}")
+                self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'upstream-error', 'X-Upstream-Status': str(e.code), 'X-Cache-Key': 'sports_list'})
+        except Exception as e:
+            # Avoid 5xx to keep CORS friendly; prefer cache, else demo list
+            if has_cache:
+                proxy_log('/api/odds/sports', 'error->cache', f"{type(e).__name__}")
+                self.send_cached_body(cache_entry_body(ODDS_SPORTS_CACHE), extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': 'sports_list'})
+            else:
+                proxy_log('/api/odds/sports', 'error->demo', f"{type(e).__name__}")
+                self.send_json_response(get_demo_sports_list(), extra_headers={'X-Proxy-Mode': 'error', 'X-Cache-Key': 'sports_list'})
+
+    def _send_odds(self, cache_key, data, mode, view=None):
+        """Send freshly fetched odds, reusing the cache entry's encoded body when it is still there"""
+        entry = ODDS_CACHE.get(cache_key)
+        if entry is None or entry['data'] is not data:
+            if view is None:
+                self.send_json_response(data, extra_headers={'X-Proxy-Mode': mode, 'X-Cache-Key': cache_key})
                 return
-            params = parse_qs(query)
-            bypass = str((params.get('bypass_cache') or [''])[0]).lower() in ('1','true','yes','on')
-            sport = (params.get('sport') or params.get('sportKey') or [''])[0].strip()
+            entry = {'data': data, 'ts': time.time()}
+        self._send_odds_entry(entry, mode, cache_key, view)
+
+    def _send_odds_entry(self, entry, mode, cache_key, view=None):
+        """Send an odds cache entry raw, or as its normalized view when view is (pick, fields, markets)"""
+        body = cache_entry_body(entry) if view is None else odds_view_body(entry, *view)
+        self.send_cached_body(body, extra_headers={'X-Proxy-Mode': mode, 'X-Cache-Key': cache_key})
+
+    def _odds_view_params(self, params):
+        """(pick, fields, markets) for view=app, None for the raw upstream format; sends 400 and returns False on bad values"""
+        if str((params.get('view') or [''])[0]).lower() != 'app':
+            return None
+        pick = str((params.get('pick') or ['best'])[0]).lower()
+        if pick not in ODDS_VIEW_PICKS:
+            self.send_json_response({'error': f"pick must be one of {', '.join(ODDS_VIEW_PICKS)}"}, 400)
+            return False
+        if str((params.get('oddsFormat') or ['decimal'])[0]).lower() != 'decimal':
+            self.send_json_response({'error': 'view=app needs decimal odds'}, 400)
+            return False
+        def names(param, allowed):
+            requested = {n.strip() for raw in params.get(param, []) for n in raw.split(',') if n.strip()}
+            return tuple(n for n in allowed if n in requested) or None
+        fields = names('fields', ODDS_VIEW_FIELDS)
+        if fields and 'id' not in fields:
+            fields = ('id',) + fields
+        # markets may name app markets or upstream keys; the projection uses app names
+        requested = {ODDS_VIEW_MARKETS.get(n.strip(), n.strip()) for raw in params.get('markets', []) for n in raw.split(',')}
+        markets = tuple(n for n in ODDS_VIEW_SIDES if n in requested) or None
+        return pick, fields, markets
+
+    @ROUTER.get('/api/odds')
+    def handle_odds(self, query):
+        """Secure server-side proxy for The Odds API odds, one upstream fetch per cache key"""
+        params = parse_qs(query or '')
+        view = self._odds_view_params(params)
+        if view is False:
+            return
+        bypass = str((params.get('bypass_cache') or [''])[0]).lower() in ('1','true','yes','on')
+        sport = (params.get('sport') or params.get('sportKey') or [''])[0].strip()
+        regions = (params.get('regions') or ['uk'])[0]
+        markets = (params.get('markets') or ['h2h,totals'])[0]
+        odds_format = (params.get('oddsFormat') or ['decimal'])[0]
+        if view is not None:
+            # Fetch (and share the cache entry of) the raw upstream markets behind the app markets
+            upstream_keys = {v: k for k, v in ODDS_VIEW_MARKETS.items()}
+            markets = ','.join(upstream_keys[m] for m in view[2]) if view[2] else markets
+            query = urlencode([(k, markets if k == 'markets' else v) for k, vs in params.items() for v in vs
+                               if k not in ('view', 'pick', 'fields')])
+        cache_key = odds_cache_key(sport, regions, markets, odds_format)
+        odds_key = os.environ.get('ODDS_API_KEY')
+        fallback_base = None
+        if odds_key:
             if not sport:
                 proxy_log('/api/odds', 'bad-request', 'missing sport')
                 self.send_json_response({'error': 'Missing sport query param'}, 400)
                 return
-            regions = (params.get('regions') or ['uk'])[0]
-            markets = (params.get('markets') or ['h2h,totals'])[0]
-            odds_format = (params.get('oddsFormat') or ['decimal'])[0]
-            # Serve from cache if fresh
-            try:
-                cache_key = f"{sport}|{regions}|{markets}|{odds_format}"
-                c = ODDS_CACHE.get(cache_key)
-                if c and isinstance(c.get('data'), list) and c['data'] and (time.time() - c.get('ts', 0) < ODDS_CACHE_TTL) and not bypass:
-                    proxy_log('/api/odds', 'cache', f"key={cache_key} size={len(c['data'])}")
-                    self.send_json_response(c['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': cache_key})
-                    return
-            except Exception:
-                pass
-            upstream = (
-                f"https://api.the-odds-api.com/v4/sports/{quote(sport)}/odds/"
-                f"?regions={regions}&markets={markets}&oddsFormat={odds_format}&apiKey={odds_key}"
-            )
-            try:
-                req = urllib.request.Request(upstream, headers={'User-Agent': 'ScoreLeague/1.0'})
-                with urllib.request.urlopen(req, timeout=15) as resp:
-                    body = resp.read().decode('utf-8')
-                    data = json.loads(body)
-                    if isinstance(data, list) and data:
-                        ODDS_CACHE[cache_key] = {'data': data, 'ts': time.time()}
-                        proxy_log('/api/odds', 'upstream', f"key={cache_key} items={len(data)}")
-                        self.send_json_response(data, extra_headers={'X-Proxy-Mode': 'upstream', 'X-Cache-Key': cache_key})
-                    else:
-                        c = ODDS_CACHE.get(cache_key)
-                        if c and c.get('data') and not bypass:
-                            proxy_log('/api/odds', 'upstream-empty->cache', f"key={cache_key} size={len(c['data'])}")
-                            self.send_json_response(c['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': cache_key})
-                        else:
-                            proxy_log('/api/odds', 'upstream-empty', f"key={cache_key}")
-                            self.send_json_response(data, extra_headers={'X-Proxy-Mode': 'upstream-empty', 'X-Cache-Key': cache_key})
-            except urllib.error.HTTPError as e:
-                try:
-                    err_body = e.read().decode('utf-8')
-                except Exception:
-                    err_body = ''
-                # Gracefully degrade on common rate/authorization issues
-                if e.code in (400, 401, 402, 403, 404, 429, 500, 502, 503, 504):
-                    # Return empty odds list so frontend can continue without errors
-                    proxy_log('/api/odds', 'upstream-error', f"status={e.code}")
-                    self.send_json_response([], extra_headers={'X-Proxy-Mode': 'upstream-error', 'X-Upstream-Status': str(e.code)})
-                else:
-                    self.send_json_response({'error': 'Upstream error', 'status': e.code, 'body': err_body[:2000]}, 502)
-            except Exception as e:
-                # Avoid 5xx; prefer cached, else normalized demo matches
+            _, regions, markets, odds_format = cache_key.split('|')
+            upstream = odds_api_url(sport, regions, markets, odds_format, odds_key)
+        else:
+            # Fallback: proxy to production API to avoid 501 during local dev
+            fallback_base = self._fallback_base()
+            upstream = None
+            if fallback_base:
+                q = query
+                # Forward bypass intent to upstream fallback to skip its cache too
+                if bypass and 'bypass_cache=1' not in (q or ''):
+                    q = (q + ('&' if q else '') + 'bypass_cache=1')
+                upstream = f"{fallback_base}/api/odds" + (f"?{q}" if q else "")
+        flight_key = cache_key + ('|bypass' if bypass else '')
+        store = lambda data: store_odds(cache_key, data)
+
+        # Serve from cache if fresh; an expired entry is served as 'stale' while one refresh runs
+        c, state = (None, None) if bypass or self._upstream_fetched(flight_key) else ODDS_CACHE.lookup(cache_key)
+        # Keys owned by the prefetcher are refreshed on its schedule and credit budget
+        if state == 'stale' and upstream and not ODDS_PREFETCHER.manages(cache_key):
+            self._refresh_upstream(flight_key, upstream, store, 15, '/api/odds')
+        if state == 'fresh' or (state == 'stale' and upstream):
+            mode = 'cache' if state == 'fresh' else 'stale'
+            proxy_log('/api/odds', mode, f"key={cache_key} size={len(c['data'])}")
+            self._send_odds_entry(c, mode, cache_key, view)
+            return
+
+        def cached_entry():
+            entry = ODDS_CACHE.get(cache_key)
+            return entry if entry and entry.get('data') and not bypass else None
+
+        if not odds_key:
+            if upstream:
                 try:
-                    cache_key_safe = f"{sport}|{regions}|{markets}|{odds_format}"
-                    c = ODDS_CACHE.get(cache_key_safe)
-                    if c and c.get('data') and not bypass:
-                        proxy_log('/api/odds', 'error->cache', f"key={cache_key_safe} {type(e).__name__}")
-                        self.send_json_response(c['data'], extra_headers={'X-Proxy-Mode': 'cache', 'X-Cache-Key': cache_key_safe})
-                    else:
-                        demo = convert_local_matches_to_app_format(game_server.game_data.get('matches'))
-                        proxy_log('/api/odds', 'error->demo', f"{type(e).__name__}")
-                        self.send_json_response({'matches': demo}, extra_headers={'X-Proxy-Mode': 'demo'})
-                except Exception:
-                    demo = convert_local_matches_to_app_format(game_server.game_data.get('matches'))
-                    proxy_log('/api/odds', 'error->demo')
-                    self.send_json_response({'matches': demo}, extra_headers={'X-Proxy-Mode': 'demo'})
+                    data = self._upstream(flight_key, upstream, store, 15)
+                    if isinstance(data, list) and data:
+                        proxy_log('/api/odds', 'fallback-proxy', f"key={cache_key} items={len(data)} base={fallback_base}")
+                        self._send_odds(cache_key, data, 'fallback-proxy', view)
+                        return
+                    # Prefer cached on empty
+                    c = cached_entry()
+                    if c:
+                        proxy_log('/api/odds', 'fallback-proxy-empty->cache', f"key={cache_key} size={len(c['data'])}")
+                        self._send_odds_entry(c, 'cache', cache_key, view)
+                        return
+                    # Final fallback: serve normalized local demo matches
+                    self._send_demo_odds('fallback-proxy-empty->demo', view)
+                    return
+                except Exception as ex:
+                    proxy_log('/api/odds', 'fallback-proxy-error', f"{type(ex).__name__}")
+            # Graceful degrade if fallback fails
+            self._send_demo_odds('demo', view)
+            return
 
-        
-        elif path.startswith('/api/leagues/user/'):
-            user_id = path.split('/')[-1]
-            user_leagues = [league for league in game_server.game_data['leagues'].values() 
-                          if user_id in league['members']]
-            self.send_json_response({
-                'success': True,
-                'leagues': user_leagues
-            })
-        
-        elif path.startswith('/api/bets/user/'):
-            user_id = path.split('/')[-1]
-            user_bets = game_server.game_data['bets'].get(user_id, [])
-            self.send_json_response({
-                'success': True,
-                'bets': user_bets
-            })
-        
-        elif '/leaderboard' in path:
-            league_id = path.split('/')[-2]
-            league = game_server.game_data['leagues'].get(league_id)
-            if league:
-                leaderboard = []
-                for user_id in league['members']:
-                    user = game_server.game_data['users'].get(user_id)
-                    if user:
-                        user_bets = game_server.game_data['bets'].get(user_id, [])
-                        league_bets = [bet for bet in user_bets 
-                                     if 'leagueIds' in bet and league_id in bet['leagueIds']]
-                        
-                        league_winnings = sum(bet['potentialWin'] for bet in league_bets 
-                                            if bet['status'] == 'won')
-                        
-                        leaderboard.append({
-                            **user,
-                            'leagueStats': {
-                                'bets': len(league_bets),
-                                'winnings': league_winnings,
-                                'totalStaked': sum(bet['stake'] for bet in league_bets)
-                            }
-                        })
-                
-                leaderboard.sort(key=lambda x: x['coins'], reverse=True)
-                self.send_json_response({
-                    'success': True,
-                    'leaderboard': leaderboard
-                })
+        try:
+            data = self._upstream(flight_key, upstream, store, 15)
+            if isinstance(data, list) and data:
+                proxy_log('/api/odds', 'upstream', f"key={cache_key} items={len(data)}")
+                self._send_odds(cache_key, data, 'upstream', view)
             else:
-                self.send_json_response({'error': 'League not found'}, 404)
-        
-        else:
-            self.send_json_response({'error': 'Endpoint not found'}, 404)
-    
+                c = cached_entry()
+                if c:
+                    proxy_log('/api/odds', 'upstream-empty->cache', f"key={cache_key} size={len(c['data'])}")
+                    self._send_odds_entry(c, 'cache', cache_key, view)
+                else:
+                    proxy_log('/api/odds', 'upstream-empty', f"key={cache_key}")
+                    self.send_json_response(data if view is None else {'matches': [], 'pick': view[0]},
+                                            extra_headers={'X-Proxy-Mode': 'upstream-empty', 'X-Cache-Key': cache_key})
+        except UpstreamHTTPError as e:
+            # Gracefully degrade on common rate/authorization issues
+            if e.code in (400, 401, 402, 403, 404, 429, 500, 502, 503, 504):
+                # Return empty odds list so frontend can continue without errors
+                proxy_log('/api/odds', 'upstream-error', f"status={e.code}")
+                self.send_json_response([] if view is None else {'matches': [], 'pick': view[0]},
+                                        extra_headers={'X-Proxy-Mode': 'upstream-error', 'X-Upstream-Status': str(e.code)})
+            else:
+                self.send_json_response({'error': 'Upstream error', 'status': e.code, 'body': e.body[:2000]}, 502)
+        except Exception as e:
+            # Avoid 5xx; prefer cached, else normalized demo matches
+            c = cached_entry()
+            if c:
+                proxy_log('/api/odds', 'error->cache', f"key={cache_key} {type(e).__name__}")
+                self._send_odds_entry(c, 'cache', cache_key, view)
+            else:
+                self._send_demo_odds('error->demo', view)
+
     def handle_api_post(self, parsed_path):
         """Handle API POST requests"""
         path = parsed_path.path
@@ -747,29 +4046,24 @@ class MultiUserRequestHandler(http.server.SimpleHTTPRequestHandler):
         except:
             self.send_json_response({'error': 'Invalid JSON'}, 400)
             return
+
+        self.dispatch_route(path, parsed_path.query or '', data)
+    
+    @ROUTER.post('/api/auth/login')
+    def post_login(self, data):
+        username = data.get('username', '').strip()
+        if len(username) < 2:
+            self.send_json_response({'error': 'Username must be at least 2 characters'}, 400)
+            return
         
-        if path == '/api/auth/login':
-            username = data.get('username', '').strip()
-            if len(username) < 2:
-                self.send_json_response({'error': 'Username must be at least 2 characters'}, 400)
-                return
-            
-            # Check if user exists
-            existing_user = None
-            for user in game_server.game_data['users'].values():
-                if user['username'] == username:
-                    existing_user = user
-                    break
+        # Serialize logins per username so two racing requests can't create the same user twice
+        with game_server.user_locks('username:' + username):
+            existing_user = game_server.users_by_name.get(username)
             
-            if existing_user:
-                self.send_json_response({
-                    'success': True,
-                    'user': existing_user
-                })
-            else:
+            if not existing_user:
                 # Create new user
                 user_id = game_server.generate_id('user_')
-                new_user = {
+                new_user = User.compact({
                     'id': user_id,
                     'username': username,
                     'coins': 1000,
@@ -780,367 +4074,320 @@ class MultiUserRequestHandler(http.server.SimpleHTTPRequestHandler):
                         'biggestWin': 0,
                         'totalCombinedOdds': 0
                     }
-                }
+                })
                 
                 game_server.game_data['users'][user_id] = new_user
-                game_server.save_data()
-                
-                self.send_json_response({
-                    'success': True,
-                    'user': new_user
-                })
+                game_server.index_user(new_user)
+                game_server.commit({'op': 'put_user', 'user': new_user})
         
-        elif path == '/api/leagues/create':
-            name = data.get('name', '').strip()
-            creator_id = data.get('creatorId')
-            description = data.get('description', '').strip()
-            
-            if not name or not creator_id:
-                self.send_json_response({'error': 'League name and creator required'}, 400)
-                return
-            
-            league_id = game_server.generate_id('league_')
-            invite_code = uuid.uuid4().hex[:8].upper()
-            
-            league = {
-                'id': league_id,
-                'name': name,
-                'description': description,
-                'creatorId': creator_id,
-                'inviteCode': invite_code,
-                'members': [creator_id],
-                'createdAt': datetime.now().isoformat(),
-                'settings': {
-                    'maxMembers': 10
-                }
+        self.send_json_response({
+            'success': True,
+            'user': existing_user or new_user
+        })
+    
+    @ROUTER.post('/api/leagues/create')
+    def post_create_league(self, data):
+        name = data.get('name', '').strip()
+        creator_id = data.get('creatorId')
+        description = data.get('description', '').strip()
+        
+        if not name or not creator_id:
+            self.send_json_response({'error': 'League name and creator required'}, 400)
+            return
+        
+        league_id = game_server.generate_id('league_')
+        invite_code = uuid.uuid4().hex[:8].upper()
+        
+        league = League.compact({
+            'id': league_id,
+            'name': name,
+            'description': description,
+            'creatorId': creator_id,
+            'inviteCode': invite_code,
+            'members': [creator_id],
+            'createdAt': datetime.now().isoformat(),
+            'settings': {
+                'maxMembers': 10
             }
-            
-            game_server.game_data['leagues'][league_id] = league
-            game_server.save_data()
-            
-            self.send_json_response({
-                'success': True,
-                'league': league
-            })
+        })
         
-        elif path == '/api/leagues/join':
-            invite_code = data.get('inviteCode', '').upper()
-            user_id = data.get('userId')
-            
-            if not invite_code or not user_id:
-                self.send_json_response({'error': 'Invite code and user ID required'}, 400)
-                return
-            
-            league = None
-            for l in game_server.game_data['leagues'].values():
-                if l['inviteCode'] == invite_code:
-                    league = l
-                    break
-            
-            if not league:
-                self.send_json_response({'error': 'League not found'}, 404)
-                return
-            
+        game_server.game_data['leagues'][league_id] = league
+        game_server.index_league(league)
+        game_server.commit({'op': 'put_league', 'league': league})
+        
+        self.send_json_response({
+            'success': True,
+            'league': league
+        })
+    
+    @ROUTER.post('/api/leagues/join')
+    def post_join_league(self, data):
+        invite_code = data.get('inviteCode', '').upper()
+        user_id = data.get('userId')
+        
+        if not invite_code or not user_id:
+            self.send_json_response({'error': 'Invite code and user ID required'}, 400)
+            return
+        
+        league = game_server.leagues_by_invite.get(invite_code)
+        if not league:
+            self.send_json_response({'error': 'League not found'}, 404)
+            return
+        
+        # Membership check and append must be atomic or a league can overfill
+        with game_server.league_locks(league['id']):
             if user_id in league['members']:
-                self.send_json_response({'error': 'Already a member of this league'}, 400)
-                return
-            
-            if len(league['members']) >= league['settings']['maxMembers']:
-                self.send_json_response({'error': 'League is full'}, 400)
-                return
-            
-            league['members'].append(user_id)
-            game_server.save_data()
-            
-            self.send_json_response({
-                'success': True,
-                'league': league
-            })
+                error = 'Already a member of this league'
+            elif len(league['members']) >= league['settings']['maxMembers']:
+                error = 'League is full'
+            else:
+                error = None
+                league['members'].append(user_id)
+                game_server.index_league_member(league, user_id)
+                game_server.commit({'op': 'put_league', 'league': league})
+                body = encode_json({
+                    'success': True,
+                    'league': league
+                })
         
-        elif path == '/api/bets/place':
-            user_id = data.get('userId')
-            match_id = data.get('matchId')
-            market = data.get('market')
-            selection = data.get('selection')
-            odds = data.get('odds')
-            stake = data.get('stake')
-            league_ids = data.get('leagueIds', [])
-            
-            if not all([user_id, match_id, market, selection, odds, stake]):
-                self.send_json_response({'error': 'Missing required bet information'}, 400)
-                return
-            
-            user = game_server.game_data['users'].get(user_id)
-            if not user:
-                self.send_json_response({'error': 'User not found'}, 404)
-                return
-            
+        if error:
+            self.send_json_response({'error': error}, 400)
+            return
+        
+        self.send_json_bytes(body)
+    
+    @ROUTER.post('/api/bets/place')
+    def post_place_bet(self, data):
+        user_id = data.get('userId')
+        match_id = data.get('matchId')
+        market = data.get('market')
+        selection = data.get('selection')
+        odds = data.get('odds')
+        stake = data.get('stake')
+        league_ids = data.get('leagueIds', [])
+        
+        if not all([user_id, match_id, market, selection, odds, stake]):
+            self.send_json_response({'error': 'Missing required bet information'}, 400)
+            return
+        
+        user = game_server.game_data['users'].get(user_id)
+        if not user:
+            self.send_json_response({'error': 'User not found'}, 404)
+            return
+        
+        # Shared match lock keeps a settle from running mid-placement; the user
+        # stripe makes check-then-deduct atomic while other users bet in parallel
+        with game_server.match_lock.read_lock(), game_server.user_locks(user_id):
             if user['coins'] < stake:
-                self.send_json_response({'error': 'Insufficient coins'}, 400)
-                return
-            
-            bet_id = game_server.generate_id('bet_')
-            bet = {
-                'id': bet_id,
-                'userId': user_id,
-                'matchId': match_id,
-                'market': market,
-                'selection': selection,
-                'odds': odds,
-                'stake': stake,
-                'potentialWin': round(stake * odds),
-                'placedAt': datetime.now().isoformat(),
-                'status': 'pending',
-                'leagueIds': league_ids
-            }
-            
-            # Deduct coins
-            user['coins'] -= stake
-            user['stats']['totalBets'] += 1
-            
-            # Store bet
-            if user_id not in game_server.game_data['bets']:
-                game_server.game_data['bets'][user_id] = []
-            game_server.game_data['bets'][user_id].append(bet)
-            
-            game_server.save_data()
-            
-            self.send_json_response({
-                'success': True,
-                'bet': bet,
-                'user': user
-            })
+                body = None
+            else:
+                bet_id = game_server.generate_id('bet_')
+                bet = Bet.compact({
+                    'id': bet_id,
+                    'userId': user_id,
+                    'matchId': match_id,
+                    'market': market,
+                    'selection': selection,
+                    'odds': odds,
+                    'stake': stake,
+                    'potentialWin': round(stake * odds),
+                    'placedAt': datetime.now().isoformat(),
+                    'status': 'pending',
+                    'leagueIds': league_ids
+                })
+                
+                # Deduct coins
+                user['coins'] -= stake
+                user['stats']['totalBets'] += 1
+                
+                # Store bet
+                if user_id not in game_server.game_data['bets']:
+                    game_server.game_data['bets'][user_id] = []
+                game_server.game_data['bets'][user_id].append(bet)
+                game_server.index_bet(user_id, bet)
+                game_server.record_bet_placed(user_id, bet)
+                game_server.update_user_rank(user_id)
+                
+                future = game_server.commit({'op': 'put_user', 'user': user}, {'op': 'put_bet', 'bet': bet})
+                body = encode_json({
+                    'success': True,
+                    'bet': bet,
+                    'user': user
+                })
         
-        elif path.startswith('/api/matches/') and path.endswith('/settle'):
-            # Admin protection (enabled only if ADMIN_TOKEN is set)
-            admin_token = os.environ.get('ADMIN_TOKEN')
-            if admin_token:
-                provided = self.headers.get('X-Admin-Token') or self.headers.get('x-admin-token') or ''
-                if provided != admin_token:
-                    self.send_json_response({'error': 'Forbidden: admin token required'}, 403)
-                    return
-            # Example: /api/matches/match_1/settle
-            parts = path.split('/')
-            match_id = parts[3] if len(parts) >= 5 else None
-            try:
-                h = max(0, int(data.get('homeGoals', 0) or 0))
-                a = max(0, int(data.get('awayGoals', 0) or 0))
-            except Exception:
-                self.send_json_response({'error': 'Invalid score values'}, 400)
-                return
-
-            # Find match
-            match_idx = -1
-            for i, m in enumerate(game_server.game_data['matches']):
-                try:
-                    if m and str(m.get('id')) == str(match_id):
-                        match_idx = i
-                        break
-                except Exception:
-                    continue
-            if match_idx == -1:
-                self.send_json_response({'error': 'Match not found'}, 404)
-                return
-
-            match = game_server.game_data['matches'][match_idx]
-            # Update match state
-            match['status'] = 'finished'
-            match['score'] = { 'home': h, 'away': a }
-
-            # Compute winners for markets
-            results = compute_market_results(h, a)
-
-            # Iterate all user bets and settle those for this match
-            settled = 0
-            won = 0
-            for uid, bets in game_server.game_data['bets'].items():
-                if not isinstance(bets, list):
-                    continue
-                for bet in bets:
-                    try:
-                        if not bet or str(bet.get('status', 'pending')).lower() != 'pending':
-                            continue
-                        if str(bet.get('matchId')) != str(match_id):
-                            continue
-
-                        market = normalize_market(bet.get('market'))
-                        sel = normalize_selection(bet.get('selection'), market)
-
-                        is_winner = False
-                        if market == 'match_result':
-                            is_winner = (sel == results['match_result'])
-                        elif market == 'double_chance':
-                            is_winner = sel in results['double_chance']
-                        elif market == 'total_goals':
-                            is_winner = (sel == results['total_goals'])
-                        elif market == 'btts':
-                            is_winner = (sel == results['btts'])
-                        else:
-                            # Unknown market - leave as pending
-                            continue
-
-                        bet['status'] = 'won' if is_winner else 'lost'
-                        settled += 1
-
-                        # On win, credit payout
-                        if is_winner:
-                            won += 1
-                            user = game_server.game_data['users'].get(uid)
-                            if user:
-                                try:
-                                    stake = float(bet.get('stake', 0) or 0)
-                                    odds = float(bet.get('odds', 1) or 1)
-                                    potential = bet.get('potentialWin')
-                                    payout = int(round(potential if isinstance(potential, (int, float)) else stake * (odds if odds and odds > 0 else 1)))
-                                except Exception:
-                                    payout = int(round(float(bet.get('potentialWin') or 0)))
-                                user['coins'] = max(0, int(round(float(user.get('coins', 0)) + payout)))
-                                stats = user.setdefault('stats', {})
-                                stats['totalWinnings'] = max(0, int(round(float(stats.get('totalWinnings', 0)) + payout)))
-                                stats['biggestWin'] = max(int(round(float(stats.get('biggestWin', 0)))), int(payout))
-                    except Exception:
-                        # Skip on any data issue with this bet
-                        continue
-
-            game_server.save_data()
+        if body is None:
+            self.send_json_response({'error': 'Insufficient coins'}, 400)
+            return
+        
+        # Wait for the disk outside the locks so other bets keep flowing
+        future.wait(PERSIST_DURABLE_TIMEOUT)
+        self.send_json_bytes(body)
+    
+    @ROUTER.post('/api/matches/{match_id}/settle', admin=True)
+    def post_settle_match(self, data, match_id):
+        # Example: /api/matches/match_1/settle
+        try:
+            h = max(0, int(data.get('homeGoals', 0) or 0))
+            a = max(0, int(data.get('awayGoals', 0) or 0))
+        except Exception:
+            self.send_json_response({'error': 'Invalid score values'}, 400)
+            return
 
-            self.send_json_response({
-                'success': True,
-                'match': match,
-                'settled': settled,
-                'won': won,
-                'results': {
-                    'match_result': results['match_result'],
-                    'double_chance': sorted(list(results['double_chance'])),
-                    'total_goals': results['total_goals'],
-                    'btts': results['btts']
-                }
-            })
+        summaries, records = game_server.settle_matches([(match_id, h, a)])
+        summary = summaries[0]
+        if not summary:
+            self.send_json_response({'error': 'Match not found'}, 404)
+            return
+        body = encode_json({'success': True, **summary})
+        game_server.commit(*records, durable=True)
+        self.send_json_bytes(body)
+    
+    @ROUTER.post('/api/matches/settle-bulk', admin=True)
+    def post_settle_bulk(self, data):
+        # Example body: {"matches": [{"matchId": "match_1", "homeGoals": 2, "awayGoals": 1}, ...]}
+        items = data.get('matches')
+        if not isinstance(items, list) or not items:
+            self.send_json_response({'error': 'matches list is required'}, 400)
+            return
+        scores = []
+        try:
+            for item in items:
+                scores.append((
+                    str(item.get('matchId')),
+                    max(0, int(item.get('homeGoals', 0) or 0)),
+                    max(0, int(item.get('awayGoals', 0) or 0))
+                ))
+        except Exception:
+            self.send_json_response({'error': 'Invalid score values'}, 400)
+            return
 
-        elif path == '/api/bets/settle':
-            # Admin protection (enabled only if ADMIN_TOKEN is set)
-            admin_token = os.environ.get('ADMIN_TOKEN')
-            if admin_token:
-                provided = self.headers.get('X-Admin-Token') or self.headers.get('x-admin-token') or ''
-                if provided != admin_token:
-                    self.send_json_response({'error': 'Forbidden: admin token required'}, 403)
-                    return
-            bet_id = data.get('betId')
-            result = str(data.get('result', '')).lower()
-            if not bet_id or result not in ('won', 'lost'):
-                self.send_json_response({'error': 'Invalid parameters'}, 400)
-                return
-            
-            # Locate bet across all users
-            found_user_id = None
-            bet_ref = None
-            for uid, bets in game_server.game_data['bets'].items():
-                if not isinstance(bets, list):
-                    continue
-                for b in bets:
-                    if b and b.get('id') == bet_id:
-                        bet_ref = b
-                        found_user_id = uid
-                        break
-                if bet_ref:
-                    break
-            
-            if not bet_ref:
-                self.send_json_response({'error': 'Bet not found'}, 404)
-                return
-            
+        summaries, records = game_server.settle_matches(scores)
+        results = []
+        for (match_id, _, _), summary in zip(scores, summaries):
+            if summary:
+                results.append({'matchId': match_id, 'success': True, **summary})
+            else:
+                results.append({'matchId': match_id, 'success': False, 'error': 'Match not found'})
+        body = encode_json({
+            'success': True,
+            'settled': sum(r.get('settled', 0) for r in results),
+            'won': sum(r.get('won', 0) for r in results),
+            'matches': results
+        })
+        # One persistence write for the whole batch
+        game_server.commit(*records, durable=True)
+        self.send_json_bytes(body)
+    
+    @ROUTER.post('/api/bets/settle', admin=True)
+    def post_settle_bet(self, data):
+        bet_id = data.get('betId')
+        result = str(data.get('result', '')).lower()
+        if not bet_id or result not in ('won', 'lost'):
+            self.send_json_response({'error': 'Invalid parameters'}, 400)
+            return
+        
+        found_user_id, bet_ref = game_server.locate_bet(bet_id)
+        
+        if not bet_ref:
+            self.send_json_response({'error': 'Bet not found'}, 404)
+            return
+        
+        user = game_server.game_data['users'].get(found_user_id)
+        if not user:
+            self.send_json_response({'error': 'User not found'}, 404)
+            return
+        
+        with game_server.user_locks(found_user_id):
+            # Re-check under the lock so two settle calls can't both pay out
             prev_status = str(bet_ref.get('status', 'pending')).lower()
             if prev_status != 'pending':
-                self.send_json_response({'error': 'Bet already settled'}, 400)
-                return
-            
-            user = game_server.game_data['users'].get(found_user_id)
-            if not user:
-                self.send_json_response({'error': 'User not found'}, 404)
-                return
-            
-            # Settle
-            bet_ref['status'] = result
-            if result == 'won':
-                try:
-                    stake = float(bet_ref.get('stake', 0) or 0)
-                    odds = float(bet_ref.get('odds', 1) or 1)
-                    payout = int(round(bet_ref.get('potentialWin') or (stake * (odds if (odds and odds > 0) else 1))))
-                except Exception:
-                    payout = int(round(float(bet_ref.get('potentialWin') or 0)))
-                user['coins'] = max(0, int(round(float(user.get('coins', 0)) + payout)))
-                stats = user.setdefault('stats', {})
-                stats['totalWinnings'] = max(0, int(round(float(stats.get('totalWinnings', 0)) + payout)))
-                stats['biggestWin'] = max(int(round(float(stats.get('biggestWin', 0)))), int(payout))
-            
-            game_server.save_data()
-            self.send_json_response({'success': True, 'bet': bet_ref, 'user': user})
+                body = None
+            else:
+                # Settle
+                bet_ref['status'] = result
+                game_server.unindex_pending(bet_ref, found_user_id)
+                if result == 'won':
+                    try:
+                        stake = float(bet_ref.get('stake', 0) or 0)
+                        odds = float(bet_ref.get('odds', 1) or 1)
+                        payout = int(round(bet_ref.get('potentialWin') or (stake * (odds if (odds and odds > 0) else 1))))
+                    except Exception:
+                        payout = int(round(float(bet_ref.get('potentialWin') or 0)))
+                    user['coins'] = max(0, int(round(float(user.get('coins', 0)) + payout)))
+                    stats = user.setdefault('stats', {})
+                    stats['totalWinnings'] = max(0, int(round(float(stats.get('totalWinnings', 0)) + payout)))
+                    stats['biggestWin'] = max(int(round(float(stats.get('biggestWin', 0)))), int(payout))
+                    game_server.record_bet_won(found_user_id, bet_ref)
+                    game_server.update_user_rank(found_user_id)
+                
+                future = game_server.commit({'op': 'put_bet', 'bet': bet_ref}, {'op': 'put_user', 'user': user})
+                body = encode_json({'success': True, 'bet': bet_ref, 'user': user})
         
-        elif path == '/api/debug/reset-all':
-            # Admin protection (enabled only if ADMIN_TOKEN is set)
-            admin_token = os.environ.get('ADMIN_TOKEN')
-            if admin_token:
-                provided = self.headers.get('X-Admin-Token') or self.headers.get('x-admin-token') or ''
-                if provided != admin_token:
-                    self.send_json_response({'error': 'Forbidden: admin token required'}, 403)
-                    return
-            # Snapshot counts for response
-            try:
-                users_before = len(game_server.game_data.get('users') or {})
-                leagues_before = len(game_server.game_data.get('leagues') or {})
-                bets_before = sum(len(v) for v in (game_server.game_data.get('bets') or {}).values() if isinstance(v, list))
-            except Exception:
-                users_before = leagues_before = bets_before = 0
-            # Reset in-memory stores
+        if body is None:
+            self.send_json_response({'error': 'Bet already settled'}, 400)
+            return
+        
+        future.wait(PERSIST_DURABLE_TIMEOUT)
+        self.send_json_bytes(body)
+    
+    @ROUTER.post('/api/debug/reset-all', admin=True)
+    def post_reset_all(self, data):
+        # Snapshot counts for response
+        try:
+            users_before = len(game_server.game_data.get('users') or {})
+            leagues_before = len(game_server.game_data.get('leagues') or {})
+            bets_before = sum(len(v) for v in (game_server.game_data.get('bets') or {}).values() if isinstance(v, list))
+        except Exception:
+            users_before = leagues_before = bets_before = 0
+        # Reset in-memory stores
+        with game_server.match_lock.write_lock():
+            bets_before += game_server.discard_deferred_bets()
             game_server.game_data['users'] = {}
             game_server.game_data['leagues'] = {}
             game_server.game_data['bets'] = {}
             game_server.game_data['matches'] = []
-            # Clear odds caches
-            try:
-                ODDS_SPORTS_CACHE['data'] = None
-                ODDS_SPORTS_CACHE['ts'] = 0
-                ODDS_CACHE.clear()
-            except Exception:
-                pass
-            # Re-seed demo matches and persist
-            try:
-                game_server.initialize_demo_matches()
-            except Exception:
-                pass
-            game_server.save_data()
-            self.send_json_response({
-                'success': True,
-                'cleared': {
-                    'users': users_before,
-                    'leagues': leagues_before,
-                    'bets': bets_before
-                },
-                'matches': len(game_server.game_data.get('matches') or [])
-            })
-        
-        elif path == '/api/debug/reset-user':
-            # Admin protection (enabled only if ADMIN_TOKEN is set)
-            admin_token = os.environ.get('ADMIN_TOKEN')
-            if admin_token:
-                provided = self.headers.get('X-Admin-Token') or self.headers.get('x-admin-token') or ''
-                if provided != admin_token:
-                    self.send_json_response({'error': 'Forbidden: admin token required'}, 403)
-                    return
-            user_id = data.get('userId')
-            if not user_id:
-                self.send_json_response({'error': 'userId is required'}, 400)
-                return
-            user = game_server.game_data['users'].get(user_id)
-            if not user:
-                self.send_json_response({'error': 'User not found'}, 404)
-                return
-            coins = data.get('coins')
-            try:
-                coins = int(coins) if coins is not None else 1000
-            except Exception:
-                coins = 1000
-            clear_bets = bool(data.get('clearBets', True))
+            game_server.rebuild_indexes()
+            game_server.commit({'op': 'reset_all'})
+        # Clear odds caches
+        try:
+            ODDS_SPORTS_CACHE['data'] = None
+            ODDS_SPORTS_CACHE['ts'] = 0
+            ODDS_CACHE.clear()
+            RESPONSE_CACHE.clear()
+        except Exception:
+            pass
+        # Re-seed demo matches and persist
+        try:
+            game_server.initialize_demo_matches()
+        except Exception:
+            pass
+        self.send_json_response({
+            'success': True,
+            'cleared': {
+                'users': users_before,
+                'leagues': leagues_before,
+                'bets': bets_before
+            },
+            'matches': len(game_server.game_data.get('matches') or [])
+        })
+    
+    @ROUTER.post('/api/debug/reset-user', admin=True)
+    def post_reset_user(self, data):
+        user_id = data.get('userId')
+        if not user_id:
+            self.send_json_response({'error': 'userId is required'}, 400)
+            return
+        user = game_server.game_data['users'].get(user_id)
+        if not user:
+            self.send_json_response({'error': 'User not found'}, 404)
+            return
+        coins = data.get('coins')
+        try:
+            coins = int(coins) if coins is not None else 1000
+        except Exception:
+            coins = 1000
+        clear_bets = bool(data.get('clearBets', True))
+        with game_server.user_locks(user_id):
             # Reset user state
             user['coins'] = max(0, int(coins))
             stats = user.setdefault('stats', {})
@@ -1154,16 +4401,20 @@ class MultiUserRequestHandler(http.server.SimpleHTTPRequestHandler):
                     removed_bets = len(game_server.game_data['bets'].get(user_id, []) or [])
                 except Exception:
                     removed_bets = 0
+                removed_bets += game_server.discard_deferred_bets(user_id)
+                game_server.unindex_user_bets(user_id)
                 game_server.game_data['bets'][user_id] = []
-            game_server.save_data()
-            self.send_json_response({
-                'success': True,
-                'user': user,
-                'removedBets': removed_bets
-            })
-        
-        else:
-            self.send_json_response({'error': 'Endpoint not found'}, 404)
+                game_server.reset_member_stats(user_id)
+            game_server.update_user_rank(user_id)
+            records = [{'op': 'put_user', 'user': user}]
+            if clear_bets:
+                records.append({'op': 'clear_bets', 'userId': user_id})
+            game_server.commit(*records)
+        self.send_json_response({
+            'success': True,
+            'user': user,
+            'removedBets': removed_bets
+        })
     
     def _get_cors_origin(self):
         """Determine allowed CORS origin based on request Origin and env."""
@@ -1195,23 +4446,82 @@ class MultiUserRequestHandler(http.server.SimpleHTTPRequestHandler):
 
     def send_json_response(self, data, status_code=200, extra_headers=None):
         """Send JSON response"""
+        self.send_json_bytes(encode_json(data), status_code, extra_headers)
+
+    def send_json_bytes(self, body, status_code=200, extra_headers=None, etag=None, cached=None):
+        """Send an already-encoded JSON body, compressed when the client accepts it"""
+        if etag is None and status_code == 200 and self.command == 'GET':
+            cached = CachedBody(body)
+            etag = cached.etag
+        try:
+            encoding = choose_encoding(self.headers.get('Accept-Encoding'), len(body))
+        except ValueError:
+            # identity;q=0 (or *;q=0) and no coding we support: nothing we could send is acceptable
+            self.send_response(406)
+            self._send_json_headers(extra_headers)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if encoding:
+            # Each content-coding is its own representation, so it gets its own ETag
+            payload = cached.variant(encoding) if cached is not None else compress_body(body, encoding)
+            if etag:
+                etag = etag[:-1] + '-' + encoding + '"'
+        else:
+            payload = body
+        if etag and status_code == 200 and self._etag_matches(etag):
+            self.send_response(304)
+            self._send_json_headers(extra_headers)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
         self.send_response(status_code)
+        self._send_json_headers(extra_headers)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_cached_body(self, cached, extra_headers=None):
+        """Send a CachedBody, answering If-None-Match with 304 when it still matches"""
+        self.send_json_bytes(cached.body, extra_headers=extra_headers, etag=cached.etag, cached=cached)
+
+    def _etag_matches(self, etag):
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        for candidate in header.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == etag or candidate == '*':
+                return True
+        return False
+
+    def _send_json_headers(self, extra_headers=None):
         self.send_header('Content-type', 'application/json')
         cors_origin = self._get_cors_origin()
         self.send_header('Access-Control-Allow-Origin', cors_origin)
-        self.send_header('Vary', 'Origin')
+        self.send_header('Vary', 'Origin, Accept-Encoding')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Admin-Token')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Admin-Token, If-None-Match')
         # Expose debug headers to the browser for diagnostics (diag.html)
-        self.send_header('Access-Control-Expose-Headers', 'X-Proxy-Mode, X-Cache-Key, X-Upstream-Status')
+        self.send_header('Access-Control-Expose-Headers', 'X-Proxy-Mode, X-Cache-Key, X-Upstream-Status, ETag')
         if isinstance(extra_headers, dict):
+            proxy_mode = extra_headers.get('X-Proxy-Mode')
+            if proxy_mode:
+                route = self.route.pattern if getattr(self, 'route', None) is not None else ''
+                METRICS.inc('odds_responses_total', {'route': route, 'mode': proxy_mode})
             for hk, hv in extra_headers.items():
                 try:
                     self.send_header(str(hk), str(hv))
                 except Exception:
                     pass
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
     
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
@@ -1220,9 +4530,240 @@ class MultiUserRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', cors_origin)
         self.send_header('Vary', 'Origin')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Admin-Token')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Admin-Token, If-None-Match')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
+class MultiUserTCPServer(socketserver.ThreadingTCPServer):
+    """Threaded server sized for many concurrent mobile clients"""
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = int(os.environ.get('LISTEN_BACKLOG', '128'))
+
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', '16'))
+ASYNC_KEEPALIVE_SECONDS = float(os.environ.get('ASYNC_KEEPALIVE_SECONDS', '75'))
+ASYNC_MAX_HEADER_BYTES = 64 * 1024
+ASYNC_MAX_BODY_BYTES = int(os.environ.get('ASYNC_MAX_BODY_BYTES', str(1024 * 1024)))
+
+class AsyncHTTPServer:
+    """HTTP/1.1 keep-alive server on asyncio streams serving MultiUserRequestHandler routes.
+
+    Connections, including idle keep-alive ones, live on the event loop; a
+    worker thread is only used while a request is being handled. Upstream
+    odds fetches are awaited on the loop (AsyncUpstreamPool): a handler that
+    needs one raises UpstreamDeferred and is run again with the outcome, so
+    no worker waits on upstream.
+    """
+    def __init__(self, host, port, handler_class):
+        self.host = host
+        self.port = port
+        self.handler_class = handler_class
+        self.api_pool = ThreadPoolExecutor(ASYNC_WORKERS, thread_name_prefix='api')
+        self.flights = {}  # flight key -> asyncio.Task of an upstream fetch
+        self.connections = 0
+        self.requests = 0
+
+    async def serve_forever(self, on_ready=None):
+        server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port,
+            backlog=MultiUserTCPServer.request_queue_size, limit=ASYNC_MAX_HEADER_BYTES)
+        if on_ready:
+            on_ready()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername') or ('', 0)
+        self.connections += 1
+        METRICS.inc('http_connections_active')
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), ASYNC_KEEPALIVE_SECONDS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                coding = self._transfer_encoding(head)
+                length = None if coding else self._content_length(head)
+                status = None
+                if coding == b'chunked':
+                    try:
+                        body = await read_chunked(reader, ASYNC_MAX_BODY_BYTES)
+                        head = self._dechunked_head(head, len(body))
+                    except ValueError as e:
+                        status = '413 Payload Too Large' if 'too large' in str(e) else '400 Bad Request'
+                    except asyncio.LimitOverrunError:
+                        status = '400 Bad Request'
+                elif coding:
+                    status = '501 Not Implemented'
+                elif length is None or length > ASYNC_MAX_BODY_BYTES:
+                    status = '400 Bad Request' if length is None else '413 Payload Too Large'
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                if status:
+                    writer.write(f'HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+                    await writer.drain()
+                    break
+                path = head.split(b' ', 2)[1] if head.count(b' ') >= 2 else b''
+                if head.startswith(b'GET ') and path.split(b'?', 1)[0] == b'/api/stream':
+                    await self._serve_stream(head, path, reader, writer)
+                    break
+                response, keep_alive = await self._dispatch(head + body, peer)
+                self.requests += 1
+                writer.write(response)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            METRICS.inc('http_connections_active', value=-1)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _serve_stream(self, head, path, reader, writer):
+        """Hold an /api/stream connection on the event loop instead of a worker thread"""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        def wake():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # loop already closed
+        handler = self.handler_class.__new__(self.handler_class)
+        handler.headers = http.client.parse_headers(io.BytesIO(head.split(b'\r\n', 1)[1]))
+        query = path.decode('latin-1').partition('?')[2]
+        sub = EVENTS.subscribe(query, wake, handler.headers.get('Last-Event-ID'))
+        METRICS.inc('http_requests_total', {'method': 'GET', 'route': '/api/stream', 'status': '200' if sub else '503'})
+        if sub is None:
+            writer.write(b'HTTP/1.1 503 Service Unavailable\r\nRetry-After: 30\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            return
+        # SSE clients never send on the stream, so a read completing means they went away
+        gone = asyncio.ensure_future(reader.read(1))
+        try:
+            response = ''.join(f'{name}: {value}\r\n' for name, value in handler.stream_headers())
+            writer.write(b'HTTP/1.1 200 OK\r\n' + response.encode('latin-1') + b'\r\n' + STREAM_PREAMBLE + sub.drain())
+            await writer.drain()
+            while not sub.closed and not gone.done():
+                waiter = asyncio.ensure_future(ready.wait())
+                await asyncio.wait((waiter, gone), timeout=SSE_HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                ready.clear()
+                writer.write(sub.drain() or b': ping\n\n')
+                await writer.drain()
+        finally:
+            if gone.done() and not gone.cancelled():
+                gone.exception()  # consume a connection reset so asyncio does not log it
+            gone.cancel()
+            EVENTS.unsubscribe(sub)
+
+    async def _dispatch(self, raw, peer):
+        """Run the handler on a worker; await any upstream fetch it defers and run it again"""
+        loop = asyncio.get_running_loop()
+        results = {}
+        while True:
+            refreshes = []
+            outcome = await loop.run_in_executor(self.api_pool, self._run_handler, raw, peer, results, refreshes)
+            for deferred, path in refreshes:
+                self._start_refresh(deferred, path)
+            if not isinstance(outcome, UpstreamDeferred):
+                return outcome
+            if outcome.flight_key in results:
+                raise RuntimeError(f'handler deferred {outcome.flight_key} twice')
+            try:
+                results[outcome.flight_key] = await asyncio.shield(self._flight(outcome))
+            except Exception as e:
+                results[outcome.flight_key] = e
+
+    def _flight(self, deferred):
+        """The running fetch task for deferred.flight_key, started if there is none"""
+        task = self.flights.get(deferred.flight_key)
+        if task is None:
+            task = self.flights[deferred.flight_key] = asyncio.ensure_future(self._fetch(deferred))
+            task.add_done_callback(lambda _: self.flights.pop(deferred.flight_key, None))
+        return task
+
+    async def _fetch(self, deferred):
+        body = await fetch_upstream_async(deferred.url, deferred.timeout)
+        # Parsing, encoding and the disk tier write stay off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            self.api_pool, lambda: deferred.store(json.loads(body.decode('utf-8'))))
+
+    def _start_refresh(self, deferred, path):
+        """Stale-while-revalidate on the loop: start one refresh unless one is running"""
+        if deferred.flight_key in self.flights or ODDS_FLIGHTS.in_flight(deferred.flight_key):
+            return
+        def done(task):
+            if task.cancelled():
+                return
+            error = task.exception()
+            if error is None:
+                proxy_log(path, 'refresh', f"key={deferred.flight_key}")
+            else:
+                proxy_log(path, 'refresh-error', f"key={deferred.flight_key} {type(error).__name__}")
+        self._flight(deferred).add_done_callback(done)
+
+    @staticmethod
+    def _transfer_encoding(head):
+        """Lower-cased Transfer-Encoding header value (b'' when absent)"""
+        for line in head.split(b'\r\n')[1:]:
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'transfer-encoding':
+                return b','.join(part.strip() for part in value.lower().split(b',')) or b'identity'
+        return b''
+
+    @staticmethod
+    def _dechunked_head(head, length):
+        """Replace Transfer-Encoding with the decoded Content-Length for the handler"""
+        lines = [line for line in head[:-4].split(b'\r\n')
+                 if line.partition(b':')[0].strip().lower() not in (b'transfer-encoding', b'content-length')]
+        return b'\r\n'.join(lines) + b'\r\nContent-Length: ' + str(length).encode() + b'\r\n\r\n'
+
+    @staticmethod
+    def _content_length(head):
+        for line in head.split(b'\r\n')[1:]:
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    return None
+                return length if length >= 0 else None
+        return 0
+
+    def _run_handler(self, raw, peer, upstream_results, upstream_refreshes):
+        """Run one request through the handler class against in-memory streams.
+
+        Returns (response bytes, keep_alive), or the UpstreamDeferred the handler raised.
+        """
+        handler = self.handler_class.__new__(self.handler_class)
+        handler.upstream_results = upstream_results
+        handler.upstream_refreshes = upstream_refreshes
+        handler.server = self
+        handler.request = None
+        handler.client_address = tuple(peer[:2])
+        handler.directory = os.getcwd()
+        handler.protocol_version = 'HTTP/1.1'
+        handler.rfile = io.BytesIO(raw)
+        handler.wfile = io.BytesIO()
+        handler.close_connection = True
+        try:
+            handler.handle_one_request()
+        except UpstreamDeferred as deferred:
+            return deferred
+        except Exception as e:
+            print(f"❌ Error handling {peer}: {e}")
+            return b'HTTP/1.1 500 Internal Server Error\r\nContent-Length: 0\r\nConnection: close\r\n\r\n', False
+        response = handler.wfile.getvalue()
+        head = response.split(b'\r\n\r\n', 1)[0].lower()
+        # Keep-alive only works when the client can find the end of the response
+        framed = b'\r\ncontent-length:' in head or head[9:12] in (b'204', b'304')
+        return response, bool(response) and framed and not handler.close_connection
+
 if __name__ == '__main__':
     # Use PORT from environment when deployed (e.g., Render/Railway), default to 3001 locally
     try:
@@ -1230,8 +4771,11 @@ if __name__ == '__main__':
     except Exception:
         PORT = 3001
 
-    with socketserver.ThreadingTCPServer(("0.0.0.0", PORT), MultiUserRequestHandler) as httpd:
-        print('🚀 ScoreLeague Multi-User Server running on:')
+    # SERVER_MODE=asyncio serves many idle keep-alive clients without a thread each
+    server_mode = os.environ.get('SERVER_MODE', 'threading').lower()
+
+    def print_banner():
+        print(f'🚀 ScoreLeague Multi-User Server running on ({server_mode}):')
         print(f'   Local:  http://localhost:{PORT}')
         print(f'   Public: Bind 0.0.0.0:{PORT} (your host/platform will provide the external URL)')
         print('')
@@ -1239,10 +4783,20 @@ if __name__ == '__main__':
         print('🏆 Ready for private league competition!')
         print('')
         print('Press Ctrl+C to stop the server')
+        ODDS_PREFETCHER.start()
 
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print('\n💾 Saving data before shutdown...')
+    try:
+        if server_mode == 'asyncio':
+            asyncio.run(AsyncHTTPServer("0.0.0.0", PORT, MultiUserRequestHandler).serve_forever(print_banner))
+        else:
+            with MultiUserTCPServer(("0.0.0.0", PORT), MultiUserRequestHandler) as httpd:
+                print_banner()
+                httpd.serve_forever()
+    except KeyboardInterrupt:
+        print('\n💾 Saving data before shutdown...')
+        game_server.flush(PERSIST_DURABLE_TIMEOUT)
+        if game_server.journal_mode:
+            game_server.compact_journal()
+        else:
             game_server.save_data()
-            print('👋 Server stopped')
+        print('👋 Server stopped')
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""SQLite storage backend for server_multiuser.py (PERSISTENCE_MODE=sqlite).
+
+Game data lives in one WAL-mode database instead of multiuser_data.json.
+Each commit record from the server's persistence writer becomes an upsert or
+delete of just the rows it names, so placing or settling a bet touches a few
+rows however large the dataset is. Every row keeps its entity's JSON document
+next to the indexed columns, and loading returns exactly what was stored
+(same keys, same order).
+
+Import existing JSON into a database (backups first; each later file replaces the
+bets, league members and matches the earlier ones had for what it covers):
+    python3 sqlite_storage.py import --db multiuser_data.sqlite3 --backups backups multiuser_data.json
+Export a database back to the JSON file format:
+    python3 sqlite_storage.py export --db multiuser_data.sqlite3 multiuser_data.json
+"""
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT,
+    coins REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_username ON users (username);
+CREATE TABLE IF NOT EXISTS leagues (
+    id TEXT PRIMARY KEY,
+    invite_code TEXT,
+    creator_id TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leagues_invite_code ON leagues (invite_code);
+CREATE TABLE IF NOT EXISTS league_members (
+    league_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (league_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS league_members_user ON league_members (user_id);
+CREATE TABLE IF NOT EXISTS matches (
+    id TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bets (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    match_id TEXT,
+    status TEXT,
+    stake REAL,
+    potential_win REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bets_user_status ON bets (user_id, status);
+CREATE INDEX IF NOT EXISTS bets_match_status ON bets (match_id, status);
+'''
+
+# One statement per operation; sqlite3 keeps them prepared in the connection's statement cache.
+# Upserts use ON CONFLICT DO UPDATE (not INSERT OR REPLACE) so a row keeps its rowid, which is
+# what preserves the insertion order of users, leagues, matches and each user's bets.
+UPSERT_USER = ('INSERT INTO users (id, username, coins, doc) VALUES (?, ?, ?, ?) '
+               'ON CONFLICT (id) DO UPDATE SET username = excluded.username, coins = excluded.coins, doc = excluded.doc')
+UPSERT_LEAGUE = ('INSERT INTO leagues (id, invite_code, creator_id, doc) VALUES (?, ?, ?, ?) '
+                 'ON CONFLICT (id) DO UPDATE SET invite_code = excluded.invite_code, '
+                 'creator_id = excluded.creator_id, doc = excluded.doc')
+DELETE_MEMBERS = 'DELETE FROM league_members WHERE league_id = ?'
+INSERT_MEMBER = 'INSERT OR IGNORE INTO league_members (league_id, user_id, pos) VALUES (?, ?, ?)'
+UPSERT_MATCH = 'INSERT INTO matches (id, doc) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET doc = excluded.doc'
+UPSERT_BET = ('INSERT INTO bets (id, user_id, match_id, status, stake, potential_win, doc) VALUES (?, ?, ?, ?, ?, ?, ?) '
+              'ON CONFLICT (id) DO UPDATE SET user_id = excluded.user_id, match_id = excluded.match_id, '
+              'status = excluded.status, stake = excluded.stake, potential_win = excluded.potential_win, '
+              'doc = excluded.doc')
+DELETE_USER_BETS = 'DELETE FROM bets WHERE user_id = ?'
+UPSERT_META = 'INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value'
+SELECT_USER_BETS = "SELECT status != 'pending', CASE WHEN status != 'pending' THEN doc END FROM bets WHERE user_id = ? ORDER BY rowid"
+SELECT_BET_USER = 'SELECT user_id FROM bets WHERE id = ?'
+SETTLED_TOTALS = '''
+SELECT b.user_id, j.value, COUNT(*), TOTAL(b.stake), TOTAL(CASE WHEN b.status = 'won' THEN b.potential_win END)
+FROM bets AS b, json_each(b.doc, '$.leagueIds') AS j
+WHERE b.status != 'pending' AND j.type = 'text'
+GROUP BY b.user_id, j.value
+'''
+SETTLED_COUNTS = "SELECT user_id, COUNT(*) FROM bets WHERE status != 'pending' GROUP BY user_id"
+TABLES = ('meta', 'users', 'leagues', 'league_members', 'matches', 'bets')
+
+
+def _number(value):
+    """Column value for a numeric field; None when the document holds something else"""
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _whole(value):
+    # SQL TOTAL() returns floats; keep ints as ints like the in-memory aggregates
+    return int(value) if float(value).is_integer() else value
+
+
+class SQLiteStorage:
+    """Row-level persistence for the game server.
+
+    One writer connection (used by the server's persistence writer thread)
+    plus a read connection per thread; WAL lets readers run while a batch
+    commits.
+    """
+    def __init__(self, path, json_default=None):
+        self.path = path
+        self._default = json_default
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        self._keys = {}
+        self._decoder = json.JSONDecoder(object_pairs_hook=self._object)
+        self.stats = {'batches': 0, 'records': 0, 'errors': 0, 'reads': 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # FULL: every committed batch is fsync'd, like a journal append
+        conn.execute('PRAGMA synchronous=FULL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _object(self, pairs):
+        keys = self._keys
+        return {keys.setdefault(k, k): v for k, v in pairs}
+
+    def _dumps(self, value):
+        return json.dumps(value, separators=(',', ':'), default=self._default)
+
+    def close(self):
+        with self._write_lock:
+            self._conn.close()
+
+    # --- Writes -------------------------------------------------------------------
+    def write(self, records):
+        """Apply one batch of commit records in a single transaction"""
+        if not records:
+            return
+        with self._write_lock:
+            try:
+                with self._conn:
+                    for record in records:
+                        self._apply(self._conn, record)
+            except Exception:
+                self.stats['errors'] += 1
+                raise
+            self.stats['batches'] += 1
+            self.stats['records'] += len(records)
+
+    def _apply(self, conn, record):
+        op = record.get('op')
+        if op == 'put_user':
+            self._put_user(conn, record['user'])
+        elif op == 'put_league':
+            self._put_league(conn, record['league'])
+        elif op == 'put_bet':
+            self._put_bet(conn, record['bet'])
+        elif op == 'clear_bets':
+            conn.execute(DELETE_USER_BETS, (record['userId'],))
+        elif op == 'put_match':
+            self._put_match(conn, record['match'])
+        elif op == 'set_matches':
+            conn.execute('DELETE FROM matches')
+            for match in record.get('matches') or []:
+                self._put_match(conn, match)
+        elif op == 'reset_all':
+            for table in ('users', 'leagues', 'league_members', 'matches', 'bets'):
+                conn.execute(f'DELETE FROM {table}')
+
+    def _put_user(self, conn, user):
+        conn.execute(UPSERT_USER, (user.get('id'), user.get('username'), _number(user.get('coins')), self._dumps(user)))
+
+    def _put_league(self, conn, league):
+        league_id = league.get('id')
+        conn.execute(UPSERT_LEAGUE, (league_id, league.get('inviteCode'), league.get('creatorId'), self._dumps(league)))
+        conn.execute(DELETE_MEMBERS, (league_id,))
+        conn.executemany(INSERT_MEMBER, ((league_id, member, pos) for pos, member in
+                                         enumerate(league.get('members') or []) if isinstance(member, str)))
+
+    def _put_match(self, conn, match):
+        conn.execute(UPSERT_MATCH, (str(match.get('id')), self._dumps(match)))
+
+    def _put_bet(self, conn, bet, user_id=None):
+        conn.execute(UPSERT_BET, (
+            bet.get('id'),
+            bet.get('userId') or user_id,
+            None if bet.get('matchId') is None else str(bet.get('matchId')),
+            str(bet.get('status', 'pending')).lower(),
+            _number(bet.get('stake')),
+            _number(bet.get('potentialWin')),
+            self._dumps(bet),
+        ))
+
+    def clear(self):
+        with self._write_lock, self._conn as conn:
+            for table in TABLES:
+                conn.execute(f'DELETE FROM {table}')
+
+    def import_data(self, data):
+        """Load a whole multiuser_data.json document; returns per-section counts.
+
+        Users and leagues are upserted. The document is authoritative for what it
+        covers: the bets of every user it mentions, the members of every league
+        it holds and (when present) the whole matches list replace what the
+        database had, so importing an older backup first cannot resurrect bets,
+        members or matches the newer file no longer has.
+        """
+        counts = {'users': 0, 'leagues': 0, 'matches': 0, 'bets': 0}
+        users = data.get('users') if isinstance(data.get('users'), dict) else {}
+        bets_by_user = data.get('bets') if isinstance(data.get('bets'), dict) else {}
+        with self._write_lock, self._conn as conn:
+            conn.executemany(DELETE_USER_BETS, ((user_id,) for user_id in set(users) | set(bets_by_user)))
+            if isinstance(data.get('matches'), list):
+                conn.execute('DELETE FROM matches')
+            for user in (data.get('users') or {}).values():
+                if isinstance(user, dict):
+                    self._put_user(conn, user)
+                    counts['users'] += 1
+            for league in (data.get('leagues') or {}).values():
+                if isinstance(league, dict):
+                    self._put_league(conn, league)
+                    counts['leagues'] += 1
+            for match in data.get('matches') or []:
+                if isinstance(match, dict):
+                    self._put_match(conn, match)
+                    counts['matches'] += 1
+            for user_id, bets in (data.get('bets') or {}).items():
+                for bet in bets if isinstance(bets, list) else []:
+                    if isinstance(bet, dict):
+                        self._put_bet(conn, bet, user_id)
+                        counts['bets'] += 1
+            for key, value in data.items():
+                if key not in ('users', 'leagues', 'matches', 'bets'):
+                    conn.execute(UPSERT_META, (key, self._dumps(value)))
+        return counts
+
+    def import_file(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return self.import_data(json.load(f))
+
+    # --- Reads --------------------------------------------------------------------
+    def is_empty(self):
+        return not any(self._reader().execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone()
+                       for table in ('users', 'leagues', 'matches', 'bets'))
+
+    def meta(self):
+        return {key: json.loads(value) for key, value in self._reader().execute('SELECT key, value FROM meta ORDER BY rowid')}
+
+    def rows(self, table, pending_only=False):
+        """Yield (id, document) in insertion order; for bets the id is the owning user's"""
+        key = 'user_id' if table == 'bets' else 'id'
+        where = " WHERE status = 'pending'" if pending_only else ''
+        decode = self._decoder.decode
+        for row_key, doc in self._reader().execute(f'SELECT {key}, doc FROM {table}{where} ORDER BY rowid'):
+            yield row_key, decode(doc)
+
+    def settled_summary(self):
+        """{userId: {'count': n, 'leagues': {leagueId: {'bets', 'winnings', 'totalStaked'}}}} for settled bets"""
+        conn = self._reader()
+        summary = {user_id: {'count': count, 'leagues': {}} for user_id, count in conn.execute(SETTLED_COUNTS)}
+        try:
+            rows = conn.execute(SETTLED_TOTALS).fetchall()
+        except sqlite3.OperationalError:
+            # SQLite built without JSON1: add the totals up from the documents instead
+            rows = self._settled_totals_slow(conn)
+        for user_id, league_id, count, staked, winnings in rows:
+            summary[user_id]['leagues'][league_id] = {'bets': count, 'winnings': _whole(winnings),
+                                                      'totalStaked': _whole(staked)}
+        return summary
+
+    def _settled_totals_slow(self, conn):
+        totals = {}
+        for user_id, status, stake, potential_win, doc in conn.execute(
+                "SELECT user_id, status, stake, potential_win, doc FROM bets WHERE status != 'pending'"):
+            for league_id in json.loads(doc).get('leagueIds') or []:
+                if isinstance(league_id, str):
+                    entry = totals.setdefault((user_id, league_id), [0, 0.0, 0.0])
+                    entry[0] += 1
+                    entry[1] += stake or 0
+                    entry[2] += (potential_win or 0) if status == 'won' else 0
+        return [(user_id, league_id, c, s, w) for (user_id, league_id), (c, s, w) in totals.items()]
+
+    def settled_bets(self, user_id):
+        """A user's settled bets, oldest first, as (position among all of the user's bets, bet)"""
+        self.stats['reads'] += 1
+        rows = self._reader().execute(SELECT_USER_BETS, (user_id,))
+        return [(position, self._decoder.decode(doc)) for position, (settled, doc) in enumerate(rows) if settled]
+
+    def find_bet_user(self, bet_id):
+        row = self._reader().execute(SELECT_BET_USER, (bet_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_stats(self):
+        conn = self._reader()
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        pages = conn.execute('PRAGMA page_count').fetchone()[0]
+        wal = self.path + '-wal'
+        return dict(self.stats, path=self.path, dbBytes=page_size * pages,
+                    walBytes=os.path.getsize(wal) if os.path.exists(wal) else 0)
+
+    def export(self, out):
+        """Write the database in the multiuser_data.json layout (indent=2), one row at a time"""
+        meta = self.meta()
+        out.write('{')
+        sections = [('users', 'users'), ('leagues', 'leagues'), ('matches', None), ('bets', None)]
+        for i, (name, table) in enumerate(sections):
+            out.write((',' if i else '') + '\n  ' + json.dumps(name) + ': ')
+            if name == 'matches':
+                text = json.dumps([doc for _, doc in self.rows('matches')], indent=2)
+                out.write(text.replace('\n', '\n  '))
+                continue
+            first = True
+            if name == 'bets':
+                items = self._bets_by_user()
+            else:
+                items = self.rows(table)
+            for key, doc in items:
+                out.write(('{' if first else ',') + '\n    ' + json.dumps(key) + ': ' +
+                          json.dumps(doc, indent=2).replace('\n', '\n    '))
+                first = False
+            out.write('{}' if first else '\n  }')
+        for key, value in meta.items():
+            out.write(',\n  ' + json.dumps(key) + ': ' + json.dumps(value, indent=2).replace('\n', '\n  '))
+        out.write('\n}')
+
+    def _bets_by_user(self):
+        # Every user (an empty list when they have no bets), then owners of bets without a user row;
+        # each user's bets in insertion order
+        conn = self._reader()
+        users = [user_id for user_id, in conn.execute('SELECT id FROM users ORDER BY rowid')]
+        known = set(users)
+        users += [user_id for user_id, in conn.execute('SELECT user_id FROM bets GROUP BY user_id ORDER BY MIN(rowid)')
+                  if user_id not in known]
+        for user_id in users:
+            yield user_id, [self._decoder.decode(doc) for doc, in
+                            conn.execute('SELECT doc FROM bets WHERE user_id = ? ORDER BY rowid', (user_id,))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import/export server_multiuser.py data to/from SQLite')
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help='upsert JSON data files into the database')
+    imp.add_argument('--db', default=os.path.join(os.environ.get('DATA_DIR', '.'), 'multiuser_data.sqlite3'))
+    imp.add_argument('--backups', help='directory of older JSON snapshots to import first (oldest name first)')
+    imp.add_argument('--replace', action='store_true', help='empty the database before importing')
+    imp.add_argument('files', nargs='*', help='JSON files, imported in order; each replaces the bets, members and matches it covers')
+    exp = sub.add_parser('export', help='write the database as a multiuser_data.json file')
+    exp.add_argument('--db', default=os.path.join(os.environ.get('DATA_DIR', '.'), 'multiuser_data.sqlite3'))
+    exp.add_argument('out')
+    args = parser.parse_args()
+
+    storage = SQLiteStorage(args.db)
+    if args.command == 'export':
+        tmp = args.out + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            storage.export(f)
+        os.replace(tmp, args.out)
+        print(f'💾 Exported {args.db} to {args.out}')
+        return
+
+    files = sorted(glob.glob(os.path.join(args.backups, '*.json'))) if args.backups else []
+    files += args.files
+    if not files:
+        raise SystemExit('nothing to import: pass JSON files and/or --backups DIR')
+    if args.replace:
+        storage.clear()
+    for path in files:
+        started = time.perf_counter()
+        try:
+            counts = storage.import_file(path)
+        except Exception as e:
+            print(f'⚠️ Skipping {path}: {e}', file=sys.stderr)
+            continue
+        print(f"📥 {path}: {counts['users']} users, {counts['leagues']} leagues, {counts['matches']} matches, "
+              f"{counts['bets']} bets ({time.perf_counter() - started:.1f}s)")
+    storage.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Import server_multiuser against a throwaway DATA_DIR (it loads data at import time)."""
+import contextlib
+import gzip
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='scoreleague-test-'))
+os.environ.setdefault('ODDS_PREFETCH', '0')
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import server_multiuser as server  # noqa: E402
+
+
+@contextlib.contextmanager
+def serve(game):
+    """Serve the HTTP routes from game on a free port; yields request(method, path, body=None, headers=None)"""
+    server.RESPONSE_CACHE.clear()  # entries are keyed by per-game resource versions
+    with mock.patch.object(server, 'game_server', game):
+        httpd = server.MultiUserTCPServer(('127.0.0.1', 0), server.MultiUserRequestHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+        def request(method, path, body=None, headers=None):
+            conn = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=10)
+            try:
+                conn.request(method, path, json.dumps(body) if body is not None else None, headers or {})
+                response = conn.getresponse()
+                raw = response.read()
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    raw = gzip.decompress(raw)
+                return response.status, response.headers, json.loads(raw) if raw else None
+            finally:
+                conn.close()
+        try:
+            yield request
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
@@ -0,0 +1,99 @@
+import asyncio
+import gzip
+import http.server
+import json
+import threading
+import unittest
+
+from support import server
+
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = json.dumps([{'id': 'm1', 'path': self.path}]).encode()
+        if self.path.startswith('/moved'):
+            self.send_response(302)
+            self.send_header('Location', '/odds')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path.startswith('/chunked'):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for part in (body[:10], body[10:]):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(part), part))
+            self.wfile.write(b'0\r\n\r\n')
+        elif self.path.startswith('/limited'):
+            self.send_response(429)
+            self.send_header('Content-Length', '4')
+            self.end_headers()
+            self.wfile.write(b'nope')
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+
+class AsyncUpstreamPoolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+        cls.base = f'http://127.0.0.1:{cls.httpd.server_address[1]}'
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+
+    def get_all(self, pool, *paths):
+        async def run():
+            return [await pool.request(self.base + path, 5) for path in paths]
+        return asyncio.run(run())
+
+    def test_reuses_connection_and_decodes_bodies(self):
+        pool = server.AsyncUpstreamPool()
+        plain, chunked, moved = self.get_all(pool, '/odds', '/chunked', '/moved')
+        self.assertEqual(json.loads(plain[2])[0]['path'], '/odds')
+        self.assertEqual(json.loads(chunked[2])[0]['path'], '/chunked')
+        self.assertEqual((moved[0], json.loads(moved[2])[0]['path']), (200, '/odds'))
+        self.assertEqual(pool.stats['created'], 1)
+        self.assertEqual(pool.stats['reused'], 3)
+
+    def test_error_status_raises(self):
+        async def run():
+            await server.fetch_upstream_async(self.base + '/limited', 5)
+        with self.assertRaises(server.UpstreamHTTPError) as raised:
+            asyncio.run(run())
+        self.assertEqual((raised.exception.code, raised.exception.body), (429, 'nope'))
+
+
+class ReadChunkedTest(unittest.TestCase):
+    def read(self, raw, max_bytes=1024):
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(raw)
+            reader.feed_eof()
+            return await server.read_chunked(reader, max_bytes)
+        return asyncio.run(run())
+
+    def test_decodes_chunks_and_skips_trailers(self):
+        self.assertEqual(self.read(b'4\r\n{"a"\r\n3;ext=1\r\n:1}\r\n0\r\nX-Trailer: 1\r\n\r\n'), b'{"a":1}')
+
+    def test_rejects_malformed_and_oversized_bodies(self):
+        with self.assertRaises(ValueError):
+            self.read(b'zz\r\n')
+        with self.assertRaises(ValueError):
+            self.read(b'8\r\n12345678\r\n0\r\n\r\n', max_bytes=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from support import server
+
+BIG = server.COMPRESS_MIN_BYTES
+SMALL = server.COMPRESS_MIN_BYTES - 1
+
+
+class ChooseEncodingTest(unittest.TestCase):
+    def choose(self, header, size=BIG):
+        return server.choose_encoding(header, size)
+
+    def test_prefers_highest_q_then_gzip(self):
+        self.assertEqual(self.choose('gzip, deflate'), 'gzip')
+        self.assertEqual(self.choose('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(self.choose('br'), None)
+        self.assertEqual(self.choose(None), None)
+
+    def test_listed_coding_overrides_star(self):
+        self.assertEqual(self.choose('gzip;q=0, *'), 'deflate')
+        self.assertEqual(self.choose('gzip;q=0, deflate;q=0, *'), None)
+        self.assertEqual(self.choose('*;q=0.5, deflate'), 'deflate')
+
+    def test_identity_preference_and_refusal(self):
+        self.assertEqual(self.choose('identity, gzip;q=0.5'), None)
+        self.assertEqual(self.choose('gzip', SMALL), None)
+        # Refusing identity makes even small bodies go compressed
+        self.assertEqual(self.choose('gzip, identity;q=0', SMALL), 'gzip')
+        self.assertEqual(self.choose('deflate, *;q=0', SMALL), 'deflate')
+        for header in ('identity;q=0', 'br, *;q=0', 'gzip;q=0, identity;q=0'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                self.choose(header)
+
+
+if __name__ == '__main__':
+    unittest.main()
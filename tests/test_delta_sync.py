@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import serve, server
+
+
+def bet(bet_id, match_id):
+    return {'id': bet_id, 'userId': 'u1', 'matchId': match_id, 'market': 'match_result', 'selection': 'home',
+            'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': '2024-01-01T00:00:00',
+            'status': 'pending', 'leagueIds': []}
+
+
+def match(match_id):
+    return {'id': match_id, 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00', 'status': 'upcoming'}
+
+
+DATA = {
+    'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 980}, 'u2': {'id': 'u2', 'username': 'b', 'coins': 1000}},
+    'leagues': {},
+    'matches': [match('m1'), match('m2')],
+    'bets': {'u1': [bet('b1', 'm1'), bet('b2', 'm2')]},
+}
+
+
+class SinceDeltaTest(unittest.TestCase):
+    def setUp(self):
+        data_dir = tempfile.mkdtemp()
+        with open(os.path.join(data_dir, 'multiuser_data.json'), 'w') as f:
+            json.dump(DATA, f)
+        with mock.patch.dict(os.environ, {'DATA_DIR': data_dir}):
+            self.game = server.MultiUserGameServer()
+
+    def test_deltas_follow_changes(self):
+        with serve(self.game) as request:
+            _, _, body = request('GET', '/api/bets/user/u1')
+            self.assertEqual([b['id'] for b in body['bets']], ['b1', 'b2'])
+            version = body['version']
+
+            request('POST', '/api/matches/m1/settle', {'homeGoals': 1, 'awayGoals': 0})
+            _, _, body = request('GET', f'/api/bets/user/u1?since={version}')
+            self.assertFalse(body['full'])
+            self.assertEqual([(b['id'], b['status']) for b in body['bets']], [('b1', 'won')])
+            self.assertEqual(body['balance']['coins'], 1000)
+            self.assertGreater(body['version'], version)
+            version = body['version']
+
+            # Nothing new for u1, even though another user changed
+            request('POST', '/api/debug/reset-user', {'userId': 'u2', 'coins': 10})
+            _, _, body = request('GET', f'/api/bets/user/u1?since={version}')
+            self.assertEqual((body['full'], body['bets'], body['version']), (False, [], version))
+            self.assertNotIn('balance', body)
+
+    def test_full_resync_when_cleared_or_too_old(self):
+        with serve(self.game) as request:
+            _, _, body = request('GET', '/api/bets/user/u1')
+            version = body['version']
+            _, _, body = request('GET', '/api/bets/user/u1?since=1')  # predates this process
+            self.assertTrue(body['full'])
+            self.assertEqual(len(body['bets']), 2)
+
+            request('POST', '/api/debug/reset-user', {'userId': 'u1'})
+            _, _, body = request('GET', f'/api/bets/user/u1?since={version}')
+            self.assertEqual((body['full'], body['bets'], body['balance']['coins']), (True, [], 1000))
+
+            status, _, _ = request('GET', '/api/bets/user/u1?since=abc')
+            self.assertEqual(status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
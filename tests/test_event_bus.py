@@ -0,0 +1,52 @@
+import threading
+import unittest
+
+from support import server
+
+
+def event_ids(raw):
+    return [int(line[4:]) for line in raw.decode().splitlines() if line.startswith('id: ')]
+
+
+class EventBusTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = server.EventBus()
+
+    def test_filters_by_user_league_and_type(self):
+        alice = self.bus.subscribe('userId=alice', lambda: None)
+        league = self.bus.subscribe('leagueId=l1&types=leaderboard', lambda: None)
+        everyone = self.bus.subscribe('', lambda: None)
+        self.bus.publish('bet', {'id': 'b1'}, users=['alice'])
+        self.bus.publish('leaderboard', {'leagueId': 'l1'}, leagues=['l1'])
+        self.bus.publish('odds', {'sport': 'soccer_epl'}, sport='soccer_epl')
+        self.assertEqual(event_ids(alice.drain()), [1, 3])
+        self.assertEqual(event_ids(league.drain()), [2])
+        self.assertEqual(event_ids(everyone.drain()), [3])
+
+    def test_replays_missed_events_after_last_event_id(self):
+        for n in range(3):
+            self.bus.publish('odds', {'n': n})
+        sub = self.bus.subscribe('', lambda: None, last_event_id='1')
+        self.assertEqual(event_ids(sub.drain()), [2, 3])
+
+    def test_no_frame_is_lost_while_draining(self):
+        sub = self.bus.subscribe('', lambda: None)
+        seen = []
+        done = threading.Event()
+
+        def publisher():
+            for n in range(500):
+                self.bus.publish('odds', {'n': n})
+            done.set()
+
+        thread = threading.Thread(target=publisher)
+        thread.start()
+        while not done.is_set():
+            seen += event_ids(sub.drain())
+        thread.join()
+        seen += event_ids(sub.drain())
+        self.assertEqual(seen, list(range(1, 501)))
+
+
+if __name__ == '__main__':
+    unittest.main()
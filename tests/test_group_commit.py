@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from support import server
+
+DATA = {
+    'users': {f'u{n}': {'id': f'u{n}', 'username': f'user{n}', 'coins': 1000} for n in range(20)},
+    'leagues': {},
+    'matches': [{'id': 'm1', 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00'}],
+    'bets': {},
+}
+
+
+class GroupCommitTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.data_dir, 'multiuser_data.json'), 'w') as f:
+            json.dump(DATA, f)
+        with mock.patch.dict(os.environ, {'DATA_DIR': self.data_dir}), \
+                mock.patch.object(server, 'PERSISTENCE_MODE', 'journal'):
+            self.game = server.MultiUserGameServer()
+
+    def test_concurrent_commits_share_a_write(self):
+        users = self.game.game_data['users']
+        results = []
+        start = threading.Barrier(len(users))
+
+        def place(user):
+            start.wait()
+            user['coins'] -= 10
+            results.append(self.game.commit({'op': 'put_user', 'user': user}, durable=True).wait(0))
+
+        with mock.patch.object(server, 'PERSIST_WINDOW_MS', 200):
+            threads = [threading.Thread(target=place, args=(user,)) for user in users.values()]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results, [True] * len(users))
+        stats = self.game.persist_stats
+        self.assertEqual((stats['commits'], stats['records']), (len(users), len(users)))
+        self.assertLess(stats['batches'], len(users) // 2)
+        with open(self.game.journal_file) as f:
+            coins = {r['user']['id']: r['user']['coins'] for r in map(json.loads, f)}
+        self.assertEqual(coins, {uid: 990 for uid in users})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import server
+
+DATA = {
+    'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 990}},
+    'leagues': {},
+    'matches': [{'id': 'm1', 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00',
+                 'status': 'upcoming'}],
+    'bets': {'u1': [{'id': 'b1', 'userId': 'u1', 'matchId': 'm1', 'market': 'match_result', 'selection': 'home',
+                     'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': '2024-01-01T00:00:00',
+                     'status': 'pending', 'leagueIds': []}]},
+}
+
+
+class JournalReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.data_dir, 'multiuser_data.json')
+        self.journal = os.path.join(self.data_dir, 'multiuser_data.journal')
+        with open(self.snapshot, 'w') as f:
+            json.dump(DATA, f)
+
+    def load(self):
+        with mock.patch.dict(os.environ, {'DATA_DIR': self.data_dir}), \
+                mock.patch.object(server, 'PERSISTENCE_MODE', 'journal'):
+            return server.MultiUserGameServer()
+
+    def files(self):
+        out = {}
+        for path in (self.snapshot, self.journal):
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    out[path] = f.read()
+        return out
+
+    def settle(self, game):
+        _, records = game.settle_matches([('m1', 2, 0)])
+        self.assertTrue(game.commit(*records).wait(5))
+
+    def test_settlement_survives_restart(self):
+        self.settle(self.load())
+        game = self.load()
+        self.assertEqual(game.user_bets('u1')[0]['status'], 'won')
+        self.assertEqual(game.game_data['users']['u1']['coins'], 1010)
+
+    def test_boot_writes_nothing(self):
+        self.load()  # matches already exist, so nothing is seeded
+        self.assertFalse(os.path.exists(self.journal))
+        self.settle(self.load())
+        before = self.files()
+        self.load().save_data()  # replays the journal, then only drains the writer
+        self.assertEqual(self.files(), before)
+
+    def test_records_after_a_torn_line_are_kept(self):
+        with open(self.journal, 'w') as f:
+            f.write('{"op":"put_user","us')
+        self.settle(self.load())
+        game = self.load()
+        self.assertEqual(game.user_bets('u1')[0]['status'], 'won')
+        self.assertEqual(game.game_data['matches'][0]['status'], 'finished')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import server
+from sqlite_storage import SQLiteStorage
+
+
+def bet(bet_id, status):
+    return {'id': bet_id, 'userId': 'u1', 'matchId': 'm1', 'market': 'match_result', 'selection': 'home',
+            'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': '2024-01-01T00:00:00',
+            'status': status, 'leagueIds': ['l1']}
+
+
+# Settled and pending bets interleaved, as they are when older bets wait on later matches
+DATA = {
+    'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 1000}},
+    'leagues': {'l1': {'id': 'l1', 'name': 'L', 'inviteCode': 'X', 'creatorId': 'u1', 'members': ['u1']}},
+    'matches': [{'id': 'm1', 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00'}],
+    'bets': {'u1': [bet('b1', 'pending'), bet('b2', 'won'), bet('b3', 'pending'), bet('b4', 'lost'),
+                    bet('b5', 'won'), bet('b6', 'pending')]},
+}
+
+
+class LazyHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.data_dir, 'multiuser_data.json'), 'w') as f:
+            json.dump(DATA, f)
+
+    def load(self, history, persistence='snapshot'):
+        with mock.patch.dict(os.environ, {'DATA_DIR': self.data_dir}), \
+                mock.patch.object(server, 'SETTLED_HISTORY', history), \
+                mock.patch.object(server, 'PERSISTENCE_MODE', persistence):
+            return server.MultiUserGameServer()
+
+    def bet_ids(self, game):
+        return [b['id'] for b in game.user_bets('u1')]
+
+    def snapshot_bets(self, game):
+        out = io.StringIO()
+        game._dump_snapshot(out)
+        return json.loads(out.getvalue())['bets']['u1']
+
+    def test_lazy_history_keeps_placement_order(self):
+        eager = self.load('eager')
+        lazy = self.load('lazy')
+        self.assertEqual(lazy.deferred_bets['u1']['count'], 3)
+        self.assertEqual(self.snapshot_bets(lazy), self.snapshot_bets(eager))
+        self.assertEqual(self.bet_ids(lazy), ['b1', 'b2', 'b3', 'b4', 'b5', 'b6'])
+        self.assertEqual(self.bet_ids(lazy), self.bet_ids(eager))
+
+    def test_lazy_history_from_sqlite_keeps_placement_order(self):
+        storage = SQLiteStorage(os.path.join(self.data_dir, 'multiuser_data.sqlite3'))
+        storage.import_data(DATA)
+        storage.close()
+        lazy = self.load('lazy', 'sqlite')
+        self.assertEqual([b['id'] for b in lazy.game_data['bets']['u1']], ['b1', 'b3', 'b6'])
+        self.assertEqual(self.bet_ids(lazy), ['b1', 'b2', 'b3', 'b4', 'b5', 'b6'])
+
+
+class MergeAtPositionsTest(unittest.TestCase):
+    def test_interleaves_and_appends_newer_live_items(self):
+        merged = server.merge_at_positions(['a', 'c', 'e', 'f'], ['b', 'd'], [1, 3])
+        self.assertEqual(merged, ['a', 'b', 'c', 'd', 'e', 'f'])
+        self.assertEqual(server.merge_at_positions([], ['b', 'd'], [1, 3]), ['b', 'd'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import serve, server
+
+
+def bet(bet_id, user_id, selection):
+    return {'id': bet_id, 'userId': user_id, 'matchId': 'm1', 'market': 'match_result', 'selection': selection,
+            'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': '2024-01-01T00:00:00',
+            'status': 'pending', 'leagueIds': ['l1']}
+
+
+DATA = {
+    'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 990}, 'u2': {'id': 'u2', 'username': 'b', 'coins': 995}},
+    'leagues': {'l1': {'id': 'l1', 'name': 'L', 'inviteCode': 'X', 'creatorId': 'u1', 'members': ['u1', 'u2']}},
+    'matches': [{'id': 'm1', 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00',
+                 'status': 'upcoming'}],
+    'bets': {'u1': [bet('b1', 'u1', 'home')], 'u2': [bet('b2', 'u2', 'away')]},
+}
+
+
+class LeaderboardTotalsTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.data_dir, 'multiuser_data.json'), 'w') as f:
+            json.dump(DATA, f)
+        self.game = self.load()
+
+    def load(self):
+        with mock.patch.dict(os.environ, {'DATA_DIR': self.data_dir}):
+            return server.MultiUserGameServer()
+
+    def totals(self, leaderboard):
+        return [(entry['id'], entry['coins'], entry['leagueStats']) for entry in leaderboard]
+
+    def assert_matches_rebuild(self):
+        """The incrementally kept leaderboard equals one rebuilt from the saved data"""
+        self.assertTrue(self.game.flush(5))
+        rebuilt, _ = self.load().get_leaderboard('l1')
+        self.assertEqual(self.totals(self.game.get_leaderboard('l1')[0]), self.totals(rebuilt))
+
+    def test_totals_after_settle_and_reset_user(self):
+        with serve(self.game) as request:
+            status, _, body = request('GET', '/api/leagues/l1/leaderboard')
+            self.assertEqual(status, 200)
+            self.assertEqual(self.totals(body['leaderboard']), [
+                ('u2', 995, {'bets': 1, 'winnings': 0, 'totalStaked': 10}),
+                ('u1', 990, {'bets': 1, 'winnings': 0, 'totalStaked': 10})])
+
+            request('POST', '/api/matches/m1/settle', {'homeGoals': 2, 'awayGoals': 0})
+            _, _, body = request('GET', '/api/leagues/l1/leaderboard?top=1&userId=u2')
+            self.assertEqual(self.totals(body['leaderboard']), [
+                ('u1', 1010, {'bets': 1, 'winnings': 20, 'totalStaked': 10})])
+            self.assertEqual((body['total'], body['me']), (2, {'rank': 2, 'coins': 995}))
+            self.assert_matches_rebuild()
+
+            request('POST', '/api/debug/reset-user', {'userId': 'u1', 'coins': 500})
+            _, _, body = request('GET', '/api/leagues/l1/leaderboard')
+            self.assertEqual(self.totals(body['leaderboard']), [
+                ('u2', 995, {'bets': 1, 'winnings': 0, 'totalStaked': 10}),
+                ('u1', 500, {'bets': 0, 'winnings': 0, 'totalStaked': 0})])
+            self.assert_matches_rebuild()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import time
+import unittest
+from datetime import datetime, timezone
+
+from support import server
+
+
+def event_at(ts):
+    return {'id': 'e', 'commence_time': datetime.fromtimestamp(ts, timezone.utc).isoformat().replace('+00:00', 'Z')}
+
+
+class RefreshIntervalTest(unittest.TestCase):
+    def setUp(self):
+        self.prefetcher = server.OddsPrefetcher()
+        self.sport = 'soccer_epl'
+        self.key = self.prefetcher.cache_key(self.sport)
+        self.now = time.time()
+
+    def tearDown(self):
+        server.ODDS_CACHE.clear()
+
+    def interval_with_kickoff_in(self, seconds):
+        server.ODDS_CACHE.put(self.key, [event_at(self.now + seconds)])
+        return self.prefetcher.refresh_interval(self.sport, self.now)
+
+    def test_refresh_happens_before_expiry(self):
+        cases = {
+            'near': self.interval_with_kickoff_in(3600),
+            'today': self.interval_with_kickoff_in(12 * 3600),
+            'far': self.interval_with_kickoff_in(5 * 24 * 3600),
+        }
+        server.ODDS_CACHE.clear()
+        cases['empty'] = self.prefetcher.refresh_interval(self.sport, self.now)
+        for name, interval in cases.items():
+            with self.subTest(name):
+                self.assertLess(interval, server.ODDS_CACHE_TTL)
+                self.assertGreater(interval, 0)
+
+    def test_near_kickoff_refreshes_most_often(self):
+        near = self.interval_with_kickoff_in(3600)
+        far = self.interval_with_kickoff_in(5 * 24 * 3600)
+        self.assertLessEqual(near, far)
+
+
+if __name__ == '__main__':
+    unittest.main()
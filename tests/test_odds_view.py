@@ -0,0 +1,41 @@
+import json
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from support import server
+
+
+def event(kickoff):
+    return {'id': 'e1', 'sport_key': 'soccer_epl', 'home_team': 'A', 'away_team': 'B',
+            'commence_time': datetime.fromtimestamp(kickoff, timezone.utc).isoformat().replace('+00:00', 'Z'),
+            'bookmakers': [{'markets': [{'key': 'h2h', 'outcomes': [
+                {'name': 'A', 'price': 2.0}, {'name': 'Draw', 'price': 3.0}, {'name': 'B', 'price': 4.0}]}]}]}
+
+
+class OddsViewStatusTest(unittest.TestCase):
+    def status(self, entry, now):
+        with mock.patch.object(server.time, 'time', return_value=now):
+            body = server.odds_view_body(entry)
+        return json.loads(body.body)['matches'][0]['status']
+
+    def test_status_follows_the_clock_between_refreshes(self):
+        now = time.time()
+        kickoff = now + 60
+        entry = {'data': [event(kickoff)], 'ts': now}
+        self.assertEqual(self.status(entry, now), 'upcoming')
+        self.assertEqual(self.status(entry, kickoff + 1), 'live')
+        self.assertEqual(self.status(entry, kickoff + server.ODDS_VIEW_LIVE_SECONDS + 1), 'finished')
+
+    def test_view_is_memoized_until_a_status_changes(self):
+        now = time.time()
+        entry = {'data': [event(now + 600)], 'ts': now}
+        with mock.patch.object(server.time, 'time', return_value=now):
+            first = server.odds_view_body(entry)
+        with mock.patch.object(server.time, 'time', return_value=now + 300):
+            self.assertIs(server.odds_view_body(entry), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
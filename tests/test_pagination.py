@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import server
+
+
+def bet(n, match_id):
+    return {'id': f'b{n}', 'userId': 'u1', 'matchId': match_id, 'market': 'match_result', 'selection': 'home',
+            'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': f'2024-01-01T00:00:0{n}',
+            'status': 'pending', 'leagueIds': []}
+
+
+def match(match_id):
+    return {'id': match_id, 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00', 'status': 'upcoming'}
+
+
+DATA = {
+    'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 1000}},
+    'leagues': {},
+    'matches': [match('m1'), match('m2')],
+    'bets': {'u1': [bet(n, 'm1' if n % 2 else 'm2') for n in range(1, 7)]},
+}
+
+
+class UserBetPagesTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.data_dir, 'multiuser_data.json'), 'w') as f:
+            json.dump(DATA, f)
+        self.game = self.load()
+
+    def load(self):
+        with mock.patch.dict(os.environ, {'DATA_DIR': self.data_dir}):
+            return server.MultiUserGameServer()
+
+    def page(self, cursor=None, status=None, descending=False, game=None):
+        bets, next_cursor = (game or self.game).page_user_bets('u1', 2, cursor, descending, status)
+        return [b['id'] for b in bets], next_cursor
+
+    def test_pending_pages_survive_settlement(self):
+        ids, cursor = self.page(status='pending')
+        self.assertEqual(ids, ['b1', 'b2'])
+        self.game.settle_matches([('m1', 2, 0)])  # b1, b3 and b5 win
+        ids, cursor = self.page(cursor, status='pending')
+        self.assertEqual((ids, cursor), (['b4', 'b6'], None))
+
+    def test_full_list_pages_survive_settlement_and_restart(self):
+        ids, cursor = self.page(descending=True)
+        self.assertEqual(ids, ['b6', 'b5'])
+        self.game.settle_matches([('m2', 0, 1)])  # b2, b4 and b6 lose
+        ids, cursor = self.page(cursor, descending=True)
+        self.assertEqual(ids, ['b4', 'b3'])
+        # The key is stored with each bet, so another process resumes the same walk
+        ids, cursor = self.page(cursor, descending=True, game=self.load())
+        self.assertEqual((ids, cursor), (['b2', 'b1'], None))
+
+    def test_status_lists_follow_place_and_settle(self):
+        for status in (None, 'pending', 'won', 'lost'):
+            self.page(status=status)  # build every list before the changes below
+        self.game.settle_matches([('m1', 2, 0)])
+        placed = dict(bet(7, 'm2'), placedAt='2024-01-01T00:00:00.5')  # placed out of order on purpose
+        self.game.game_data['bets']['u1'].append(placed)
+        self.game.index_bet('u1', placed)
+        lists = {status: [b['id'] for b in self.game.bet_page_list('u1', status)[1]]
+                 for status in (None, 'pending', 'won', 'lost')}
+        self.assertEqual(lists, {None: ['b7', 'b1', 'b2', 'b3', 'b4', 'b5', 'b6'], 'pending': ['b7', 'b2', 'b4', 'b6'],
+                                 'won': ['b1', 'b3', 'b5'], 'lost': []})
+        # Kept lists match lists built from scratch
+        self.game.bet_pages.clear()
+        for status, ids in lists.items():
+            self.assertEqual([b['id'] for b in self.game.bet_page_list('u1', status)[1]], ids)
+
+    def test_rejects_cursor_of_another_list(self):
+        _, cursor = self.game.page_matches(1)
+        with self.assertRaises(ValueError):
+            self.page(cursor)
+        with self.assertRaises(ValueError):
+            self.page(server.encode_cursor([1, 'b1']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import serve, server
+
+DATA = {
+    'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 990}},
+    'leagues': {'l1': {'id': 'l1', 'name': 'L', 'inviteCode': 'X', 'creatorId': 'u1', 'members': ['u1']}},
+    'matches': [{'id': 'm1', 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00',
+                 'status': 'upcoming'}],
+    'bets': {'u1': [{'id': 'b1', 'userId': 'u1', 'matchId': 'm1', 'market': 'match_result', 'selection': 'home',
+                     'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': '2024-01-01T00:00:00',
+                     'status': 'pending', 'leagueIds': ['l1']}]},
+}
+
+
+class RevalidationTest(unittest.TestCase):
+    def setUp(self):
+        data_dir = tempfile.mkdtemp()
+        with open(os.path.join(data_dir, 'multiuser_data.json'), 'w') as f:
+            json.dump(DATA, f)
+        with mock.patch.dict(os.environ, {'DATA_DIR': data_dir}):
+            self.game = server.MultiUserGameServer()
+
+    def test_unchanged_resources_revalidate_with_304(self):
+        with serve(self.game) as request:
+            for path in ('/api/leagues/l1/leaderboard', '/api/matches', '/api/bets/user/u1'):
+                with self.subTest(path=path):
+                    status, headers, body = request('GET', path)
+                    self.assertEqual(status, 200)
+                    etag = headers['ETag']
+                    status, headers, body = request('GET', path, headers={'If-None-Match': etag})
+                    self.assertEqual((status, headers['ETag'], body), (304, etag, None))
+                    status, _, _ = request('GET', path, headers={'If-None-Match': 'W/"other", ' + etag})
+                    self.assertEqual(status, 304)
+
+    def test_change_or_other_coding_gets_a_full_response(self):
+        with serve(self.game) as request, mock.patch.object(server, 'COMPRESS_MIN_BYTES', 0):
+            path = '/api/leagues/l1/leaderboard'
+            _, headers, _ = request('GET', path)
+            etag = headers['ETag']
+            # The gzip representation has its own ETag, so the identity one does not match it
+            status, headers, _ = request('GET', path, headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+            self.assertEqual((status, headers['Content-Encoding']), (200, 'gzip'))
+            self.assertNotEqual(headers['ETag'], etag)
+
+            request('POST', '/api/matches/m1/settle', {'homeGoals': 1, 'awayGoals': 0})
+            status, headers, body = request('GET', path, headers={'If-None-Match': etag})
+            self.assertEqual(status, 200)
+            self.assertNotEqual(headers['ETag'], etag)
+            self.assertEqual(body['leaderboard'][0]['coins'], 1010)
+
+
+if __name__ == '__main__':
+    unittest.main()
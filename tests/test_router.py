@@ -0,0 +1,41 @@
+import unittest
+
+from support import server
+
+
+class RouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = server.Router()
+        for method, pattern in (('GET', '/api/leagues/user/{user_id}'), ('GET', '/api/leagues/{league_id}'),
+                                ('GET', '/api/leagues/{league_id}/leaderboard'), ('POST', '/api/leagues/join'),
+                                ('GET', '/api/health')):
+            self.router.add(method, pattern, pattern)
+
+    def match(self, method, path):
+        route, params = self.router.match(method, path)
+        return (route.handler, params) if route is not None else None
+
+    def test_literal_segments_win_then_fall_back_to_parameters(self):
+        self.assertEqual(self.match('GET', '/api/health'), ('/api/health', {}))
+        self.assertEqual(self.match('GET', '/api/leagues/user/u1'), ('/api/leagues/user/{user_id}', {'user_id': 'u1'}))
+        self.assertEqual(self.match('GET', '/api/leagues/user'), ('/api/leagues/{league_id}', {'league_id': 'user'}))
+        self.assertEqual(self.match('GET', '/api/leagues/a%20b/leaderboard'),
+                         ('/api/leagues/{league_id}/leaderboard', {'league_id': 'a b'}))
+
+    def test_unknown_paths_and_methods(self):
+        self.assertIsNone(self.match('GET', '/api/leagues/l1/members'))
+        self.assertIsNone(self.match('POST', '/api/leagues/l1'))
+        self.assertIsNone(self.match('GET', '/api/leagues/join/extra'))
+
+    def test_conflicting_parameter_names_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.router.add('GET', '/api/leagues/{id}/members', None)
+
+    def test_every_route_of_the_server_resolves_to_itself(self):
+        for route in server.ROUTER.routes():
+            with self.subTest(route=route.pattern):
+                self.assertIs(server.ROUTER.match(route.method, route.pattern)[0], route)
+
+
+if __name__ == '__main__':
+    unittest.main()
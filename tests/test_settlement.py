@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import serve, server
+
+
+def bet(bet_id, user_id, match_id, selection, status='pending'):
+    return {'id': bet_id, 'userId': user_id, 'matchId': match_id, 'market': 'match_result', 'selection': selection,
+            'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': '2024-01-01T00:00:00',
+            'status': status, 'leagueIds': []}
+
+
+def match(match_id):
+    return {'id': match_id, 'homeTeam': 'A', 'awayTeam': 'B', 'date': '2030-01-01', 'time': '15:00', 'status': 'upcoming'}
+
+
+DATA = {
+    'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 1000}, 'u2': {'id': 'u2', 'username': 'b', 'coins': 1000}},
+    'leagues': {},
+    'matches': [match('m1'), match('m2'), match('m3')],
+    'bets': {'u1': [bet('b1', 'u1', 'm1', 'home'), bet('b2', 'u1', 'm2', 'away'), bet('b3', 'u1', 'm1', 'home', 'lost')],
+             'u2': [bet('b4', 'u2', 'm1', 'draw'), bet('b5', 'u2', 'm3', 'home')]},
+}
+
+
+class BulkSettlementTest(unittest.TestCase):
+    def setUp(self):
+        data_dir = tempfile.mkdtemp()
+        with open(os.path.join(data_dir, 'multiuser_data.json'), 'w') as f:
+            json.dump(DATA, f)
+        with mock.patch.dict(os.environ, {'DATA_DIR': data_dir}):
+            self.game = server.MultiUserGameServer()
+
+    def statuses(self):
+        return {b['id']: b['status'] for uid in ('u1', 'u2') for b in self.game.user_bets(uid)}
+
+    def test_settles_only_pending_bets_on_the_given_matches(self):
+        with serve(self.game) as request:
+            status, _, body = request('POST', '/api/matches/settle-bulk', {'matches': [
+                {'matchId': 'm1', 'homeGoals': 1, 'awayGoals': 0},
+                {'matchId': 'm2', 'homeGoals': 0, 'awayGoals': 0},
+                {'matchId': 'nope', 'homeGoals': 1, 'awayGoals': 1}]})
+        self.assertEqual(status, 200)
+        self.assertEqual((body['settled'], body['won']), (3, 1))
+        self.assertEqual([r['success'] for r in body['matches']], [True, True, False])
+        # b3 was already settled and m3 was not in the batch
+        self.assertEqual(self.statuses(), {'b1': 'won', 'b2': 'lost', 'b3': 'lost', 'b4': 'lost', 'b5': 'pending'})
+        self.assertEqual(self.game.game_data['users']['u1']['coins'], 1020)
+        self.assertEqual(self.game.game_data['users']['u2']['coins'], 1000)
+        self.assertEqual({m: len(self.game.pending_by_match.get(m) or {}) for m in ('m1', 'm2', 'm3')},
+                         {'m1': 0, 'm2': 0, 'm3': 1})
+
+    def test_settling_again_pays_nothing(self):
+        self.game.settle_matches([('m1', 1, 0)])
+        summaries, records = self.game.settle_matches([('m1', 1, 0)])
+        self.assertEqual((summaries[0]['settled'], summaries[0]['won']), (0, 0))
+        self.assertEqual([r['op'] for r in records], ['put_match'])
+        self.assertEqual(self.game.game_data['users']['u1']['coins'], 1020)
+
+
+if __name__ == '__main__':
+    unittest.main()
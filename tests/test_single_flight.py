@@ -0,0 +1,59 @@
+import threading
+import time
+import unittest
+
+from support import server
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.flights = server.SingleFlight()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def run_concurrently(self, fn, n=5):
+        """Call flights.do('k', fn) from n threads while the leader is held; returns results and errors"""
+        outcomes = []
+
+        def call():
+            try:
+                outcomes.append(self.flights.do('k', fn))
+            except Exception as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(n)]
+        threads[0].start()
+        while not self.flights.in_flight('k'):
+            pass
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)  # let the followers join the flight before it lands
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def leader(self, outcome):
+        def fn():
+            self.calls += 1
+            self.release.wait()
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return fn
+
+    def test_concurrent_callers_share_one_result(self):
+        self.assertEqual(self.run_concurrently(self.leader(['odds'])), [['odds']] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(self.flights.in_flight('k'))
+
+    def test_concurrent_callers_share_one_error(self):
+        error = server.UpstreamHTTPError(429, 'nope')
+        self.assertEqual(self.run_concurrently(self.leader(error)), [error] * 5)
+        self.assertEqual(self.calls, 1)
+        # A failed flight is not remembered
+        self.assertEqual(self.flights.do('k', lambda: 'again'), 'again')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import support  # noqa: F401  (puts the repo root on sys.path)
+from sqlite_storage import SQLiteStorage
+
+
+def bet(bet_id, user_id, status='pending'):
+    return {'id': bet_id, 'userId': user_id, 'matchId': 'm1', 'market': 'match_result', 'selection': 'home',
+            'odds': 2.0, 'stake': 10, 'potentialWin': 20, 'placedAt': '2024-01-01T00:00:00', 'status': status}
+
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        self.storage = SQLiteStorage(os.path.join(tempfile.mkdtemp(), 'test.sqlite3'))
+
+    def tearDown(self):
+        self.storage.close()
+
+    def test_later_file_removes_what_it_no_longer_has(self):
+        backup = {
+            'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 1000}, 'u2': {'id': 'u2', 'username': 'b', 'coins': 5}},
+            'leagues': {'l1': {'id': 'l1', 'name': 'L', 'inviteCode': 'X', 'creatorId': 'u1', 'members': ['u1', 'u2']}},
+            'matches': [{'id': 'm1'}, {'id': 'm2'}],
+            'bets': {'u1': [bet('b1', 'u1', 'won'), bet('b2', 'u1')], 'u2': [bet('b3', 'u2', 'lost')]},
+        }
+        live = {
+            'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 900}},
+            'leagues': {'l1': {'id': 'l1', 'name': 'L', 'inviteCode': 'X', 'creatorId': 'u1', 'members': ['u1']}},
+            'matches': [{'id': 'm1'}],
+            'bets': {'u1': [bet('b2', 'u1')]},
+        }
+        self.storage.import_data(backup)
+        self.storage.import_data(live)
+        bets = [b['id'] for _, b in self.storage.rows('bets')]
+        self.assertEqual(sorted(bets), ['b2', 'b3'])  # u1's cleared history stays gone; u2 is only in the backup
+        self.assertEqual([match_id for match_id, _ in self.storage.rows('matches')], ['m1'])
+        with self.storage._reader() as conn:
+            members = [row[0] for row in conn.execute("SELECT user_id FROM league_members WHERE league_id = 'l1'")]
+        self.assertEqual(members, ['u1'])
+
+
+class ExportTest(unittest.TestCase):
+    def test_round_trip_keeps_users_without_bets(self):
+        storage = SQLiteStorage(os.path.join(tempfile.mkdtemp(), 'test.sqlite3'))
+        data = {
+            'users': {'u1': {'id': 'u1', 'username': 'a', 'coins': 1000}, 'u2': {'id': 'u2', 'username': 'b', 'coins': 5}},
+            'leagues': {},
+            'matches': [{'id': 'm1'}],
+            'bets': {'u1': [bet('b1', 'u1', 'won'), bet('b2', 'u1')], 'u2': [], 'gone': [bet('b3', 'gone')]},
+        }
+        try:
+            storage.import_data(data)
+            out = io.StringIO()
+            storage.export(out)
+        finally:
+            storage.close()
+        exported = json.loads(out.getvalue())
+        self.assertEqual({k: exported[k] for k in data}, data)
+        self.assertEqual(list(exported['bets']), ['u1', 'u2', 'gone'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import http.server
+import threading
+import unittest
+
+from support import server
+from test_async_upstream import Upstream
+
+
+class UpstreamPoolStatsTest(unittest.TestCase):
+    def test_counters_add_up_under_concurrency(self):
+        httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{httpd.server_address[1]}/odds'
+        pool = server.UpstreamPool(max_idle=2)
+        def worker():
+            for _ in range(20):
+                pool.request(url, 5)
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+        stats = pool.get_stats()
+        self.assertEqual(stats['requests'], 160)
+        self.assertEqual(stats['created'] + stats['reused'], 160 + stats['retries'])
+        # Every connection is either still idle or was discarded
+        self.assertEqual(stats['created'], stats['discarded'] + sum(stats['idle'].values()))
+
+
+if __name__ == '__main__':
+    unittest.main()